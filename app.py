@@ -4,22 +4,69 @@ import csv
 import io
 import importlib.util
 import os
+import socket
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
+from itertools import groupby
 from datetime import date, datetime, timedelta
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 import click
-from flask import Flask, Response, abort, flash, g, jsonify, redirect, render_template, request, session, url_for
-from sqlalchemy import func, inspect, text
+from flask import (
+    Flask,
+    Response,
+    abort,
+    flash,
+    g,
+    get_flashed_messages,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_with_context,
+    url_for,
+)
+from flask_wtf.csrf import generate_csrf
+from sqlalchemy import Date, Integer, and_, case, cast, func, insert, inspect, literal, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from config import DevelopmentConfig, ProductionConfig
 from duy import create_duy_blueprint
+from utils.constraints import (
+    Constraint,
+    MaxConsecutiveDays,
+    MaxWeeklyMinutes,
+    MinimumRest,
+    ShiftAttributeMatch,
+)
+from utils.coverage import CoverageMatrix
 from utils.i18n import get_lang, set_lang, t
+from utils.payroll import PayrollSheet, from_hundredths, shift_centihours, to_cents
+from utils.snapshot_cache import SnapshotCache
+from utils.scheduling import (
+    AUTO_SCHEDULED_NOTE,
+    BLOCKING_STATUSES,
+    SCHEDULE_MODES,
+    DayCallback,
+    ScheduleContext,
+    ScheduleOverlay,
+    ScheduleResult,
+    apply_overlay,
+    build_schedule_context,
+    clone_context,
+    coverage_diff,
+    schedule_cells,
+    schedule_weeks,
+    shift_minutes,
+    summarize_coverage,
+    to_minutes,
+)
 
 BASE_DIR = Path(__file__).resolve().parent
 EXTENSIONS_FILE = BASE_DIR / "app" / "extensions.py"
@@ -44,8 +91,14 @@ RosterAssignment = _models_module.RosterAssignment
 RosterVersion = _models_module.RosterVersion
 StaffAvailability = _models_module.StaffAvailability
 StaffShiftPreference = _models_module.StaffShiftPreference
+StaffWeekHistory = _models_module.StaffWeekHistory
+PayrollLedgerEntry = _models_module.PayrollLedgerEntry
+PayrollPeriod = _models_module.PayrollPeriod
+PayrollPeriodLine = _models_module.PayrollPeriodLine
+RosterDirtyCell = _models_module.RosterDirtyCell
 User = _models_module.User
 Organization = _models_module.Organization
+ScheduleJob = _models_module.ScheduleJob
 
 app = Flask(__name__)
 app_env = os.environ.get("APP_ENV", os.environ.get("FLASK_ENV", "development")).lower()
@@ -224,24 +277,6 @@ def monday_for(day: date) -> date:
     return day - timedelta(days=day.weekday())
 
 
-def to_minutes(hhmm: str) -> int:
-    hour, minute = hhmm.split(":")
-    return int(hour) * 60 + int(minute)
-
-
-def shift_duration_hours(start_hhmm: str, end_hhmm: str) -> Decimal:
-    try:
-        start_minutes = to_minutes(start_hhmm)
-        end_minutes = to_minutes(end_hhmm)
-    except (ValueError, AttributeError):
-        return Decimal("0.00")
-    if end_minutes <= start_minutes:
-        end_minutes += 24 * 60
-    duration_minutes = end_minutes - start_minutes
-    duration_hours = Decimal(duration_minutes) / Decimal(60)
-    return duration_hours.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-
 def each_date(start_obj: date, end_obj: date) -> list[str]:
     total_days = (end_obj - start_obj).days + 1
     return [(start_obj + timedelta(days=offset)).isoformat() for offset in range(total_days)]
@@ -256,28 +291,52 @@ def month_bounds(day: date) -> tuple[date, date]:
     return start_obj, next_month - timedelta(days=1)
 
 
-def ranges_overlap(start_a: str, end_a: str, start_b: str, end_b: str) -> bool:
-    a_start = to_minutes(start_a)
-    a_end = to_minutes(end_a)
-    b_start = to_minutes(start_b)
-    b_end = to_minutes(end_b)
-    return a_start < b_end and b_start < a_end
+CSV_STREAM_ROWS = 200
+EXPORT_CURSOR_BATCH = 1000
 
 
-def csv_response(filename: str, headers: list[str], rows: list[dict[str, Any]]) -> Response:
+def iter_csv_chunks(headers: list[str], rows: Iterable[dict[str, Any]]) -> Iterator[bytes]:
+    """Yield a CSV file as UTF-8 chunks of CSV_STREAM_ROWS rows, consuming ``rows`` lazily."""
     buffer = io.StringIO()
     writer = csv.writer(buffer)
     writer.writerow(headers)
-    for row in rows:
+    for count, row in enumerate(rows, start=1):
         writer.writerow([row[h] for h in headers])
+        if count % CSV_STREAM_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
 
+def csv_response(filename: str, headers: list[str], rows: Iterable[dict[str, Any]]) -> Response:
+    """Stream a CSV download row by row, so memory stays flat however many rows ``rows`` yields."""
     return Response(
-        buffer.getvalue(),
+        stream_with_context(iter_csv_chunks(headers, rows)),
         mimetype="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
 
+PAGE_STREAM_BUFFER = 64
+
+
+def render_page(template_name: str, **context: Any) -> str | Response:
+    """Render a page template, streaming it in chunks when STREAM_PAGES is on.
+
+    The session cookie goes out with the headers, before the body renders, so
+    flashed messages and the CSRF token are taken from the session up front.
+    """
+    if not app.config.get("STREAM_PAGES"):
+        return render_template(template_name, **context)
+    get_flashed_messages(with_categories=True)
+    generate_csrf()
+    app.update_template_context(context)
+    stream = app.jinja_env.get_or_select_template(template_name).stream(context)
+    stream.enable_buffering(PAGE_STREAM_BUFFER)
+    return Response(stream_with_context(stream), mimetype="text/html")
+
+
 def ensure_roster_schema_compatibility() -> None:
     """Bring older databases forward for roster versioning without full Alembic migrations."""
     inspector = inspect(db.engine)
@@ -297,6 +356,9 @@ def ensure_roster_schema_compatibility() -> None:
     if "updated_at" not in roster_version_columns:
         db.session.execute(text("ALTER TABLE roster_versions ADD COLUMN updated_at TIMESTAMP"))
         db.session.commit()
+    if "history_summarized_at" not in roster_version_columns:
+        db.session.execute(text("ALTER TABLE roster_versions ADD COLUMN history_summarized_at TIMESTAMP"))
+        db.session.commit()
 
     db.session.execute(
         text(
@@ -392,6 +454,18 @@ def ensure_staff_schema_compatibility() -> None:
     db.session.commit()
 
 
+def ensure_shift_template_schema_compatibility() -> None:
+    inspector = inspect(db.engine)
+    if not inspector.has_table("shift_templates"):
+        return
+    shift_columns = {col["name"] for col in inspector.get_columns("shift_templates")}
+    if "role" not in shift_columns:
+        db.session.execute(text("ALTER TABLE shift_templates ADD COLUMN role TEXT"))
+    if "department" not in shift_columns:
+        db.session.execute(text("ALTER TABLE shift_templates ADD COLUMN department VARCHAR(120)"))
+    db.session.commit()
+
+
 def ensure_user_schema_compatibility() -> None:
     inspector = inspect(db.engine)
     if not inspector.has_table("users"):
@@ -502,25 +576,168 @@ app.register_blueprint(
 )
 
 
-def auto_schedule_week(week_start: date) -> tuple[int, int, int]:
-    org_id = current_org_id()
-    staff_rows = Staff.query.filter_by(org_id=org_id, active=1).order_by(Staff.name).all()
-    shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
+MAX_AUTO_SCHEDULE_WEEKS = 6
+ASSIGNMENT_INSERT_CHUNK_SIZE = 500
+ASSIGNMENT_UNIQUE_COLUMNS = ["version_id", "roster_date", "staff_id", "shift_id"]
 
-    if not staff_rows or not shift_rows:
-        return 0, 0, 0
 
-    week_end = week_start + timedelta(days=6)
-    recent_start = week_start - timedelta(days=28)
-    week_start_str = week_start.isoformat()
-    week_end_str = week_end.isoformat()
+def bulk_insert_assignments(rows: list[dict[str, Any]]) -> int:
+    """Insert roster assignments with multi-row INSERTs and return how many were written.
+
+    Rows that collide with uq_roster_version_date_staff_shift, in the table or
+    earlier in ``rows``, are skipped by ON CONFLICT DO NOTHING instead of
+    raising IntegrityError. The count is the rows the database reports
+    inserted, so ``len(rows)`` minus it is the number skipped. No ORM objects
+    are built, so callers must not expect the rows in the session identity map.
+    """
+    if not rows:
+        return 0
+    dialect_name = db.engine.dialect.name.lower()
+    inserted = 0
+    for offset in range(0, len(rows), ASSIGNMENT_INSERT_CHUNK_SIZE):
+        chunk = rows[offset : offset + ASSIGNMENT_INSERT_CHUNK_SIZE]
+        if dialect_name == "postgresql":
+            statement = postgresql.insert(RosterAssignment.__table__).values(chunk)
+            statement = statement.on_conflict_do_nothing(index_elements=ASSIGNMENT_UNIQUE_COLUMNS)
+        elif dialect_name == "sqlite":
+            statement = sqlite.insert(RosterAssignment.__table__).values(chunk)
+            statement = statement.on_conflict_do_nothing(index_elements=ASSIGNMENT_UNIQUE_COLUMNS)
+        else:
+            statement = insert(RosterAssignment.__table__).values(chunk)
+        inserted += max(db.session.execute(statement).rowcount, 0)
+    return inserted
+
 
-    existing_draft = (
+def shift_window(row: Any) -> tuple[int, int, int]:
+    """(shift id, start minutes, end minutes) of a shift template, empty when its times are malformed."""
+    try:
+        start_minutes, end_minutes = shift_minutes(str(row.start_time), str(row.end_time))
+    except (ValueError, AttributeError):
+        start_minutes = end_minutes = 0
+    return row.id, start_minutes, end_minutes
+
+
+def schedule_constraints() -> list[Constraint]:
+    """Scheduling rules for a run; limits set to 0 in the config are left out."""
+    constraints: list[Constraint] = [ShiftAttributeMatch("role"), ShiftAttributeMatch("department")]
+    max_weekly_hours = float(app.config.get("SCHEDULE_MAX_WEEKLY_HOURS", 0))
+    if max_weekly_hours > 0:
+        constraints.append(MaxWeeklyMinutes(int(max_weekly_hours * 60)))
+    min_rest_hours = float(app.config.get("SCHEDULE_MIN_REST_HOURS", 0))
+    if min_rest_hours > 0:
+        constraints.append(MinimumRest(int(min_rest_hours * 60)))
+    max_consecutive_days = int(app.config.get("SCHEDULE_MAX_CONSECUTIVE_DAYS", 0))
+    if max_consecutive_days > 0:
+        constraints.append(MaxConsecutiveDays(max_consecutive_days))
+    return constraints
+
+
+roster_snapshot_cache = SnapshotCache(
+    int(app.config.get("ROSTER_SNAPSHOT_CACHE_SIZE", 256)),
+    app.config.get("ROSTER_SNAPSHOT_CACHE_DIR") or None,
+)
+
+
+def roster_snapshot_key(version: Any, kind: str = "assignments") -> tuple[int, int, str]:
+    stamp = version.updated_at or version.created_at
+    return version.org_id, version.id, f"{kind}-{stamp.isoformat() if stamp else ''}"
+
+
+def touch_roster_version(version: Any) -> None:
+    """Record that a version's assignments changed: bump updated_at and drop its cached snapshots."""
+    version.updated_at = datetime.utcnow()
+    roster_snapshot_cache.invalidate(version.org_id, version.id)
+
+
+def invalidate_org_roster_snapshots(org_id: int) -> None:
+    """Drop every cached snapshot of an org after staff or shifts were deleted under its rosters."""
+    RosterVersion.query.filter_by(org_id=org_id).update(
+        {RosterVersion.updated_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+    roster_snapshot_cache.invalidate(org_id)
+
+
+def load_versions_assignments(versions: Iterable[Any]) -> dict[int, list[tuple[int, str, int, int, bool]]]:
+    """(id, date, staff id, shift id, auto-scheduled) rows per version, served from the snapshot cache.
+
+    Versions missing from the cache are read together in one query.
+    """
+    rows_by_version: dict[int, list[tuple[int, str, int, int, bool]]] = {}
+    missing: dict[int, Any] = {}
+    for version in versions:
+        cached = roster_snapshot_cache.get(roster_snapshot_key(version))
+        if cached is not None:
+            rows_by_version[version.id] = cached
+        else:
+            missing[version.id] = version
+            rows_by_version[version.id] = []
+    if not missing:
+        return rows_by_version
+    org_ids = {version.org_id for version in missing.values()}
+    for row in (
+        db.session.query(
+            RosterAssignment.id,
+            RosterAssignment.version_id,
+            RosterAssignment.roster_date,
+            RosterAssignment.staff_id,
+            RosterAssignment.shift_id,
+            RosterAssignment.notes,
+        )
+        .filter(RosterAssignment.org_id.in_(org_ids), RosterAssignment.version_id.in_(list(missing)))
+        .order_by(RosterAssignment.id)
+    ):
+        rows_by_version[row.version_id].append(
+            (row.id, str(row.roster_date), row.staff_id, row.shift_id, row.notes == AUTO_SCHEDULED_NOTE)
+        )
+    for version_id, version in missing.items():
+        roster_snapshot_cache.put(roster_snapshot_key(version), rows_by_version[version_id])
+    return rows_by_version
+
+
+def load_version_assignments(version: Any) -> list[tuple[int, str, int, int, bool]]:
+    return load_versions_assignments([version])[version.id]
+
+
+def load_versions_shift_fill(versions: Iterable[Any]) -> dict[int, dict[tuple[str, int], int]]:
+    """Headcount per (date, shift id) of each version, served from the snapshot cache.
+
+    Versions missing from the cache are counted together in one GROUP BY query.
+    """
+    fill_by_version: dict[int, dict[tuple[str, int], int]] = {}
+    missing: dict[int, Any] = {}
+    for version in versions:
+        cached = roster_snapshot_cache.get(roster_snapshot_key(version, "fill"))
+        if cached is not None:
+            fill_by_version[version.id] = cached
+        else:
+            missing[version.id] = version
+            fill_by_version[version.id] = {}
+    if not missing:
+        return fill_by_version
+    org_ids = {version.org_id for version in missing.values()}
+    for row in (
+        db.session.query(
+            RosterAssignment.version_id,
+            RosterAssignment.roster_date,
+            RosterAssignment.shift_id,
+            func.count(RosterAssignment.id).label("filled"),
+        )
+        .filter(RosterAssignment.org_id.in_(org_ids), RosterAssignment.version_id.in_(list(missing)))
+        .group_by(RosterAssignment.version_id, RosterAssignment.roster_date, RosterAssignment.shift_id)
+    ):
+        fill_by_version[row.version_id][(str(row.roster_date), row.shift_id)] = int(row.filled)
+    for version_id, version in missing.items():
+        roster_snapshot_cache.put(roster_snapshot_key(version, "fill"), fill_by_version[version_id])
+    return fill_by_version
+
+
+def get_or_create_draft_version(org_id: int, week_start: date) -> Any:
+    draft_version = (
         RosterVersion.query.filter_by(org_id=org_id, week_start=week_start, status="draft")
         .order_by(RosterVersion.id.desc())
         .first()
     )
-    draft_version = existing_draft
     if draft_version is None:
         draft_version = RosterVersion(
             org_id=org_id,
@@ -529,185 +746,618 @@ def auto_schedule_week(week_start: date) -> tuple[int, int, int]:
         )
         db.session.add(draft_version)
         db.session.flush()
+    return draft_version
 
-    recent_counts = {
-        staff_id: count
-        for staff_id, count in (
-            db.session.query(RosterAssignment.staff_id, func.count(RosterAssignment.id))
-            .filter(
-                RosterAssignment.org_id == org_id,
-                RosterAssignment.version_id == draft_version.id,
-                RosterAssignment.roster_date.between(
-                    recent_start.isoformat(), week_end.isoformat()
-                )
+
+FAIRNESS_HISTORY_DAYS = 28
+
+
+def refresh_staff_week_history(org_id: int, version: Any) -> None:
+    """Rewrite the fairness summary of a confirmed week from its assignments.
+
+    Stamps ``history_summarized_at`` on the version, so a week without
+    assignments, which leaves no summary rows, is not summarized again.
+    """
+    StaffWeekHistory.query.filter_by(org_id=org_id, week_start=version.week_start).delete(
+        synchronize_session=False
+    )
+    totals: dict[int, list[int]] = {}
+    for staff_id, start_time, end_time in (
+        db.session.query(RosterAssignment.staff_id, ShiftTemplate.start_time, ShiftTemplate.end_time)
+        .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+        .filter(RosterAssignment.org_id == org_id, RosterAssignment.version_id == version.id)
+        .all()
+    ):
+        try:
+            start_minutes, end_minutes = shift_minutes(str(start_time), str(end_time))
+        except (ValueError, AttributeError):
+            start_minutes = end_minutes = 0
+        entry = totals.setdefault(staff_id, [0, 0])
+        entry[0] += 1
+        entry[1] += end_minutes - start_minutes
+    db.session.add_all(
+        [
+            StaffWeekHistory(
+                org_id=org_id,
+                version_id=version.id,
+                week_start=version.week_start,
+                staff_id=staff_id,
+                assignment_count=count,
+                worked_minutes=minutes,
             )
-            .group_by(RosterAssignment.staff_id)
-            .all()
+            for staff_id, (count, minutes) in totals.items()
+        ]
+    )
+    version.history_summarized_at = datetime.utcnow()
+
+
+def load_fairness_history(
+    org_id: int,
+    week_starts: list[date],
+    backfill: bool = True,
+) -> dict[date, tuple[dict[int, int], set[date]]]:
+    """Per-staff assignment counts over the confirmed weeks preceding each week start.
+
+    Returns, per week start, the counts and the set of weeks they include.
+    Reads the staff_week_history summary with one indexed range query. Confirmed
+    weeks that were never summarized are backfilled first unless ``backfill``
+    is False, for read-only callers.
+    """
+    window_start = min(week_starts) - timedelta(days=FAIRNESS_HISTORY_DAYS)
+    window_end = max(week_starts)
+
+    if backfill:
+        for version in RosterVersion.query.filter(
+            RosterVersion.org_id == org_id,
+            RosterVersion.status == "confirmed",
+            RosterVersion.week_start >= window_start,
+            RosterVersion.week_start < window_end,
+            RosterVersion.history_summarized_at.is_(None),
+        ).all():
+            refresh_staff_week_history(org_id, version)
+
+    history_rows = (
+        db.session.query(
+            StaffWeekHistory.week_start,
+            StaffWeekHistory.staff_id,
+            StaffWeekHistory.assignment_count,
+        )
+        .filter(
+            StaffWeekHistory.org_id == org_id,
+            StaffWeekHistory.week_start >= window_start,
+            StaffWeekHistory.week_start < window_end,
+        )
+        .all()
+    )
+    history: dict[date, tuple[dict[int, int], set[date]]] = {}
+    for week_start in week_starts:
+        counts: dict[int, int] = {}
+        weeks: set[date] = set()
+        earliest = week_start - timedelta(days=FAIRNESS_HISTORY_DAYS)
+        for row in history_rows:
+            if earliest <= row.week_start < week_start:
+                counts[row.staff_id] = counts.get(row.staff_id, 0) + int(row.assignment_count)
+                weeks.add(row.week_start)
+        history[week_start] = (counts, weeks)
+    return history
+
+
+def load_schedule_contexts(
+    org_id: int,
+    versions: list[Any],
+    staff_rows: list[Any],
+    shift_rows: list[Any],
+    backfill_history: bool = True,
+) -> list[ScheduleContext]:
+    """Load assignments, leave and preferences for every week in bulk and index them per day.
+
+    Each context also gets the assignments of the version its previous week
+    opens on, for rules that look across the week boundary.
+    """
+    range_start_str = min(version.week_start for version in versions).isoformat()
+    range_end_str = (max(version.week_start for version in versions) + timedelta(days=6)).isoformat()
+
+    assignment_rows = (
+        db.session.query(
+            RosterAssignment.version_id,
+            RosterAssignment.roster_date,
+            RosterAssignment.staff_id,
+            RosterAssignment.shift_id,
+            RosterAssignment.notes,
+            ShiftTemplate.start_time,
+            ShiftTemplate.end_time,
+        )
+        .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+        .filter(
+            RosterAssignment.org_id == org_id,
+            ShiftTemplate.org_id == org_id,
+            RosterAssignment.roster_date.between(range_start_str, range_end_str),
+        )
+        .all()
+    )
+    availability_rows = (
+        db.session.query(
+            StaffAvailability.staff_id,
+            StaffAvailability.start_date,
+            StaffAvailability.end_date,
+            StaffAvailability.status,
+        )
+        .filter(
+            StaffAvailability.org_id == org_id,
+            StaffAvailability.status.in_(BLOCKING_STATUSES),
+            StaffAvailability.start_date <= range_end_str,
+            StaffAvailability.end_date >= range_start_str,
+        )
+        .all()
+    )
+    preference_rows = (
+        db.session.query(
+            StaffShiftPreference.staff_id,
+            StaffShiftPreference.shift_id,
+            StaffShiftPreference.start_date,
+            StaffShiftPreference.end_date,
+        )
+        .filter(
+            StaffShiftPreference.org_id == org_id,
+            StaffShiftPreference.start_date <= range_end_str,
+            StaffShiftPreference.end_date >= range_start_str,
         )
+        .all()
+    )
+
+    history = load_fairness_history(
+        org_id,
+        [version.week_start for version in versions],
+        backfill=backfill_history,
+    )
+
+    versions_by_previous_week: dict[date, list[Any]] = {}
+    for row in RosterVersion.query.filter(
+        RosterVersion.org_id == org_id,
+        RosterVersion.week_start.in_({version.week_start - timedelta(days=7) for version in versions}),
+    ):
+        versions_by_previous_week.setdefault(row.week_start, []).append(row)
+    previous_version_ids = {
+        week_start: default_week_version(week_versions).id
+        for week_start, week_versions in versions_by_previous_week.items()
     }
-    week_counts = {
-        staff_id: count
-        for staff_id, count in (
-            db.session.query(RosterAssignment.staff_id, func.count(RosterAssignment.id))
-            .filter(
-                RosterAssignment.org_id == org_id,
-                RosterAssignment.version_id == draft_version.id,
-                RosterAssignment.roster_date.between(week_start.isoformat(), week_end.isoformat()),
+    previous_rows_by_version: dict[int, list[Any]] = {}
+    if previous_version_ids:
+        for row in db.session.query(
+            RosterAssignment.version_id,
+            RosterAssignment.roster_date,
+            RosterAssignment.staff_id,
+            RosterAssignment.shift_id,
+        ).filter(
+            RosterAssignment.org_id == org_id,
+            RosterAssignment.version_id.in_(previous_version_ids.values()),
+        ):
+            previous_rows_by_version.setdefault(row.version_id, []).append(row)
+
+    contexts: list[ScheduleContext] = []
+    for version in versions:
+        week_start_str = version.week_start.isoformat()
+        week_end_str = (version.week_start + timedelta(days=6)).isoformat()
+        contexts.append(
+            build_schedule_context(
+                version_id=version.id,
+                week_start=version.week_start,
+                staff_rows=staff_rows,
+                shift_rows=shift_rows,
+                assignment_rows=[
+                    row for row in assignment_rows if week_start_str <= str(row.roster_date) <= week_end_str
+                ],
+                availability_rows=[
+                    row
+                    for row in availability_rows
+                    if row.start_date <= week_end_str and row.end_date >= week_start_str
+                ],
+                preference_rows=[
+                    row
+                    for row in preference_rows
+                    if row.start_date <= week_end_str and row.end_date >= week_start_str
+                ],
+                history_counts=history[version.week_start][0],
+                confirmed_weeks=history[version.week_start][1],
+                previous_rows=previous_rows_by_version.get(
+                    previous_version_ids.get(version.week_start - timedelta(days=7), -1),
+                    [],
+                ),
             )
-            .group_by(RosterAssignment.staff_id)
-            .all()
         )
+    return contexts
+
+
+def auto_schedule_weeks(
+    org_id: int,
+    first_week_start: date,
+    weeks: int = 1,
+    on_day: DayCallback | None = None,
+    mode: str = "greedy",
+) -> tuple[int, int, int]:
+    """Schedule ``weeks`` consecutive weeks and write them in one transaction; returns (added, unfilled, weeks run).
+
+    ``mode="optimal"`` solves each day as a min-cost flow within the solver time
+    budget and falls back to greedy for whatever is left. The solve itself
+    writes nothing, so ``on_day`` may record progress on another connection;
+    drafts are created and filled only once every week is scheduled.
+    """
+    staff_rows = Staff.query.filter_by(org_id=org_id, active=1).order_by(Staff.name).all()
+    shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
+
+    if not staff_rows or not shift_rows:
+        return 0, 0, 0
+
+    week_starts = [first_week_start + timedelta(weeks=offset) for offset in range(weeks)]
+    drafts_by_week = {
+        version.week_start: version
+        for version in RosterVersion.query.filter(
+            RosterVersion.org_id == org_id,
+            RosterVersion.status == "draft",
+            RosterVersion.week_start.in_(week_starts),
+        ).order_by(RosterVersion.id)
     }
-    for row in staff_rows:
-        week_counts.setdefault(row.id, 0)
-    preference_rows = (
-        StaffShiftPreference.query.filter(
-            StaffShiftPreference.org_id == org_id,
-            StaffShiftPreference.start_date <= week_end_str,
-            StaffShiftPreference.end_date >= week_start_str,
-        ).all()
+    # Weeks without a draft are scheduled against a transient one, as in simulate_schedule_week.
+    contexts = load_schedule_contexts(
+        org_id,
+        [
+            drafts_by_week.get(week_start) or RosterVersion(org_id=org_id, week_start=week_start, status="draft")
+            for week_start in week_starts
+        ],
+        staff_rows,
+        shift_rows,
+    )
+    # Keep backfilled fairness history and end the transaction before the long solve.
+    db.session.commit()
+    results = schedule_weeks(
+        contexts,
+        on_day=on_day,
+        mode=mode,
+        time_budget=app.config["SCHEDULE_SOLVER_TIME_BUDGET"],
+        constraints=schedule_constraints(),
     )
 
+    versions = [get_or_create_draft_version(org_id, week_start) for week_start in week_starts]
+    RosterDirtyCell.query.filter(
+        RosterDirtyCell.org_id == org_id,
+        RosterDirtyCell.version_id.in_([version.id for version in versions]),
+    ).delete(synchronize_session=False)
     added = 0
     unfilled = 0
+    for version, result in zip(versions, results):
+        inserted = bulk_insert_assignments(
+            [
+                {
+                    "org_id": org_id,
+                    "version_id": version.id,
+                    "roster_date": day_str,
+                    "staff_id": staff_id,
+                    "shift_id": shift_id,
+                    "notes": AUTO_SCHEDULED_NOTE,
+                }
+                for day_str, staff_id, shift_id in result.assignments
+            ]
+        )
+        # Slots taken by a concurrent edit since the solve are skipped, so they stay unfilled.
+        added += inserted
+        unfilled += result.unfilled + result.added - inserted
+        touch_roster_version(version)
+    db.session.commit()
+    return added, unfilled, len(versions)
 
-    for offset in range(7):
-        day_value = week_start + timedelta(days=offset)
-        day_str = day_value.isoformat()
-        existing_staff_shift_pairs = {
-            (staff_id, shift_id)
-            for staff_id, shift_id in (
-                db.session.query(RosterAssignment.staff_id, RosterAssignment.shift_id)
-                .filter(
-                    RosterAssignment.org_id == org_id,
-                    RosterAssignment.roster_date == day_str,
-                )
-                .all()
-            )
-        }
-        manual_assigned_staff = {
-            staff_id
-            for (staff_id,) in (
-                db.session.query(RosterAssignment.staff_id)
-                .filter(
-                    RosterAssignment.org_id == org_id,
-                    RosterAssignment.version_id == draft_version.id,
-                    RosterAssignment.roster_date == day_str,
-                    (RosterAssignment.notes.is_(None)) | (RosterAssignment.notes != "Auto-scheduled"),
-                )
-                .distinct()
-                .all()
-            )
-        }
 
-        blocked = {
-            staff_id
-            for (staff_id,) in (
-                db.session.query(StaffAvailability.staff_id)
-                .filter(
-                    StaffAvailability.org_id == org_id,
-                    StaffAvailability.status.in_(["leave", "unavailable"]),
-                    StaffAvailability.start_date <= day_str,
-                    StaffAvailability.end_date >= day_str,
-                )
-                .distinct()
-                .all()
-            )
+def auto_schedule_week(week_start: date) -> tuple[int, int, int]:
+    return auto_schedule_weeks(current_org_id(), week_start, 1)
+
+
+def simulate_schedule_week(
+    org_id: int,
+    week_start: date,
+    overlay: ScheduleOverlay,
+    mode: str = "greedy",
+) -> dict[str, Any]:
+    """Auto-schedule a week with and without ``overlay`` and return the coverage diff.
+
+    Runs against the latest draft of the week, or an empty one when there is
+    none. The week is loaded once; the scenario runs on a copy of the baseline
+    indexes, and nothing is written to the database.
+    """
+    staff_rows = Staff.query.filter_by(org_id=org_id, active=1).order_by(Staff.name).all()
+    shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
+    draft_version = (
+        RosterVersion.query.filter_by(org_id=org_id, week_start=week_start, status="draft")
+        .order_by(RosterVersion.id.desc())
+        .first()
+    )
+    if draft_version is None:
+        # Transient and never added to the session: stands in for the draft a real run would create.
+        draft_version = RosterVersion(org_id=org_id, week_start=week_start, status="draft")
+
+    baseline = load_schedule_contexts(org_id, [draft_version], staff_rows, shift_rows, backfill_history=False)[0]
+    scenario = clone_context(baseline)
+    displaced = apply_overlay(scenario, overlay)
+
+    time_budget = app.config["SCHEDULE_SOLVER_TIME_BUDGET"]
+    constraints = schedule_constraints()
+    baseline_result = schedule_weeks([baseline], mode=mode, time_budget=time_budget, constraints=constraints)[0]
+    scenario_result = schedule_weeks([scenario], mode=mode, time_budget=time_budget, constraints=constraints)[0]
+
+    payload = coverage_diff(summarize_coverage(baseline), summarize_coverage(scenario))
+    payload["baseline"]["added"] = baseline_result.added
+    payload["scenario"]["added"] = scenario_result.added
+    payload["scenario"]["displaced"] = displaced
+    payload.update(
+        {
+            "week_start": week_start.isoformat(),
+            "mode": mode,
+            "version_id": draft_version.id,
         }
+    )
+    return payload
 
-        assigned_ranges: dict[int, list[tuple[str, str]]] = {}
-        for staff_id, start_time, end_time in (
-            db.session.query(
-                RosterAssignment.staff_id,
-                ShiftTemplate.start_time,
-                ShiftTemplate.end_time,
-            )
-            .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
-            .filter(
-                RosterAssignment.org_id == org_id,
-                RosterAssignment.version_id == draft_version.id,
-                ShiftTemplate.org_id == org_id,
-                RosterAssignment.roster_date == day_str,
+
+def mark_dirty_cells(org_id: int, cells: Iterable[tuple[int, str, int]]) -> None:
+    """Record (version id, date, shift id) draft cells whose coverage needs refilling."""
+    pending = {(int(version_id), str(roster_date), int(shift_id)) for version_id, roster_date, shift_id in cells}
+    if not pending:
+        return
+    existing = {
+        (row.version_id, row.roster_date, row.shift_id)
+        for row in db.session.query(
+            RosterDirtyCell.version_id,
+            RosterDirtyCell.roster_date,
+            RosterDirtyCell.shift_id,
+        )
+        .filter(
+            RosterDirtyCell.org_id == org_id,
+            RosterDirtyCell.version_id.in_({version_id for version_id, _, _ in pending}),
+        )
+        .all()
+    }
+    db.session.add_all(
+        [
+            RosterDirtyCell(org_id=org_id, version_id=version_id, roster_date=roster_date, shift_id=shift_id)
+            for version_id, roster_date, shift_id in sorted(pending - existing)
+        ]
+    )
+
+
+def mark_leave_dirty_cells(org_id: int, staff_id: int, start_date: str, end_date: str) -> None:
+    """Flag every draft cell the staff member is rostered on during a new leave window."""
+    mark_dirty_cells(
+        org_id,
+        db.session.query(RosterAssignment.version_id, RosterAssignment.roster_date, RosterAssignment.shift_id)
+        .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
+        .filter(
+            RosterAssignment.org_id == org_id,
+            RosterVersion.org_id == org_id,
+            RosterVersion.status == "draft",
+            RosterAssignment.staff_id == staff_id,
+            RosterAssignment.roster_date.between(start_date, end_date),
+        )
+        .all(),
+    )
+
+
+def mark_shift_dirty_cells(org_id: int, shift_id: int) -> None:
+    """Flag a shift's cells from today on in every draft after its headcount or staffing rules changed.
+
+    Drafts of past weeks and the days of this week already gone are left alone.
+    """
+    today_obj = date.today()
+    mark_dirty_cells(
+        org_id,
+        [
+            (version.id, day_value, shift_id)
+            for version in RosterVersion.query.filter(
+                RosterVersion.org_id == org_id,
+                RosterVersion.status == "draft",
+                RosterVersion.week_start > today_obj - timedelta(days=7),
             )
-            .all()
+            for day_value in each_date(max(version.week_start, today_obj), version.week_start + timedelta(days=6))
+        ],
+    )
+
+
+def refill_dirty_cells(org_id: int, version: Any) -> tuple[int, int, int]:
+    """Re-solve only the dirty cells of a draft; returns (cells, added, unfilled).
+
+    Auto-scheduled rows in those cells that now clash with leave or exceed the
+    shift's headcount are dropped first; manual assignments are never touched.
+    """
+    dirty_rows = RosterDirtyCell.query.filter_by(org_id=org_id, version_id=version.id).all()
+    cells = {(row.roster_date, row.shift_id) for row in dirty_rows}
+    if not cells:
+        return 0, 0, 0
+    dirty_dates = sorted({roster_date for roster_date, _ in cells})
+
+    staff_rows = Staff.query.filter_by(org_id=org_id, active=1).order_by(Staff.name).all()
+    shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
+    required_by_shift = {row.id: row.required_staff for row in shift_rows}
+
+    blocked_by_date: dict[str, set[int]] = {}
+    for staff_id, start_date, end_date in (
+        db.session.query(StaffAvailability.staff_id, StaffAvailability.start_date, StaffAvailability.end_date)
+        .filter(
+            StaffAvailability.org_id == org_id,
+            StaffAvailability.status.in_(BLOCKING_STATUSES),
+            StaffAvailability.start_date <= dirty_dates[-1],
+            StaffAvailability.end_date >= dirty_dates[0],
+        )
+        .all()
+    ):
+        for day_value in dirty_dates:
+            if start_date <= day_value <= end_date:
+                blocked_by_date.setdefault(day_value, set()).add(staff_id)
+
+    cell_rows = (
+        RosterAssignment.query.filter(
+            RosterAssignment.org_id == org_id,
+            RosterAssignment.version_id == version.id,
+            RosterAssignment.roster_date.in_(dirty_dates),
+        )
+        .order_by(RosterAssignment.id.desc())
+        .all()
+    )
+    fill: dict[tuple[str, int], int] = {}
+    for row in cell_rows:
+        fill[(row.roster_date, row.shift_id)] = fill.get((row.roster_date, row.shift_id), 0) + 1
+    for row in cell_rows:
+        cell = (row.roster_date, row.shift_id)
+        if cell not in cells or row.notes != AUTO_SCHEDULED_NOTE:
+            continue
+        if row.staff_id in blocked_by_date.get(row.roster_date, set()) or fill[cell] > required_by_shift.get(
+            row.shift_id, 0
         ):
-            assigned_ranges.setdefault(staff_id, []).append((start_time, end_time))
+            db.session.delete(row)
+            fill[cell] -= 1
+    db.session.flush()
 
-        shift_fill = {
-            shift_id: count
-            for shift_id, count in (
-                db.session.query(RosterAssignment.shift_id, func.count(RosterAssignment.id))
-                .filter(
-                    RosterAssignment.org_id == org_id,
-                    RosterAssignment.version_id == draft_version.id,
-                    RosterAssignment.roster_date == day_str,
-                )
-                .group_by(RosterAssignment.shift_id)
-                .all()
+    added = unfilled = 0
+    if staff_rows and shift_rows:
+        context = load_schedule_contexts(org_id, [version], staff_rows, shift_rows)[0]
+        result = schedule_cells(context, cells, constraints=schedule_constraints())
+        added = bulk_insert_assignments(
+            [
+                {
+                    "org_id": org_id,
+                    "version_id": version.id,
+                    "roster_date": day_str,
+                    "staff_id": staff_id,
+                    "shift_id": shift_id,
+                    "notes": AUTO_SCHEDULED_NOTE,
+                }
+                for day_str, staff_id, shift_id in result.assignments
+            ]
+        )
+        unfilled = result.unfilled + result.added - added
+    for row in dirty_rows:
+        db.session.delete(row)
+    touch_roster_version(version)
+    db.session.commit()
+    return len(cells), added, unfilled
+
+
+SCHEDULE_JOB_STALE_AFTER = timedelta(minutes=15)
+schedule_job_executor = ThreadPoolExecutor(
+    max_workers=max(1, int(app.config.get("SCHEDULE_JOB_WORKERS", 2))),
+    thread_name_prefix="schedule-job",
+)
+
+
+def schedule_job_worker() -> str:
+    """Identify this process as "host:pid" on the jobs it runs."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def save_schedule_job_progress(job_id: int, **values: Any) -> None:
+    """Write job progress on its own connection, so pollers in any worker see it while the job runs."""
+    jobs = ScheduleJob.__table__
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(jobs).where(jobs.c.id == job_id).values(heartbeat_at=datetime.utcnow(), **values)
+        )
+
+
+def run_schedule_job(job_id: int) -> None:
+    with app.app_context():
+        job = db.session.get(ScheduleJob, job_id)
+        if job is None:
+            return
+        job.status = "running"
+        job.worker = schedule_job_worker()
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+        org_id, week_start, weeks, mode = job.org_id, job.week_start, job.weeks, job.mode
+
+        week_results: dict[int, ScheduleResult] = {}
+        progress = {"days_done": 0}
+
+        def report_day(day_str: str, result: ScheduleResult) -> None:
+            week_results[id(result)] = result
+            progress["days_done"] += 1
+            save_schedule_job_progress(
+                job_id,
+                days_done=progress["days_done"],
+                added=sum(item.added for item in week_results.values()),
+                unfilled=sum(item.unfilled for item in week_results.values()),
             )
-        }
 
-        for shift in shift_rows:
-            # Existing assignments in this draft (manual + auto) always take priority.
-            current_fill = shift_fill.get(shift.id, 0)
-            if current_fill >= shift.required_staff:
-                continue
-            open_slots = shift.required_staff - current_fill
-            preferred_for_shift = {
-                pref.staff_id
-                for pref in preference_rows
-                if pref.shift_id == shift.id and pref.start_date <= day_str and pref.end_date >= day_str
-            }
-            for _ in range(open_slots):
-                eligible = [
-                    s
-                    for s in staff_rows
-                    if s.id not in blocked
-                    and s.id not in manual_assigned_staff
-                    and (s.id, shift.id) not in existing_staff_shift_pairs
-                    and all(
-                        not ranges_overlap(
-                            shift.start_time,
-                            shift.end_time,
-                            existing_start,
-                            existing_end,
-                        )
-                        for existing_start, existing_end in assigned_ranges.get(s.id, [])
-                    )
-                ]
-                if not eligible:
-                    unfilled += 1
-                    continue
+        status, error = "finished", None
+        added = unfilled = ran = 0
+        try:
+            added, unfilled, ran = auto_schedule_weeks(org_id, week_start, weeks, on_day=report_day, mode=mode)
+            if ran == 0:
+                status, error = "failed", "msg_auto_schedule_requirements"
+        except IntegrityError:
+            db.session.rollback()
+            status, error = "failed", "msg_auto_schedule_duplicate"
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Auto-schedule job %s failed", job_id)
+            status, error = "failed", "msg_auto_schedule_job_failed"
 
-                chosen = min(
-                    eligible,
-                    key=lambda s: (
-                        0 if s.id in preferred_for_shift else 1,
-                        week_counts.get(s.id, 0),
-                        recent_counts.get(s.id, 0),
-                        s.name,
-                    ),
-                )
+        try:
+            job = db.session.get(ScheduleJob, job_id)
+            if job is not None:
+                job.status = status
+                job.error = error
+                job.added = added
+                job.unfilled = unfilled
+                job.days_done = job.days_total if status == "finished" else progress["days_done"]
+                job.heartbeat_at = job.finished_at = datetime.utcnow()
+                db.session.commit()
+        finally:
+            db.session.remove()
 
-                db.session.add(
-                    RosterAssignment(
-                        org_id=org_id,
-                        version_id=draft_version.id,
-                        roster_date=day_str,
-                        staff_id=chosen.id,
-                        shift_id=shift.id,
-                        notes="Auto-scheduled",
-                    )
-                )
-                assigned_ranges.setdefault(chosen.id, []).append((shift.start_time, shift.end_time))
-                existing_staff_shift_pairs.add((chosen.id, shift.id))
-                week_counts[chosen.id] = week_counts.get(chosen.id, 0) + 1
-                recent_counts[chosen.id] = recent_counts.get(chosen.id, 0) + 1
-                shift_fill[shift.id] = shift_fill.get(shift.id, 0) + 1
-                added += 1
 
+def schedule_job_orphaned(job: Any, now_utc: datetime) -> bool:
+    """Whether a queued or running job can no longer finish.
+
+    True when the process that took it on this host is gone, or when it has
+    not reported progress for SCHEDULE_JOB_STALE_AFTER.
+    """
+    host, _, pid = (job.worker or "").rpartition(":")
+    if host == socket.gethostname() and pid.isdigit() and int(pid) != os.getpid():
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+    return (job.heartbeat_at or job.created_at) < now_utc - SCHEDULE_JOB_STALE_AFTER
+
+
+def fail_orphaned_schedule_jobs() -> int:
+    """Mark queued or running jobs whose worker died as failed; run when a process starts."""
+    now_utc = datetime.utcnow()
+    orphaned = [
+        job
+        for job in ScheduleJob.query.filter(ScheduleJob.status.in_(["queued", "running"]))
+        if schedule_job_orphaned(job, now_utc)
+    ]
+    for job in orphaned:
+        job.status = "failed"
+        job.error = "msg_auto_schedule_job_interrupted"
+        job.finished_at = now_utc
     db.session.commit()
-    return added, unfilled, 1
+    return len(orphaned)
+
+
+def schedule_job_payload(job: Any) -> dict[str, Any]:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "week_start": job.week_start.isoformat(),
+        "weeks": job.weeks,
+        "mode": job.mode,
+        "days_done": job.days_done,
+        "days_total": job.days_total,
+        "added": job.added,
+        "unfilled": job.unfilled,
+        "error": t(job.error) if job.error else None,
+        "roster_url": url_for("roster", roster_date=job.week_start.isoformat()),
+    }
 
 
 @app.route("/")
@@ -829,7 +1479,11 @@ def delete_staff(staff_id: int) -> Any:
         flash(t("msg_staff_member_not_found"), "error")
         return redirect(url_for("staff"))
 
+    ledger_version_ids = confirmed_version_ids_using(row.org_id, RosterAssignment.staff_id == row.id)
+    invalidate_org_roster_snapshots(row.org_id)
     db.session.delete(row)
+    db.session.flush()
+    rebuild_payroll_ledger(row.org_id, ledger_version_ids)
     db.session.commit()
     flash(t("msg_staff_removed"), "success")
     return redirect(url_for("staff"))
@@ -886,6 +1540,8 @@ def shifts() -> str:
         start_time = request.form.get("start_time", "").strip()
         end_time = request.form.get("end_time", "").strip()
         required_staff_raw = request.form.get("required_staff", "1").strip()
+        role = request.form.get("role", "").strip()
+        department = request.form.get("department", "").strip()
 
         try:
             required_staff = max(1, int(required_staff_raw))
@@ -903,6 +1559,8 @@ def shifts() -> str:
                         start_time=start_time,
                         end_time=end_time,
                         required_staff=required_staff,
+                        role=role or None,
+                        department=department or None,
                     )
                 )
                 db.session.commit()
@@ -928,6 +1586,8 @@ def edit_shift_template(shift_id: int) -> Any:
     start_time = request.form.get("start_time", "").strip()
     end_time = request.form.get("end_time", "").strip()
     required_staff_raw = request.form.get("required_staff", "1").strip()
+    role = request.form.get("role", "").strip()
+    department = request.form.get("department", "").strip()
 
     if not name or not start_time or not end_time:
         flash(t("msg_shift_required_fields"), "error")
@@ -962,12 +1622,25 @@ def edit_shift_template(shift_id: int) -> Any:
         flash(t("msg_shift_template_overlap"), "error")
         return redirect(url_for("shifts"))
 
+    if (
+        shift.required_staff != required_staff
+        or (shift.role or "") != role
+        or (shift.department or "") != department
+    ):
+        mark_shift_dirty_cells(org_id, shift.id)
+    ledger_version_ids: list[int] = []
+    if shift.start_time != start_time or shift.end_time != end_time:
+        ledger_version_ids = confirmed_version_ids_using(org_id, RosterAssignment.shift_id == shift.id)
     shift.name = name
     shift.start_time = start_time
     shift.end_time = end_time
     shift.required_staff = required_staff
+    shift.role = role or None
+    shift.department = department or None
 
     try:
+        db.session.flush()
+        rebuild_payroll_ledger(org_id, ledger_version_ids)
         db.session.commit()
         flash(t("msg_shift_template_updated"), "success")
     except IntegrityError:
@@ -1020,6 +1693,7 @@ def availability() -> str:
                     notes=notes or None,
                 )
             )
+            mark_leave_dirty_cells(org_id, staff_id_int, start_date, end_date)
             db.session.commit()
             flash(t("msg_availability_entry_added"), "success")
             return redirect(url_for("availability"))
@@ -1181,6 +1855,510 @@ def delete_shift_preference(preference_id: int) -> Any:
     return redirect(url_for("availability"))
 
 
+def default_week_version(versions: Iterable[Any]) -> Any | None:
+    """The version a week opens on: its latest confirmed version, else its newest draft."""
+    confirmed = [version for version in versions if version.status == "confirmed"]
+    if confirmed:
+        return max(confirmed, key=lambda version: (version.confirmed_at or datetime.min, version.id))
+    drafts = [version for version in versions if version.status == "draft"]
+    if drafts:
+        return max(drafts, key=lambda version: (version.created_at or datetime.min, version.id))
+    return None
+
+
+def load_roster_week_versions(org_id: int, week_start: date, today_obj: date) -> dict[str, Any]:
+    """Versions the roster page lists, from one query.
+
+    Fetches the week's versions and the confirmed versions of the current month
+    together, each with its dirty cell count, and splits them in memory.
+    """
+    month_start, month_end = month_bounds(today_obj)
+    dirty_count = (
+        select(func.count(RosterDirtyCell.id))
+        .where(RosterDirtyCell.version_id == RosterVersion.id)
+        .correlate(RosterVersion)
+        .scalar_subquery()
+    )
+    rows = (
+        db.session.query(RosterVersion, dirty_count)
+        .filter(
+            RosterVersion.org_id == org_id,
+            or_(
+                RosterVersion.week_start == week_start,
+                and_(
+                    RosterVersion.status == "confirmed",
+                    RosterVersion.week_start.between(month_start, month_end),
+                ),
+            ),
+        )
+        .all()
+    )
+    week_rows = [version for version, _ in rows if version.week_start == week_start]
+    confirmed_versions = sorted(
+        (version for version in week_rows if version.status == "confirmed"),
+        key=lambda version: (version.confirmed_at or datetime.min, version.id),
+        reverse=True,
+    )
+    draft_versions = sorted(
+        (version for version in week_rows if version.status == "draft"),
+        key=lambda version: (version.created_at or datetime.min, version.id),
+        reverse=True,
+    )
+    month_confirmed_versions = sorted(
+        (
+            version
+            for version, _ in rows
+            if version.status == "confirmed" and month_start <= version.week_start <= month_end
+        ),
+        key=lambda version: (version.week_start, version.id),
+    )
+    default_version = default_week_version(week_rows)
+    return {
+        "confirmed_versions": confirmed_versions,
+        "draft_versions": draft_versions,
+        "month_confirmed_versions": month_confirmed_versions,
+        "default_version": default_version,
+        "dirty_counts": {version.id: int(count or 0) for version, count in rows},
+    }
+
+
+def parse_page(raw: str | None) -> int:
+    try:
+        return max(1, int((raw or "1").strip()))
+    except ValueError:
+        return 1
+
+
+def load_roster_week_grid(
+    org_id: int,
+    week_dates: list[str],
+    version: Any | None,
+    department: str | None = None,
+    page: int = 1,
+    page_size: int = 0,
+) -> dict[str, Any]:
+    """Staff, shifts and the coverage matrix of a version, filled in a single pass.
+
+    The version's assignments come from the snapshot cache, so unchanged
+    versions are served without reading roster_assignments. With a
+    ``page_size`` only that slice of the (optionally department-filtered)
+    staff is loaded; shift fill still counts every assignment of the version.
+    """
+    staff_query = Staff.query.filter_by(org_id=org_id, active=1)
+    if department:
+        staff_query = staff_query.filter(Staff.department == department)
+    staff_query = staff_query.order_by(Staff.name, Staff.id)
+    if page_size > 0:
+        staff_total = staff_query.count()
+        page = min(page, max(1, -(-staff_total // page_size)))
+        staff_rows = staff_query.offset((page - 1) * page_size).limit(page_size).all()
+    else:
+        staff_rows = staff_query.all()
+        staff_total = len(staff_rows)
+        page = 1
+    departments = [
+        row.department
+        for row in db.session.query(Staff.department)
+        .filter(Staff.org_id == org_id, Staff.active == 1, Staff.department.isnot(None), Staff.department != "")
+        .distinct()
+        .order_by(Staff.department)
+    ]
+    shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
+    coverage = CoverageMatrix(
+        [row.id for row in staff_rows],
+        week_dates,
+        [shift_window(row) for row in shift_rows],
+    )
+    if version is not None:
+        for assignment_id, roster_date, staff_id, shift_id, auto in load_version_assignments(version):
+            coverage.add(staff_id, roster_date, shift_id, assignment_id, auto=auto)
+    return {
+        "staff_rows": staff_rows,
+        "shift_rows": shift_rows,
+        "coverage": coverage,
+        "staff_total": staff_total,
+        "departments": departments,
+        "department": department or "",
+        "page": page,
+        "page_size": page_size,
+        "page_count": max(1, -(-staff_total // page_size)) if page_size > 0 else 1,
+    }
+
+
+def roster_version_payload(version: Any) -> dict[str, Any]:
+    return {
+        "id": version.id,
+        "week_start": version.week_start.isoformat(),
+        "status": version.status,
+        "confirmed_at": version.confirmed_at.isoformat() if version.confirmed_at else None,
+    }
+
+
+def roster_week_snapshot_payload(
+    week_start: date,
+    week_dates: list[str],
+    versions: dict[str, Any],
+    current_version: Any | None,
+    grid: dict[str, Any],
+) -> dict[str, Any]:
+    coverage: CoverageMatrix = grid["coverage"]
+    cells = []
+    for staff_row in grid["staff_rows"]:
+        for day_value in week_dates:
+            entries = coverage.cell_entries(staff_row.id, day_value)
+            if entries:
+                cells.append(
+                    {
+                        "staff_id": staff_row.id,
+                        "date": day_value,
+                        "assignments": [
+                            {"id": entry.assignment_id, "shift_id": entry.shift_id, "auto": entry.auto}
+                            for entry in entries
+                        ],
+                    }
+                )
+    return {
+        "week_start": week_start.isoformat(),
+        "week_dates": week_dates,
+        "current_version": roster_version_payload(current_version) if current_version is not None else None,
+        "versions": [
+            roster_version_payload(version)
+            for version in [*versions["confirmed_versions"], *versions["draft_versions"]]
+        ],
+        "month_confirmed_versions": [
+            roster_version_payload(version) for version in versions["month_confirmed_versions"]
+        ],
+        "staff": [
+            {"id": row.id, "name": row.name, "role": row.role, "department": row.department}
+            for row in grid["staff_rows"]
+        ],
+        "staff_total": grid["staff_total"],
+        "departments": grid["departments"],
+        "department": grid["department"],
+        "page": grid["page"],
+        "page_size": grid["page_size"],
+        "page_count": grid["page_count"],
+        "shifts": [
+            {
+                "id": row.id,
+                "name": row.name,
+                "start_time": row.start_time,
+                "end_time": row.end_time,
+                "required_staff": row.required_staff,
+            }
+            for row in grid["shift_rows"]
+        ],
+        "fill": {
+            day_value: {str(row.id): coverage.shift_fill(day_value, row.id) for row in grid["shift_rows"]}
+            for day_value in week_dates
+        },
+        "cells": cells,
+        "dirty_cell_count": (
+            versions["dirty_counts"].get(current_version.id, 0)
+            if current_version is not None and current_version.status == "draft"
+            else 0
+        ),
+    }
+
+
+@app.get("/roster/snapshot")
+@login_required
+def roster_snapshot() -> Any:
+    org_id = current_org_id()
+    selected_obj = parse_iso_date(request.args.get("roster_date", "").strip()) or date.today()
+    week_start_obj = monday_for(selected_obj)
+    current_version: Any | None = None
+    version_id_raw = request.args.get("version_id", "").strip()
+    if version_id_raw:
+        try:
+            selected_version_id = int(version_id_raw)
+        except ValueError:
+            return jsonify({"error": "Roster version not found."}), 404
+        current_version = RosterVersion.query.filter_by(id=selected_version_id, org_id=org_id).first()
+        if current_version is None:
+            return jsonify({"error": "Roster version not found."}), 404
+        week_start_obj = current_version.week_start
+
+    versions = load_roster_week_versions(org_id, week_start_obj, date.today())
+    if current_version is None:
+        current_version = versions["default_version"]
+    week_dates = [(week_start_obj + timedelta(days=offset)).isoformat() for offset in range(7)]
+    page_size_raw = request.args.get("page_size", "").strip()
+    grid = load_roster_week_grid(
+        org_id,
+        week_dates,
+        current_version,
+        department=request.args.get("department", "").strip() or None,
+        page=parse_page(request.args.get("page")),
+        page_size=parse_page(page_size_raw) if page_size_raw else int(app.config.get("ROSTER_PAGE_SIZE", 0)),
+    )
+    return jsonify(roster_week_snapshot_payload(week_start_obj, week_dates, versions, current_version, grid)), 200
+
+
+def diff_roster_versions(
+    base_rows: Iterable[tuple[int, str, int, int, bool]],
+    target_rows: Iterable[tuple[int, str, int, int, bool]],
+) -> dict[str, list[dict[str, Any]]]:
+    """Cells added, removed and changed between two versions' assignment rows."""
+    base_cells: dict[tuple[int, str], set[int]] = {}
+    for _, day_str, staff_id, shift_id, _ in base_rows:
+        base_cells.setdefault((staff_id, day_str), set()).add(shift_id)
+    target_cells: dict[tuple[int, str], set[int]] = {}
+    for _, day_str, staff_id, shift_id, _ in target_rows:
+        target_cells.setdefault((staff_id, day_str), set()).add(shift_id)
+
+    return {
+        "added": [
+            {"staff_id": staff_id, "date": day_str, "shift_ids": sorted(target_cells[(staff_id, day_str)])}
+            for staff_id, day_str in sorted(target_cells.keys() - base_cells.keys())
+        ],
+        "removed": [
+            {"staff_id": staff_id, "date": day_str, "shift_ids": sorted(base_cells[(staff_id, day_str)])}
+            for staff_id, day_str in sorted(base_cells.keys() - target_cells.keys())
+        ],
+        "changed": [
+            {
+                "staff_id": staff_id,
+                "date": day_str,
+                "from_shift_ids": sorted(base_cells[(staff_id, day_str)]),
+                "shift_ids": sorted(target_cells[(staff_id, day_str)]),
+            }
+            for staff_id, day_str in sorted(base_cells.keys() & target_cells.keys())
+            if base_cells[(staff_id, day_str)] != target_cells[(staff_id, day_str)]
+        ],
+    }
+
+
+MAX_OVERVIEW_WEEKS = 6
+
+
+def coverage_level(filled: int, required: int) -> str:
+    if required <= 0:
+        return "none"
+    if filled >= required:
+        return "full"
+    return "partial" if filled * 2 >= required else "low"
+
+
+@app.get("/roster/overview")
+@login_required
+def roster_overview() -> str:
+    """Filled against required headcount per day for a month, or up to six weeks from start_date."""
+    org_id = current_org_id()
+    start_obj = parse_iso_date(request.args.get("start_date", "").strip())
+    if start_obj is None:
+        month_obj = parse_iso_date(f"{request.args.get('month', '').strip()}-01") or date.today()
+        month_start, month_end = month_bounds(month_obj)
+        start_obj = monday_for(month_start)
+        weeks = min(MAX_OVERVIEW_WEEKS, (month_end - start_obj).days // 7 + 1)
+    else:
+        month_start = start_obj.replace(day=1)
+        start_obj = monday_for(start_obj)
+        weeks = min(MAX_OVERVIEW_WEEKS, parse_page(request.args.get("weeks", "4")))
+    week_starts = [start_obj + timedelta(days=7 * offset) for offset in range(weeks)]
+
+    versions_by_week: dict[date, list[Any]] = {}
+    for version in RosterVersion.query.filter(
+        RosterVersion.org_id == org_id,
+        RosterVersion.week_start.in_(week_starts),
+    ):
+        versions_by_week.setdefault(version.week_start, []).append(version)
+    week_versions = {week_start: default_week_version(versions_by_week.get(week_start, [])) for week_start in week_starts}
+    fill_by_version = load_versions_shift_fill([version for version in week_versions.values() if version is not None])
+    shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
+    required_per_day = sum(max(0, int(row.required_staff or 0)) for row in shift_rows)
+
+    overview_weeks = []
+    for week_start in week_starts:
+        version = week_versions[week_start]
+        fill = fill_by_version.get(version.id, {}) if version is not None else {}
+        days = []
+        for offset in range(7):
+            day_str = (week_start + timedelta(days=offset)).isoformat()
+            shifts = [
+                {
+                    "name": row.name,
+                    "filled": fill.get((day_str, row.id), 0),
+                    "required": max(0, int(row.required_staff or 0)),
+                }
+                for row in shift_rows
+            ]
+            filled = sum(min(shift["filled"], shift["required"]) for shift in shifts)
+            days.append(
+                {
+                    "date": day_str,
+                    "filled": filled,
+                    "required": required_per_day,
+                    "level": coverage_level(filled, required_per_day) if version is not None else "none",
+                    "shifts": shifts,
+                }
+            )
+        overview_weeks.append({"week_start": week_start.isoformat(), "version": version, "days": days})
+
+    return render_template(
+        "roster_overview.html",
+        month=month_start.strftime("%Y-%m"),
+        weekdays=[t(f"weekday_{offset}") for offset in range(7)],
+        overview_weeks=overview_weeks,
+    )
+
+
+@app.get("/roster/diff")
+@login_required
+def roster_version_diff() -> Any:
+    """Compare two versions of a week: ?base=<version id>&target=<version id>[&format=html]."""
+    org_id = current_org_id()
+    try:
+        base_id = int(request.args.get("base", ""))
+        target_id = int(request.args.get("target", ""))
+    except ValueError:
+        return jsonify({"error": t("msg_roster_version_not_found")}), 404
+    versions = {
+        row.id: row
+        for row in RosterVersion.query.filter(
+            RosterVersion.org_id == org_id,
+            RosterVersion.id.in_([base_id, target_id]),
+        )
+    }
+    base, target = versions.get(base_id), versions.get(target_id)
+    if base is None or target is None:
+        return jsonify({"error": t("msg_roster_version_not_found")}), 404
+    if base.week_start != target.week_start:
+        return jsonify({"error": t("msg_versions_different_weeks")}), 400
+
+    rows_by_version = load_versions_assignments([base, target])
+    diff = diff_roster_versions(rows_by_version[base.id], rows_by_version[target.id])
+    entries = [entry for kind in ("added", "removed", "changed") for entry in diff[kind]]
+    staff_ids = {entry["staff_id"] for entry in entries}
+    staff_names = (
+        {row.id: row.name for row in db.session.query(Staff.id, Staff.name).filter(Staff.id.in_(staff_ids))}
+        if staff_ids
+        else {}
+    )
+    shift_names = {
+        row.id: row.name
+        for row in db.session.query(ShiftTemplate.id, ShiftTemplate.name).filter(ShiftTemplate.org_id == org_id)
+    }
+
+    if request.args.get("format") == "html":
+        return render_template(
+            "pages/roster/diff.html",
+            base=base,
+            target=target,
+            diff=diff,
+            staff_names=staff_names,
+            shift_names=shift_names,
+        )
+    return jsonify(
+        {
+            "base": roster_version_payload(base),
+            "target": roster_version_payload(target),
+            **diff,
+            "summary": {kind: len(diff[kind]) for kind in diff},
+            "staff": {str(staff_id): name for staff_id, name in staff_names.items()},
+            "shifts": {str(shift_id): name for shift_id, name in shift_names.items()},
+        }
+    ), 200
+
+
+def roster_cell_error(
+    org_id: int,
+    version: Any | None,
+    staff_id: int,
+    shift: Any,
+    day_str: str,
+    ignore_assignment_id: int | None = None,
+) -> str | None:
+    """Translation key of the reason a staff member cannot take a shift on a day, None when they can."""
+    if Staff.query.filter_by(id=staff_id, org_id=org_id, active=1).first() is None:
+        return "msg_staff_member_not_found"
+    blocked = (
+        StaffAvailability.query.filter(
+            StaffAvailability.org_id == org_id,
+            StaffAvailability.staff_id == staff_id,
+            StaffAvailability.status.in_(["leave", "unavailable"]),
+            StaffAvailability.start_date <= day_str,
+            StaffAvailability.end_date >= day_str,
+        ).first()
+        is not None
+    )
+    if blocked:
+        return "msg_staff_unavailable_on_date"
+    if version is None:
+        return None
+    overlap_query = (
+        db.session.query(RosterAssignment.id)
+        .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+        .filter(
+            RosterAssignment.org_id == org_id,
+            RosterAssignment.version_id == version.id,
+            ShiftTemplate.org_id == org_id,
+            RosterAssignment.staff_id == staff_id,
+            RosterAssignment.roster_date == day_str,
+            shift.start_time < ShiftTemplate.end_time,
+            ShiftTemplate.start_time < shift.end_time,
+        )
+    )
+    if ignore_assignment_id is not None:
+        overlap_query = overlap_query.filter(RosterAssignment.id != ignore_assignment_id)
+    if overlap_query.first() is not None:
+        return "msg_shift_overlap"
+    return None
+
+
+def roster_cell_payload(
+    org_id: int,
+    version: Any,
+    cells: Iterable[tuple[int, str]],
+    roster_date: str,
+) -> dict[str, Any]:
+    """Rendered (staff id, date) grid cells of a version plus the fill of every shift on their dates."""
+    cells = sorted(set(cells))
+    dates = sorted({day_str for _, day_str in cells})
+    shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
+    coverage = CoverageMatrix(
+        sorted({staff_id for staff_id, _ in cells}),
+        dates,
+        [shift_window(row) for row in shift_rows],
+    )
+    for assignment_id, day_str, staff_id, shift_id, auto in load_version_assignments(version):
+        coverage.add(staff_id, day_str, shift_id, assignment_id, auto=auto)
+    shift_names = {row.id: row.name for row in shift_rows}
+    fill = []
+    for day_str in dates:
+        for row in shift_rows:
+            count = coverage.shift_fill(day_str, row.id)
+            fill.append(
+                {
+                    "date": day_str,
+                    "shift_id": row.id,
+                    "count": count,
+                    "required_staff": row.required_staff,
+                    "level": coverage_level(count, row.required_staff),
+                }
+            )
+    return {
+        "version_id": version.id,
+        "cells": [
+            {
+                "staff_id": staff_id,
+                "date": day_str,
+                "html": render_template(
+                    "pages/roster/cell.html",
+                    coverage=coverage,
+                    staff_id=staff_id,
+                    day_str=day_str,
+                    current_version=version,
+                    shift_names=shift_names,
+                    selected_date=roster_date,
+                ),
+            }
+            for staff_id, day_str in cells
+        ],
+        "fill": fill,
+    }
+
+
 @app.route("/roster", methods=["GET", "POST"])
 @login_required
 def roster() -> str:
@@ -1217,37 +2395,15 @@ def roster() -> str:
             selected_obj = week_start_obj
             selected_date = selected_obj.isoformat()
 
-    confirmed_versions = (
-        RosterVersion.query.filter_by(org_id=org_id, week_start=week_start_obj, status="confirmed")
-        .order_by(RosterVersion.confirmed_at.desc(), RosterVersion.id.desc())
-        .all()
-    )
-    draft_versions = (
-        RosterVersion.query.filter_by(org_id=org_id, week_start=week_start_obj, status="draft")
-        .order_by(RosterVersion.created_at.desc(), RosterVersion.id.desc())
-        .all()
-    )
-    version_list = [*confirmed_versions, *draft_versions]
-
-    default_version = (confirmed_versions[0] if confirmed_versions else None) or (
-        draft_versions[0] if draft_versions else None
-    )
+    today_obj = date.today()
+    week_versions = load_roster_week_versions(org_id, week_start_obj, today_obj)
+    version_list = [*week_versions["confirmed_versions"], *week_versions["draft_versions"]]
+    default_version = week_versions["default_version"]
     if current_version is None:
         current_version = default_version
 
-    today_obj = date.today()
-    current_month_start, current_month_end = month_bounds(today_obj)
-    confirmed_month_versions_rows = (
-        RosterVersion.query.filter(
-            RosterVersion.org_id == org_id,
-            RosterVersion.status == "confirmed",
-            RosterVersion.week_start.between(current_month_start, current_month_end),
-        )
-        .order_by(RosterVersion.week_start.asc(), RosterVersion.id.asc())
-        .all()
-    )
     confirmed_month_versions = []
-    for version in confirmed_month_versions_rows:
+    for version in week_versions["month_confirmed_versions"]:
         week_end_value = version.week_start + timedelta(days=6)
         confirmed_month_versions.append(
             {
@@ -1328,9 +2484,15 @@ def roster() -> str:
                     )
                 )
 
-            staff_member = Staff.query.filter_by(id=staff_id_int, org_id=org_id, active=1).first()
-            if staff_member is None:
-                flash(t("msg_staff_member_not_found"), "error")
+            error_key = roster_cell_error(
+                org_id,
+                current_version if current_version is not None and current_version.status == "draft" else None,
+                staff_id_int,
+                target_shift,
+                selected_date,
+            )
+            if error_key is not None:
+                flash(t(error_key), "error")
                 return redirect(
                     url_for(
                         "roster",
@@ -1338,82 +2500,39 @@ def roster() -> str:
                         version_id=current_version.id if version_id_raw and current_version else None,
                     )
                 )
+            if current_version is None or current_version.status != "draft":
+                current_version = RosterVersion(
+                    org_id=org_id,
+                    week_start=week_start_obj,
+                    status="draft",
+                )
+                db.session.add(current_version)
+                db.session.flush()
 
-            blocked = (
-                StaffAvailability.query.filter(
-                    StaffAvailability.org_id == org_id,
-                    StaffAvailability.staff_id == staff_id_int,
-                    StaffAvailability.status.in_(["leave", "unavailable"]),
-                    StaffAvailability.start_date <= selected_date,
-                    StaffAvailability.end_date >= selected_date,
-                ).first()
-                is not None
-            )
-            if blocked:
-                flash(t("msg_staff_unavailable_on_date"), "error")
-            else:
-                if current_version is None or current_version.status != "draft":
-                    current_version = RosterVersion(
+            try:
+                db.session.add(
+                    RosterAssignment(
                         org_id=org_id,
-                        week_start=week_start_obj,
-                        status="draft",
-                    )
-                    db.session.add(current_version)
-                    db.session.flush()
-
-                overlap = (
-                    db.session.query(RosterAssignment.id)
-                    .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
-                    .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
-                    .filter(
-                        RosterAssignment.org_id == org_id,
-                        RosterAssignment.version_id == current_version.id,
-                        RosterVersion.org_id == org_id,
-                        RosterVersion.week_start == week_start_obj,
-                        ShiftTemplate.org_id == org_id,
-                        RosterAssignment.staff_id == staff_id_int,
-                        RosterAssignment.roster_date == selected_date,
-                        target_shift.start_time < ShiftTemplate.end_time,
-                        ShiftTemplate.start_time < target_shift.end_time,
+                        version_id=current_version.id,
+                        roster_date=selected_date,
+                        staff_id=staff_id_int,
+                        shift_id=shift_id_int,
+                        notes=notes or None,
                     )
-                    .first()
                 )
-                if overlap:
-                    flash(t("msg_shift_overlap"), "error")
-                    return redirect(
-                        url_for(
-                            "roster",
-                            roster_date=selected_date,
-                            version_id=current_version.id if version_id_raw and current_version else None,
-                        )
-                    )
-
-                try:
-                    db.session.add(
-                        RosterAssignment(
-                            org_id=org_id,
-                            version_id=current_version.id,
-                            roster_date=selected_date,
-                            staff_id=staff_id_int,
-                            shift_id=shift_id_int,
-                            notes=notes or None,
-                        )
-                    )
-                    db.session.commit()
-                    flash(t("msg_assignment_added"), "success")
-                    return redirect(
-                        url_for(
-                            "roster",
-                            roster_date=selected_date,
-                            version_id=current_version.id if version_id_raw and current_version else None,
-                        )
+                touch_roster_version(current_version)
+                db.session.commit()
+                flash(t("msg_assignment_added"), "success")
+                return redirect(
+                    url_for(
+                        "roster",
+                        roster_date=selected_date,
+                        version_id=current_version.id if version_id_raw and current_version else None,
                     )
-                except IntegrityError:
-                    db.session.rollback()
-                    flash(t("msg_assignment_duplicate"), "error")
-
-    staff_rows = Staff.query.filter_by(org_id=org_id, active=1).order_by(Staff.name).all()
-    shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
+                )
+            except IntegrityError:
+                db.session.rollback()
+                flash(t("msg_assignment_duplicate"), "error")
 
     week_columns = [
         {
@@ -1430,82 +2549,21 @@ def roster() -> str:
         and default_version is not None
         and current_version.id != default_version.id
     )
-    assignments: list[dict[str, Any]] = []
-    if current_version is not None:
-        assignment_rows = (
-            db.session.query(
-                RosterAssignment.id,
-                RosterAssignment.roster_date,
-                RosterAssignment.staff_id,
-                RosterAssignment.shift_id,
-                RosterAssignment.notes,
-                Staff.name.label("staff_name"),
-                Staff.role.label("staff_role"),
-                ShiftTemplate.name.label("shift_name"),
-                ShiftTemplate.start_time,
-                ShiftTemplate.end_time,
-            )
-            .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
-            .join(Staff, Staff.id == RosterAssignment.staff_id)
-            .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
-            .filter(
-                RosterAssignment.org_id == org_id,
-                RosterVersion.org_id == org_id,
-                RosterVersion.week_start == week_start_obj,
-                RosterAssignment.version_id == current_version.id,
-                Staff.org_id == org_id,
-                ShiftTemplate.org_id == org_id,
-                RosterAssignment.roster_date.between(week_dates[0], week_dates[-1]),
-            )
-            .order_by(RosterAssignment.roster_date, ShiftTemplate.start_time, Staff.name)
-            .all()
-        )
-        assignments = [
-            {
-                "id": row.id,
-                "roster_date": row.roster_date,
-                "staff_id": row.staff_id,
-                "shift_id": row.shift_id,
-                "notes": row.notes,
-                "staff_name": row.staff_name,
-                "staff_role": row.staff_role,
-                "shift_name": row.shift_name,
-                "start_time": row.start_time,
-                "end_time": row.end_time,
-            }
-            for row in assignment_rows
-        ]
-
-    assignments_by_staff_and_day: dict[int, dict[str, list[dict[str, Any]]]] = {
-        row.id: {day_value: [] for day_value in week_dates}
-        for row in staff_rows
-    }
-    for row in assignments:
-        staff_entry = assignments_by_staff_and_day.get(row["staff_id"])
-        if staff_entry is None:
-            continue
-        if row["roster_date"] not in staff_entry:
-            continue
-        staff_entry[row["roster_date"]].append(row)
-
-    editable_assignment_map: dict[int, dict[str, int]] = {
-        row.id: {day_value: 0 for day_value in week_dates}
-        for row in staff_rows
-    }
-    multi_assignment_cell_keys: set[str] = set()
-    for row in assignments:
-        staff_entry = editable_assignment_map.get(row["staff_id"])
-        if staff_entry is None:
-            continue
-        roster_date_value = row["roster_date"]
-        if roster_date_value not in staff_entry:
-            continue
-        if staff_entry[roster_date_value] == 0:
-            staff_entry[roster_date_value] = int(row["shift_id"])
-        elif staff_entry[roster_date_value] != int(row["shift_id"]):
-            multi_assignment_cell_keys.add(f"{row['staff_id']}_{roster_date_value}")
+    grid = load_roster_week_grid(
+        org_id,
+        week_dates,
+        current_version,
+        department=request.args.get("department", "").strip() or None,
+        page=parse_page(request.args.get("page")),
+        page_size=int(app.config.get("ROSTER_PAGE_SIZE", 0)),
+    )
+    dirty_cell_count = (
+        week_versions["dirty_counts"].get(current_version.id, 0)
+        if current_version is not None and current_version.status == "draft"
+        else 0
+    )
 
-    return render_template(
+    return render_page(
         "roster.html",
         selected_date=selected_date,
         week_start=week_start_obj.isoformat(),
@@ -1515,17 +2573,39 @@ def roster() -> str:
         current_version=current_version,
         version_list=version_list,
         is_historical_view=is_historical_view,
-        staff_rows=staff_rows,
-        shift_rows=shift_rows,
-        assignments=assignments,
-        assignments_by_staff_and_day=assignments_by_staff_and_day,
+        staff_rows=grid["staff_rows"],
+        assign_staff_rows=(
+            grid["staff_rows"]
+            if grid["page_count"] == 1 and not grid["department"]
+            else Staff.query.filter_by(org_id=org_id, active=1).order_by(Staff.name).all()
+        ),
+        shift_rows=grid["shift_rows"],
+        shift_names={row.id: row.name for row in grid["shift_rows"]},
+        shift_options=[
+            {"id": row.id, "label": f"{row.name} ({row.start_time}-{row.end_time})"} for row in grid["shift_rows"]
+        ],
+        coverage=grid["coverage"],
+        coverage_level=coverage_level,
+        grid=grid,
         confirmed_month_versions=confirmed_month_versions,
         edit_confirmed_mode=edit_confirmed_mode,
-        editable_assignment_map=editable_assignment_map,
-        multi_assignment_cell_keys=multi_assignment_cell_keys,
+        max_auto_schedule_weeks=MAX_AUTO_SCHEDULE_WEEKS,
+        dirty_cell_count=dirty_cell_count,
     )
 
 
+def parse_schedule_weeks(raw: str) -> int:
+    try:
+        return min(MAX_AUTO_SCHEDULE_WEEKS, max(1, int((raw or "1").strip())))
+    except ValueError:
+        return 1
+
+
+def parse_schedule_mode(raw: str) -> str:
+    mode = (raw or "").strip().lower()
+    return mode if mode in SCHEDULE_MODES else "greedy"
+
+
 @app.post("/roster/auto-schedule")
 @login_required
 def auto_schedule() -> Any:
@@ -1534,15 +2614,27 @@ def auto_schedule() -> Any:
     if week_start is None:
         flash(t("msg_invalid_week_start_date"), "error")
         return redirect(url_for("roster"))
+    weeks = parse_schedule_weeks(request.form.get("weeks", ""))
+    mode = parse_schedule_mode(request.form.get("mode", ""))
 
     try:
-        added, unfilled, ran = auto_schedule_week(week_start)
+        added, unfilled, ran = auto_schedule_weeks(current_org_id(), week_start, weeks, mode=mode)
     except IntegrityError:
         db.session.rollback()
         flash(t("msg_auto_schedule_duplicate"), "error")
         return redirect(url_for("roster", roster_date=week_start.isoformat()))
     if ran == 0:
         flash(t("msg_auto_schedule_requirements"), "error")
+    elif ran > 1:
+        flash(
+            t("msg_auto_schedule_batch_completed").format(
+                weeks=ran,
+                week_start=format_date(week_start),
+                added=added,
+                unfilled=unfilled,
+            ),
+            "success",
+        )
     else:
         flash(
             t("msg_auto_schedule_completed").format(
@@ -1555,19 +2647,114 @@ def auto_schedule() -> Any:
     return redirect(url_for("roster", roster_date=week_start.isoformat()))
 
 
-@app.post("/roster/confirm/<int:version_id>")
+@app.post("/roster/auto-schedule/jobs")
 @login_required
-def confirm_roster_version(version_id: int) -> Any:
+def create_schedule_job() -> Any:
     org_id = current_org_id()
-    deleted_version_ids: list[int] = []
+    week_start = parse_iso_date(request.form.get("week_start", ""))
+    if week_start is None:
+        return jsonify({"error": t("msg_invalid_week_start_date")}), 400
+    weeks = parse_schedule_weeks(request.form.get("weeks", ""))
+    mode = parse_schedule_mode(request.form.get("mode", ""))
+
     now_utc = datetime.utcnow()
-    roster_date = request.form.get("roster_date", "").strip()
+    active_job = next(
+        (
+            job
+            for job in ScheduleJob.query.filter(
+                ScheduleJob.org_id == org_id,
+                ScheduleJob.status.in_(["queued", "running"]),
+            ).order_by(ScheduleJob.id.desc())
+            if not schedule_job_orphaned(job, now_utc)
+        ),
+        None,
+    )
+    if active_job is not None:
+        return jsonify({"error": t("msg_auto_schedule_job_running"), "job": schedule_job_payload(active_job)}), 409
+
+    job = ScheduleJob(
+        org_id=org_id,
+        week_start=week_start,
+        weeks=weeks,
+        mode=mode,
+        status="queued",
+        days_total=7 * weeks,
+        worker=schedule_job_worker(),
+        created_at=now_utc,
+        heartbeat_at=now_utc,
+    )
+    db.session.add(job)
+    db.session.commit()
+    schedule_job_executor.submit(run_schedule_job, job.id)
 
-    try:
-        version = RosterVersion.query.filter_by(id=version_id, org_id=org_id).first()
-        if version is None:
-            if request.is_json or request.args.get("format") == "json":
-                return jsonify({"error": "Roster version not found."}), 404
+    payload = schedule_job_payload(job)
+    payload["status_url"] = url_for("schedule_job_status", job_id=job.id)
+    return jsonify(payload), 202
+
+
+@app.get("/roster/auto-schedule/jobs/<int:job_id>")
+@login_required
+def schedule_job_status(job_id: int) -> Any:
+    job = ScheduleJob.query.filter_by(id=job_id, org_id=current_org_id()).first()
+    if job is None:
+        return jsonify({"error": "Schedule job not found."}), 404
+    return jsonify(schedule_job_payload(job)), 200
+
+
+def parse_schedule_overlay(data: dict[str, Any], org_id: int) -> ScheduleOverlay | None:
+    """Validate what-if changes from a JSON body; returns None when any entry is invalid."""
+    shift_ids = {
+        shift_id for (shift_id,) in db.session.query(ShiftTemplate.id).filter(ShiftTemplate.org_id == org_id)
+    }
+    staff_ids = {staff_id for (staff_id,) in db.session.query(Staff.id).filter(Staff.org_id == org_id)}
+    overlay = ScheduleOverlay()
+    try:
+        for shift_id_raw, required_raw in (data.get("required_staff") or {}).items():
+            shift_id = int(shift_id_raw)
+            required_staff = int(required_raw)
+            if shift_id not in shift_ids or required_staff < 0:
+                return None
+            overlay.required_staff[shift_id] = required_staff
+        for item in data.get("leave") or []:
+            staff_id = int(item.get("staff_id"))
+            start_date = parse_iso_date(str(item.get("start_date") or ""))
+            end_date = parse_iso_date(str(item.get("end_date") or item.get("start_date") or ""))
+            if staff_id not in staff_ids or start_date is None or end_date is None or end_date < start_date:
+                return None
+            overlay.leave.append((staff_id, start_date.isoformat(), end_date.isoformat()))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return overlay
+
+
+@app.post("/roster/auto-schedule/what-if")
+@login_required
+def simulate_auto_schedule() -> Any:
+    org_id = current_org_id()
+    data = request.get_json(silent=True) or {}
+    week_start = parse_iso_date(str(data.get("week_start") or ""))
+    if week_start is None:
+        return jsonify({"error": t("msg_invalid_week_start_date")}), 400
+    overlay = parse_schedule_overlay(data, org_id)
+    if overlay is None:
+        return jsonify({"error": t("msg_invalid_what_if_changes")}), 400
+    mode = parse_schedule_mode(str(data.get("mode") or ""))
+    return jsonify(simulate_schedule_week(org_id, week_start, overlay, mode=mode)), 200
+
+
+@app.post("/roster/confirm/<int:version_id>")
+@login_required
+def confirm_roster_version(version_id: int) -> Any:
+    org_id = current_org_id()
+    deleted_version_ids: list[int] = []
+    now_utc = datetime.utcnow()
+    roster_date = request.form.get("roster_date", "").strip()
+
+    try:
+        version = RosterVersion.query.filter_by(id=version_id, org_id=org_id).first()
+        if version is None:
+            if request.is_json or request.args.get("format") == "json":
+                return jsonify({"error": "Roster version not found."}), 404
             flash(t("msg_roster_version_not_found"), "error")
             return redirect(url_for("roster", roster_date=roster_date or date.today().isoformat()))
 
@@ -1581,11 +2768,18 @@ def confirm_roster_version(version_id: int) -> Any:
         )
         deleted_version_ids = [row.id for row in other_confirmed_versions]
         for row in other_confirmed_versions:
+            roster_snapshot_cache.invalidate(org_id, row.id)
             db.session.delete(row)
 
         version.status = "confirmed"
         version.confirmed_at = now_utc
         version.updated_at = now_utc
+        RosterDirtyCell.query.filter_by(org_id=org_id, version_id=version.id).delete(synchronize_session=False)
+        if deleted_version_ids:
+            drop_payroll_ledger(org_id, deleted_version_ids)
+        db.session.flush()
+        refresh_staff_week_history(org_id, version)
+        refresh_payroll_ledger(org_id, version)
         db.session.commit()
 
         payload = {
@@ -1613,6 +2807,50 @@ def confirm_roster_version(version_id: int) -> Any:
         return redirect(url_for("roster", roster_date=roster_date or date.today().isoformat()))
 
 
+def diff_roster_override(
+    existing_rows: Iterable[Any],
+    submitted_cells: dict[tuple[int, str], int],
+    editable_staff_ids: set[int],
+) -> dict[str, list[dict[str, Any]]]:
+    """Inserts, updates and deletes turning a version's assignments into the submitted grid.
+
+    ``submitted_cells`` maps every editable (staff id, date) cell to its shift
+    id, 0 for an empty cell. A cell keeps the row already holding the submitted
+    shift, otherwise reuses one of its rows for the new shift; every other row
+    of an editable staff member is deleted. Rows of staff outside the grid are
+    left alone.
+    """
+    rows_by_cell: dict[tuple[int, str], list[Any]] = {}
+    for row in existing_rows:
+        if row.staff_id in editable_staff_ids:
+            rows_by_cell.setdefault((row.staff_id, str(row.roster_date)), []).append(row)
+
+    diff: dict[str, list[dict[str, Any]]] = {"inserted": [], "updated": [], "deleted": []}
+    for (staff_id, day_str), shift_id in submitted_cells.items():
+        rows = sorted(rows_by_cell.pop((staff_id, day_str), []), key=lambda row: row.id)
+        kept = next((row for row in rows if row.shift_id == shift_id), None)
+        if kept is None and shift_id and rows:
+            kept = rows[0]
+            diff["updated"].append(
+                {
+                    "assignment_id": kept.id,
+                    "staff_id": staff_id,
+                    "date": day_str,
+                    "from_shift_id": kept.shift_id,
+                    "shift_id": shift_id,
+                }
+            )
+        elif kept is None and shift_id:
+            diff["inserted"].append({"staff_id": staff_id, "date": day_str, "shift_id": shift_id})
+        rows_by_cell[(staff_id, day_str)] = [row for row in rows if row is not kept]
+    for (staff_id, day_str), rows in rows_by_cell.items():
+        diff["deleted"].extend(
+            {"assignment_id": row.id, "staff_id": staff_id, "date": day_str, "shift_id": row.shift_id}
+            for row in rows
+        )
+    return diff
+
+
 @app.post("/roster/confirmed/<int:version_id>/override")
 @login_required
 def confirm_confirmed_roster_override(version_id: int) -> Any:
@@ -1636,13 +2874,18 @@ def confirm_confirmed_roster_override(version_id: int) -> Any:
     week_end_obj = week_start_obj + timedelta(days=6)
     week_dates = each_date(week_start_obj, week_end_obj)
 
+    # The grid is paginated, so only staff whose cells were posted are edited.
     staff_rows = Staff.query.filter_by(org_id=org_id, active=1).order_by(Staff.name).all()
-    staff_ids = [row.id for row in staff_rows]
+    staff_ids = [
+        row.id
+        for row in staff_rows
+        if any(f"assignment_{row.id}_{day_value}" in request.form for day_value in week_dates)
+    ]
     editable_staff_ids = set(staff_ids)
     shift_rows = ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.start_time).all()
     shift_ids = {row.id for row in shift_rows}
 
-    submitted_assignments: list[tuple[int, str, int]] = []
+    submitted_cells: dict[tuple[int, str], int] = {}
     for staff_id in staff_ids:
         for day_value in week_dates:
             field_name = f"assignment_{staff_id}_{day_value}"
@@ -1661,9 +2904,7 @@ def confirm_confirmed_roster_override(version_id: int) -> Any:
                 )
 
             # "0" means no assignment for that cell (absent/no-show equivalent).
-            if selected_shift_id == 0:
-                continue
-            if selected_shift_id not in shift_ids:
+            if selected_shift_id != 0 and selected_shift_id not in shift_ids:
                 flash(t("msg_shift_not_found"), "error")
                 return redirect(
                     url_for(
@@ -1673,58 +2914,183 @@ def confirm_confirmed_roster_override(version_id: int) -> Any:
                         edit_confirmed=1,
                     )
                 )
-            submitted_assignments.append((staff_id, day_value, selected_shift_id))
+            submitted_cells[(staff_id, day_value)] = selected_shift_id
 
     try:
-        existing_assignments = RosterAssignment.query.filter_by(
-            org_id=org_id,
-            version_id=version.id,
-        ).all()
-        preserved_assignments = [
-            row
-            for row in existing_assignments
-            if row.staff_id not in editable_staff_ids
-        ]
-
-        RosterAssignment.query.filter_by(org_id=org_id, version_id=version.id).delete(synchronize_session=False)
-        for row in preserved_assignments:
-            db.session.add(
-                RosterAssignment(
-                    org_id=org_id,
-                    version_id=version.id,
-                    roster_date=row.roster_date,
-                    staff_id=row.staff_id,
-                    shift_id=row.shift_id,
-                    notes=row.notes,
-                )
+        existing_assignments = (
+            db.session.query(
+                RosterAssignment.id,
+                RosterAssignment.roster_date,
+                RosterAssignment.staff_id,
+                RosterAssignment.shift_id,
             )
-        for staff_id, roster_date_value, shift_id in submitted_assignments:
-            db.session.add(
-                RosterAssignment(
-                    org_id=org_id,
-                    version_id=version.id,
-                    roster_date=roster_date_value,
-                    staff_id=staff_id,
-                    shift_id=shift_id,
-                    notes=None,
-                )
+            .filter(RosterAssignment.org_id == org_id, RosterAssignment.version_id == version.id)
+            .all()
+        )
+        diff = diff_roster_override(existing_assignments, submitted_cells, editable_staff_ids)
+        if diff["deleted"]:
+            RosterAssignment.query.filter(
+                RosterAssignment.id.in_([item["assignment_id"] for item in diff["deleted"]])
+            ).delete(synchronize_session=False)
+        if diff["updated"]:
+            db.session.execute(
+                update(RosterAssignment),
+                [
+                    {"id": item["assignment_id"], "shift_id": item["shift_id"], "notes": None}
+                    for item in diff["updated"]
+                ],
             )
-        version.updated_at = datetime.utcnow()
+        bulk_insert_assignments(
+            [
+                {
+                    "org_id": org_id,
+                    "version_id": version.id,
+                    "roster_date": item["date"],
+                    "staff_id": item["staff_id"],
+                    "shift_id": item["shift_id"],
+                    "notes": None,
+                }
+                for item in diff["inserted"]
+            ]
+        )
+        if any(diff.values()):
+            touch_roster_version(version)
+            db.session.flush()
+            refresh_staff_week_history(org_id, version)
+            refresh_payroll_ledger(org_id, version)
         db.session.commit()
-        flash(t("msg_confirmed_roster_override_saved"), "success")
     except IntegrityError:
         db.session.rollback()
+        if request.is_json or request.args.get("format") == "json":
+            return jsonify({"error": "Unable to save confirmed roster changes."}), 409
         flash(t("msg_roster_confirm_failed"), "error")
+    else:
+        if request.is_json or request.args.get("format") == "json":
+            return jsonify({"version_id": version.id, **diff}), 200
+        flash(t("msg_confirmed_roster_override_saved"), "success")
 
     return redirect(
         url_for(
             "roster",
             roster_date=week_start_obj.isoformat(),
             version_id=version.id,
+            department=request.form.get("department") or None,
+            page=request.form.get("page") or None,
         )
     )
 
 
+@app.post("/roster/refill/<int:version_id>")
+@login_required
+def refill_roster_version(version_id: int) -> Any:
+    org_id = current_org_id()
+    version = RosterVersion.query.filter_by(id=version_id, org_id=org_id).first()
+    if version is None:
+        abort(404)
+    if version.status != "draft":
+        abort(403)
+
+    try:
+        cells, added, unfilled = refill_dirty_cells(org_id, version)
+    except IntegrityError:
+        db.session.rollback()
+        flash(t("msg_auto_schedule_duplicate"), "error")
+        return redirect(url_for("roster", roster_date=version.week_start.isoformat()))
+    flash(t("msg_refill_completed").format(cells=cells, added=added, unfilled=unfilled), "success")
+    return redirect(url_for("roster", roster_date=version.week_start.isoformat()))
+
+
+MAX_CLONE_WEEK_OFFSET = 52
+
+
+def shifted_roster_date(column: Any, days: int) -> Any:
+    """SQL expression for an ISO date text column moved by ``days`` days."""
+    if db.engine.dialect.name.lower() == "sqlite":
+        return func.date(column, f"{days:+d} days")
+    return func.to_char(cast(column, Date) + days, "YYYY-MM-DD")
+
+
+def clone_roster_version(org_id: int, source: Any, weeks: int) -> tuple[Any, int]:
+    """Copy a version ``weeks`` weeks forward (or back) into a new draft; returns (draft, rows copied).
+
+    Runs as one INSERT ... SELECT. Assignments of inactive staff and of staff
+    on leave or unavailable on the shifted date are left out by the query.
+    """
+    days = 7 * weeks
+    draft = RosterVersion(org_id=org_id, week_start=source.week_start + timedelta(days=days), status="draft")
+    db.session.add(draft)
+    db.session.flush()
+
+    source_row = RosterAssignment.__table__.alias("source_row")
+    shifted_date = shifted_roster_date(source_row.c.roster_date, days)
+    blocked = (
+        select(StaffAvailability.id)
+        .where(
+            StaffAvailability.org_id == org_id,
+            StaffAvailability.staff_id == source_row.c.staff_id,
+            StaffAvailability.status.in_(["leave", "unavailable"]),
+            StaffAvailability.start_date <= shifted_date,
+            StaffAvailability.end_date >= shifted_date,
+        )
+        .exists()
+    )
+    rows = (
+        select(
+            source_row.c.org_id,
+            literal(draft.id),
+            shifted_date,
+            source_row.c.staff_id,
+            source_row.c.shift_id,
+            source_row.c.notes,
+        )
+        .join(Staff, Staff.id == source_row.c.staff_id)
+        .where(
+            source_row.c.org_id == org_id,
+            source_row.c.version_id == source.id,
+            Staff.active == 1,
+            ~blocked,
+        )
+    )
+    copied = db.session.execute(
+        insert(RosterAssignment.__table__).from_select(
+            ["org_id", "version_id", "roster_date", "staff_id", "shift_id", "notes"],
+            rows,
+        )
+    ).rowcount
+    return draft, copied or 0
+
+
+@app.post("/roster/clone/<int:version_id>")
+@login_required
+def clone_roster_week(version_id: int) -> Any:
+    org_id = current_org_id()
+    source = RosterVersion.query.filter_by(id=version_id, org_id=org_id).first()
+    if source is None:
+        abort(404)
+    try:
+        weeks = int(request.form.get("weeks", "1").strip() or "1")
+    except ValueError:
+        weeks = 0
+    if weeks == 0 or abs(weeks) > MAX_CLONE_WEEK_OFFSET:
+        flash(t("msg_invalid_clone_offset"), "error")
+        return redirect(url_for("roster", roster_date=source.week_start.isoformat(), version_id=source.id))
+
+    target_week = source.week_start + timedelta(days=7 * weeks)
+    if RosterVersion.query.filter_by(org_id=org_id, week_start=target_week, status="draft").first() is not None:
+        flash(t("msg_clone_target_has_draft").format(week=format_date(target_week)), "error")
+        return redirect(url_for("roster", roster_date=target_week.isoformat()))
+
+    try:
+        draft, copied = clone_roster_version(org_id, source, weeks)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        flash(t("msg_roster_clone_failed"), "error")
+        return redirect(url_for("roster", roster_date=source.week_start.isoformat(), version_id=source.id))
+    flash(t("msg_roster_cloned").format(count=copied, week=format_date(target_week)), "success")
+    return redirect(url_for("roster", roster_date=target_week.isoformat(), version_id=draft.id))
+
+
 @app.post("/roster/discard/<int:version_id>")
 @login_required
 def discard_roster_version(version_id: int) -> Any:
@@ -1741,6 +3107,8 @@ def discard_roster_version(version_id: int) -> Any:
             org_id=org_id,
             version_id=version.id,
         ).delete(synchronize_session=False)
+        RosterDirtyCell.query.filter_by(org_id=org_id, version_id=version.id).delete(synchronize_session=False)
+        roster_snapshot_cache.invalidate(org_id, version.id)
         db.session.delete(version)
         db.session.commit()
     except SQLAlchemyError:
@@ -1771,12 +3139,402 @@ def delete_assignment(assignment_id: int) -> Any:
         abort(403)
 
     target_date = roster_date or assignment.version.week_start.isoformat()
+    mark_dirty_cells(org_id, [(assignment.version_id, assignment.roster_date, assignment.shift_id)])
+    touch_roster_version(assignment.version)
     db.session.delete(assignment)
     db.session.commit()
     flash(t("msg_assignment_removed"), "success")
     return redirect(url_for("roster", roster_date=target_date))
 
 
+@app.post("/roster/cells")
+@login_required
+def edit_roster_cell() -> Any:
+    """Assign, unassign or move one draft assignment and return only the cells it changed.
+
+    Takes the same checks as the roster form and delete button, so the grid
+    can be patched in place instead of reloading the whole week.
+    """
+    org_id = current_org_id()
+    data = request.get_json(silent=True) or {}
+    action = str(data.get("action") or "").strip().lower()
+    if action not in {"assign", "unassign", "move"}:
+        return jsonify({"error": t("msg_invalid_cell_edit")}), 400
+    try:
+        assignment_id = int(data.get("assignment_id") or 0)
+        staff_id = int(data.get("staff_id") or 0)
+        shift_id = int(data.get("shift_id") or 0)
+        version_id = int(data.get("version_id") or 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": t("msg_invalid_staff_or_shift")}), 400
+    roster_date = parse_iso_date(str(data.get("roster_date") or ""))
+
+    source = None
+    if action == "assign":
+        if roster_date is None:
+            return jsonify({"error": t("msg_invalid_cell_edit")}), 400
+        if version_id:
+            version = RosterVersion.query.filter_by(id=version_id, org_id=org_id).first()
+            if version is None:
+                return jsonify({"error": t("msg_roster_version_not_found")}), 404
+            if version.status != "draft":
+                return jsonify({"error": t("msg_confirmed_read_only")}), 403
+        else:
+            version = None
+    else:
+        source = (
+            RosterAssignment.query.join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
+            .filter(
+                RosterAssignment.id == assignment_id,
+                RosterAssignment.org_id == org_id,
+                RosterVersion.org_id == org_id,
+            )
+            .first()
+        )
+        if source is None:
+            return jsonify({"error": t("msg_assignment_not_found")}), 404
+        version = source.version
+        if version.status != "draft":
+            return jsonify({"error": t("msg_confirmed_read_only")}), 403
+        staff_id = staff_id or source.staff_id
+        shift_id = shift_id or source.shift_id
+        roster_date = roster_date or parse_iso_date(str(source.roster_date))
+
+    changed_cells = []
+    if source is not None:
+        changed_cells.append((source.staff_id, str(source.roster_date)))
+        mark_dirty_cells(org_id, [(version.id, source.roster_date, source.shift_id)])
+
+    if action == "unassign":
+        db.session.delete(source)
+        message = t("msg_assignment_removed")
+    else:
+        day_str = roster_date.isoformat()
+        if version is not None and not version.week_start <= roster_date <= version.week_start + timedelta(days=6):
+            db.session.rollback()
+            return jsonify({"error": t("msg_date_outside_version_week")}), 400
+        target_shift = ShiftTemplate.query.filter_by(id=shift_id, org_id=org_id).first()
+        if target_shift is None:
+            db.session.rollback()
+            return jsonify({"error": t("msg_shift_not_found")}), 404
+        if version is None:
+            version = get_or_create_draft_version(org_id, monday_for(roster_date))
+        error_key = roster_cell_error(
+            org_id,
+            version,
+            staff_id,
+            target_shift,
+            day_str,
+            ignore_assignment_id=source.id if source is not None else None,
+        )
+        if error_key is not None:
+            db.session.rollback()
+            return jsonify({"error": t(error_key)}), 409
+        if source is None:
+            db.session.add(
+                RosterAssignment(
+                    org_id=org_id,
+                    version_id=version.id,
+                    roster_date=day_str,
+                    staff_id=staff_id,
+                    shift_id=shift_id,
+                    notes=str(data.get("notes") or "").strip() or None,
+                )
+            )
+            message = t("msg_assignment_added")
+        else:
+            source.staff_id = staff_id
+            source.shift_id = shift_id
+            source.roster_date = day_str
+            if source.notes == AUTO_SCHEDULED_NOTE:
+                source.notes = None
+            message = t("msg_assignment_moved")
+        changed_cells.append((staff_id, day_str))
+
+    touch_roster_version(version)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": t("msg_assignment_duplicate")}), 409
+
+    payload = roster_cell_payload(org_id, version, changed_cells, str(data.get("roster_date") or ""))
+    payload["message"] = message
+    return jsonify(payload), 200
+
+
+PAYROLL_CURSOR_BATCH = 1000
+
+
+def staff_sort_key(row: Any) -> tuple[str, int]:
+    """Payroll and export order of staff: name folded by Python, then id.
+
+    SQL lower() leaves non-ASCII letters such as Đ unfolded on SQLite, so the
+    order is decided here and handed to queries through staff_position_sql.
+    """
+    return str(row.name or "").lower(), row.id
+
+
+def staff_position_sql(column: Any, staff_ids: list[int]) -> Any:
+    """SQL expression for the index of a staff id in ``staff_ids``, to order rows as that list."""
+    return case(
+        {staff_id: position for position, staff_id in enumerate(staff_ids)},
+        value=column,
+        else_=len(staff_ids),
+    )
+
+
+def time_minutes_sql(column: Any) -> Any:
+    """SQL expression for the minutes since midnight of an "H:MM" text column."""
+    if db.engine.dialect.name.lower() == "sqlite":
+        colon = func.instr(column, ":")
+        hours = func.substr(column, 1, colon - 1)
+        minutes = func.substr(column, colon + 1)
+    else:
+        hours = func.split_part(column, ":", 1)
+        minutes = func.split_part(column, ":", 2)
+    return cast(hours, Integer) * 60 + cast(minutes, Integer)
+
+
+def shift_centihours_sql(start_column: Any, end_column: Any) -> Any:
+    """SQL twin of shift_centihours: shift length in 0.01 h, overnight shifts wrapped past midnight."""
+    start_minutes = time_minutes_sql(start_column)
+    end_minutes = time_minutes_sql(end_column)
+    duration = case(
+        (end_minutes <= start_minutes, end_minutes + 24 * 60 - start_minutes),
+        else_=end_minutes - start_minutes,
+    )
+    return (duration * 100 + 30) // 60
+
+
+def refresh_payroll_ledger(org_id: int, version: Any) -> None:
+    """Rewrite the payroll ledger of a confirmed version from its assignments in one INSERT ... SELECT."""
+    PayrollLedgerEntry.query.filter_by(org_id=org_id, version_id=version.id).delete(synchronize_session=False)
+    rows = (
+        select(
+            literal(org_id),
+            literal(version.id),
+            RosterAssignment.staff_id,
+            RosterAssignment.roster_date,
+            func.sum(shift_centihours_sql(ShiftTemplate.start_time, ShiftTemplate.end_time)),
+        )
+        .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+        .where(
+            RosterAssignment.org_id == org_id,
+            RosterAssignment.version_id == version.id,
+            ShiftTemplate.org_id == org_id,
+        )
+        .group_by(RosterAssignment.staff_id, RosterAssignment.roster_date)
+    )
+    db.session.execute(
+        insert(PayrollLedgerEntry.__table__).from_select(
+            ["org_id", "version_id", "staff_id", "roster_date", "centihours"],
+            rows,
+        )
+    )
+
+
+def drop_payroll_ledger(org_id: int, version_ids: Iterable[int]) -> None:
+    """Delete the ledger rows of versions that are being deleted."""
+    PayrollLedgerEntry.query.filter(
+        PayrollLedgerEntry.org_id == org_id,
+        PayrollLedgerEntry.version_id.in_(list(version_ids)),
+    ).delete(synchronize_session=False)
+
+
+def confirmed_version_ids_using(org_id: int, *criteria: Any) -> list[int]:
+    """Ids of confirmed versions with an assignment matching ``criteria``, whose ledger a staff or shift change affects."""
+    return [
+        version_id
+        for (version_id,) in db.session.query(RosterAssignment.version_id)
+        .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
+        .filter(
+            RosterAssignment.org_id == org_id,
+            RosterVersion.org_id == org_id,
+            RosterVersion.status == "confirmed",
+            *criteria,
+        )
+        .distinct()
+    ]
+
+
+def rebuild_payroll_ledger(org_id: int, version_ids: Iterable[int]) -> None:
+    """Rewrite the ledger of the given confirmed versions; call once the staff or shift change is flushed."""
+    version_ids = list(version_ids)
+    if not version_ids:
+        return
+    for version in RosterVersion.query.filter(
+        RosterVersion.org_id == org_id,
+        RosterVersion.status == "confirmed",
+        RosterVersion.id.in_(version_ids),
+    ):
+        refresh_payroll_ledger(org_id, version)
+
+
+def backfill_payroll_ledger() -> int:
+    """Write the ledger of confirmed versions that have none yet; run when a process starts.
+
+    Fills versions confirmed before the ledger existed. Confirming,
+    overriding and staff or shift changes keep it current after that, so
+    reads never write. Returns how many versions were filled.
+    """
+    ledgered_version_ids = db.session.query(PayrollLedgerEntry.version_id).distinct()
+    versions = RosterVersion.query.filter(
+        RosterVersion.status == "confirmed",
+        RosterVersion.id.notin_(ledgered_version_ids),
+    ).all()
+    for version in versions:
+        refresh_payroll_ledger(version.org_id, version)
+    db.session.commit()
+    return len(versions)
+
+
+def payroll_hour_rows(
+    org_id: int,
+    staff_ids: list[int],
+    start_date: str,
+    end_date: str,
+    department: str | None,
+    aggregation: str = "sql",
+) -> Iterable[tuple[int, str, int]]:
+    """(staff id, date, centi-hours) of confirmed assignments, in the order of ``staff_ids`` then by date.
+
+    ``aggregation="ledger"`` reads the payroll ledger written when versions are
+    confirmed. ``"sql"`` computes and sums shift lengths per (staff, date)
+    from the assignments in the database; ``"python"`` streams every assignment, prices it from the shift templates
+    and sums each (staff, date) run. All three yield the same rows, which
+    ``flask check-payroll-parity`` verifies against real data.
+    """
+    if not staff_ids:
+        return []
+    if aggregation == "ledger":
+        ledger_query = (
+            db.session.query(
+                PayrollLedgerEntry.staff_id,
+                PayrollLedgerEntry.roster_date,
+                PayrollLedgerEntry.centihours,
+            )
+            .join(Staff, Staff.id == PayrollLedgerEntry.staff_id)
+            .filter(
+                PayrollLedgerEntry.org_id == org_id,
+                Staff.org_id == org_id,
+                PayrollLedgerEntry.roster_date.between(start_date, end_date),
+                PayrollLedgerEntry.staff_id.in_(staff_ids),
+            )
+        )
+        if department:
+            ledger_query = ledger_query.filter(Staff.department == department)
+        return ledger_query.order_by(
+            staff_position_sql(PayrollLedgerEntry.staff_id, staff_ids),
+            PayrollLedgerEntry.roster_date,
+        ).execution_options(yield_per=PAYROLL_CURSOR_BATCH)
+    filters = [
+        RosterAssignment.org_id == org_id,
+        RosterVersion.org_id == org_id,
+        ShiftTemplate.org_id == org_id,
+        Staff.org_id == org_id,
+        RosterVersion.status == "confirmed",
+        RosterAssignment.roster_date.between(start_date, end_date),
+        RosterAssignment.staff_id.in_(staff_ids),
+    ]
+    if department:
+        filters.append(Staff.department == department)
+
+    if aggregation == "sql":
+        return (
+            db.session.query(
+                RosterAssignment.staff_id,
+                RosterAssignment.roster_date,
+                func.sum(shift_centihours_sql(ShiftTemplate.start_time, ShiftTemplate.end_time)),
+            )
+            .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
+            .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+            .join(Staff, Staff.id == RosterAssignment.staff_id)
+            .filter(*filters)
+            .group_by(RosterAssignment.staff_id, RosterAssignment.roster_date)
+            .order_by(staff_position_sql(RosterAssignment.staff_id, staff_ids), RosterAssignment.roster_date)
+            .execution_options(yield_per=PAYROLL_CURSOR_BATCH)
+        )
+
+    shift_hours = {
+        row.id: shift_centihours(str(row.start_time), str(row.end_time))
+        for row in db.session.query(ShiftTemplate.id, ShiftTemplate.start_time, ShiftTemplate.end_time).filter(
+            ShiftTemplate.org_id == org_id
+        )
+    }
+    assignment_rows = (
+        db.session.query(
+            RosterAssignment.staff_id,
+            RosterAssignment.roster_date,
+            RosterAssignment.shift_id,
+        )
+        .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
+        .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+        .join(Staff, Staff.id == RosterAssignment.staff_id)
+        .filter(*filters)
+        .order_by(
+            staff_position_sql(RosterAssignment.staff_id, staff_ids),
+            RosterAssignment.roster_date,
+            ShiftTemplate.start_time,
+        )
+        .execution_options(yield_per=PAYROLL_CURSOR_BATCH)
+    )
+    return (
+        (staff_id, roster_date, sum(shift_hours.get(row.shift_id, 0) for row in rows))
+        for (staff_id, roster_date), rows in groupby(
+            assignment_rows, key=lambda row: (row.staff_id, row.roster_date)
+        )
+    )
+
+
+def iter_payroll_rows(
+    staff_rows: list[Any],
+    hour_rows: Iterable[tuple[int, str, int]],
+    date_columns: list[str],
+    totals_row: dict[str, Any],
+) -> Iterator[dict[str, Any]]:
+    """Yield one payroll row per staff member as its hours stream in.
+
+    ``hour_rows`` are (staff id, date, centi-hours) in the (name, id) order of
+    ``staff_rows``, so each row is complete once the cursor moves past that
+    staff member. Sums stay in integers and become Decimals only in the
+    yielded rows, which also carry the integer ``centihours``, ``wage_cents``
+    and ``salary_cents``. ``totals_row`` holds the grand totals once the
+    iterator is exhausted.
+    """
+    sheet = PayrollSheet(date_columns)
+    positions = {row.id: position for position, row in enumerate(staff_rows)}
+    hour_iter = iter(hour_rows)
+    pending = next(hour_iter, None)
+    for position, staff_row in enumerate(staff_rows):
+        while pending is not None and positions.get(pending[0], -1) <= position:
+            staff_id, roster_date, centihours = pending
+            if staff_id == staff_row.id:
+                sheet.add(str(roster_date), int(centihours or 0))
+            pending = next(hour_iter, None)
+        wage_cents = to_cents(staff_row.hourly_wage) if staff_row.hourly_wage is not None else 0
+        hours, total_hours, total_salary = sheet.close_row(wage_cents)
+        yield {
+            "staff_id": staff_row.id,
+            "staff_name": staff_row.name,
+            "role": staff_row.role,
+            "hours_by_date": {date_key: from_hundredths(value) for date_key, value in zip(date_columns, hours)},
+            "total_hours": from_hundredths(total_hours),
+            "hourly_wage": from_hundredths(wage_cents),
+            "wage_missing": staff_row.hourly_wage is None,
+            "total_salary": from_hundredths(total_salary),
+            "centihours": total_hours,
+            "wage_cents": wage_cents,
+            "salary_cents": total_salary,
+        }
+
+    totals_row["hours_by_date"] = {
+        date_key: from_hundredths(value) for date_key, value in zip(date_columns, sheet.total_by_date)
+    }
+    totals_row["total_hours"] = from_hundredths(sheet.total_hours)
+    totals_row["total_salary"] = from_hundredths(sheet.total_salary)
+
+
 @app.route("/payroll")
 @login_required
 @payroll_access_required
@@ -1835,125 +3593,263 @@ def payroll() -> str | Response:
         staff_query = staff_query.filter(Staff.department == selected_department)
     if selected_staff_id is not None:
         staff_query = staff_query.filter(Staff.id == selected_staff_id)
-    staff_rows = staff_query.order_by(Staff.name).all()
+    staff_rows = sorted(staff_query.all(), key=staff_sort_key)
     staff_ids = [row.id for row in staff_rows]
 
-    payroll_rows: dict[int, dict[str, Any]] = {}
-    total_by_date = {date_key: Decimal("0.00") for date_key in date_columns}
-    grand_total_hours = Decimal("0.00")
-    grand_total_salary = Decimal("0.00")
-
-    for staff_row in staff_rows:
-        wage_value = (
-            Decimal(str(staff_row.hourly_wage)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            if staff_row.hourly_wage is not None
-            else Decimal("0.00")
-        )
-        payroll_rows[staff_row.id] = {
-            "staff_id": staff_row.id,
-            "staff_name": staff_row.name,
-            "role": staff_row.role,
-            "hours_by_date": {date_key: Decimal("0.00") for date_key in date_columns},
-            "total_hours": Decimal("0.00"),
-            "hourly_wage": wage_value,
-            "wage_missing": staff_row.hourly_wage is None,
-            "total_salary": Decimal("0.00"),
-        }
-
-    if staff_ids:
-        assignment_query = (
-            db.session.query(
-                RosterAssignment.staff_id,
-                RosterAssignment.roster_date,
-                ShiftTemplate.start_time,
-                ShiftTemplate.end_time,
-            )
-            .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
-            .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
-            .join(Staff, Staff.id == RosterAssignment.staff_id)
-            .filter(
-                RosterAssignment.org_id == org_id,
-                RosterVersion.org_id == org_id,
-                ShiftTemplate.org_id == org_id,
-                Staff.org_id == org_id,
-                RosterVersion.status == "confirmed",
-                RosterAssignment.roster_date.between(start_date, end_date),
-                RosterAssignment.staff_id.in_(staff_ids),
-            )
-        )
-        if selected_department:
-            assignment_query = assignment_query.filter(Staff.department == selected_department)
-        assignment_rows = assignment_query.order_by(
-            RosterAssignment.roster_date,
-            RosterAssignment.staff_id,
-            ShiftTemplate.start_time,
-        ).all()
-
-        for row in assignment_rows:
-            entry = payroll_rows.get(row.staff_id)
-            if entry is None:
-                continue
-            duration = shift_duration_hours(str(row.start_time), str(row.end_time))
-            roster_date = str(row.roster_date)
-            if roster_date in entry["hours_by_date"]:
-                entry["hours_by_date"][roster_date] += duration
-            entry["total_hours"] += duration
-
-    ordered_rows = []
-    for _, entry in sorted(payroll_rows.items(), key=lambda item: item[1]["staff_name"].lower()):
-        for date_key in date_columns:
-            entry["hours_by_date"][date_key] = entry["hours_by_date"][date_key].quantize(
-                Decimal("0.01"),
-                rounding=ROUND_HALF_UP,
-            )
-            total_by_date[date_key] += entry["hours_by_date"][date_key]
-        entry["total_hours"] = entry["total_hours"].quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        entry["total_salary"] = (entry["total_hours"] * entry["hourly_wage"]).quantize(
-            Decimal("0.01"),
-            rounding=ROUND_HALF_UP,
-        )
-        grand_total_hours += entry["total_hours"]
-        grand_total_salary += entry["total_salary"]
-        ordered_rows.append(entry)
-
-    grand_total_hours = grand_total_hours.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    grand_total_salary = grand_total_salary.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    totals_row: dict[str, Any] = {
+        "hours_by_date": {date_key: Decimal("0.00") for date_key in date_columns},
+        "total_hours": Decimal("0.00"),
+        "total_salary": Decimal("0.00"),
+    }
+    aggregation = app.config.get("PAYROLL_AGGREGATION", "ledger")
+    hour_rows = payroll_hour_rows(
+        org_id,
+        staff_ids,
+        start_date,
+        end_date,
+        selected_department,
+        aggregation,
+    )
+    payroll_rows = iter_payroll_rows(staff_rows, hour_rows, date_columns, totals_row)
 
     if request.args.get("export", "").strip().lower() == "csv":
         headers = ["staff_name", "role", *date_columns, "total_hours", "hourly_wage", "total_salary"]
-        csv_rows: list[dict[str, Any]] = []
-        for entry in ordered_rows:
-            line: dict[str, Any] = {
+        csv_rows = (
+            {
                 "staff_name": entry["staff_name"],
                 "role": entry["role"],
+                **{date_key: format_money(entry["hours_by_date"][date_key]) for date_key in date_columns},
                 "total_hours": format_money(entry["total_hours"]),
                 "hourly_wage": format_money(entry["hourly_wage"]),
                 "total_salary": format_money(entry["total_salary"]),
             }
-            for date_key in date_columns:
-                line[date_key] = format_money(entry["hours_by_date"][date_key])
-            csv_rows.append(line)
+            for entry in payroll_rows
+        )
         filename = f"payroll_{start_obj.strftime('%d%m%Y')}_{end_obj.strftime('%d%m%Y')}.csv"
         return csv_response(filename, headers, csv_rows)
 
-    return render_template(
+    return render_page(
         "payroll.html",
         start_date=start_date,
         end_date=end_date,
         date_columns=date_columns,
-        payroll_rows=ordered_rows,
+        payroll_rows=payroll_rows,
         staff_options=staff_options,
         selected_staff_id=selected_staff_id,
         departments=departments,
         selected_department=selected_department,
-        totals_row={
-            "hours_by_date": total_by_date,
-            "total_hours": grand_total_hours,
-            "total_salary": grand_total_salary,
-        },
+        totals_row=totals_row,
+    )
+
+
+def close_payroll_period(org_id: int, start_obj: date, end_obj: date, user_id: int | None) -> Any:
+    """Freeze the payroll of a date range into a PayrollPeriod with one line per paid staff member.
+
+    Hours come from the same path as the payroll page and wages are read
+    from Staff once, here, so later wage or roster changes leave the
+    period's lines untouched.
+    """
+    start_date = start_obj.isoformat()
+    end_date = end_obj.isoformat()
+    aggregation = app.config.get("PAYROLL_AGGREGATION", "ledger")
+    staff_rows = sorted(Staff.query.filter(Staff.org_id == org_id).all(), key=staff_sort_key)
+    hour_rows = payroll_hour_rows(org_id, [row.id for row in staff_rows], start_date, end_date, None, aggregation)
+
+    period = PayrollPeriod(
+        org_id=org_id,
+        start_date=start_obj,
+        end_date=end_obj,
+        closed_at=datetime.utcnow(),
+        closed_by_user_id=user_id,
+    )
+    db.session.add(period)
+    db.session.flush()
+    lines = [
+        {
+            "org_id": org_id,
+            "period_id": period.id,
+            "staff_id": entry["staff_id"],
+            "staff_name": entry["staff_name"],
+            "role": entry["role"],
+            "centihours": entry["centihours"],
+            "wage_cents": None if entry["wage_missing"] else entry["wage_cents"],
+            "salary_cents": entry["salary_cents"],
+        }
+        for entry in iter_payroll_rows(staff_rows, hour_rows, [], {})
+        if entry["centihours"]
+    ]
+    if lines:
+        db.session.execute(insert(PayrollPeriodLine), lines)
+    return period
+
+
+def payroll_rollup_rows(
+    org_id: int,
+    period_starts: list[date],
+    totals_row: dict[str, Any],
+) -> list[dict[str, Any]]:
+    """Per-staff hours by closed period plus totals, summed from the frozen period lines.
+
+    Lines are grouped by staff id, or by name for staff deleted since the
+    close. ``totals_row`` receives the per-period and grand totals.
+    """
+    period_keys = [start.isoformat() for start in period_starts]
+    totals_by_period = {key: 0 for key in period_keys}
+    rows: dict[Any, dict[str, Any]] = {}
+    for line in (
+        db.session.query(
+            PayrollPeriodLine.staff_id,
+            PayrollPeriodLine.staff_name,
+            PayrollPeriodLine.role,
+            PayrollPeriodLine.centihours,
+            PayrollPeriodLine.wage_cents,
+            PayrollPeriodLine.salary_cents,
+            PayrollPeriod.start_date,
+        )
+        .join(PayrollPeriod, PayrollPeriod.id == PayrollPeriodLine.period_id)
+        .filter(
+            PayrollPeriodLine.org_id == org_id,
+            PayrollPeriod.org_id == org_id,
+            PayrollPeriod.start_date.in_(period_starts),
+        )
+        .order_by(PayrollPeriod.start_date)
+    ):
+        period_key = line.start_date.isoformat()
+        row = rows.setdefault(
+            line.staff_id if line.staff_id is not None else line.staff_name,
+            {
+                "hours_by_period": {key: 0 for key in period_keys},
+                "total_hours": 0,
+                "total_salary": 0,
+                "wage_missing": False,
+            },
+        )
+        # Periods are read in order, so the name and role shown are the latest closed ones.
+        row["staff_name"] = line.staff_name
+        row["role"] = line.role
+        row["hours_by_period"][period_key] += line.centihours
+        row["total_hours"] += line.centihours
+        row["total_salary"] += line.salary_cents
+        row["wage_missing"] = row["wage_missing"] or line.wage_cents is None
+        totals_by_period[period_key] += line.centihours
+
+    rollup = sorted(rows.values(), key=lambda row: row["staff_name"].lower())
+    totals_row["hours_by_period"] = {key: from_hundredths(value) for key, value in totals_by_period.items()}
+    totals_row["total_hours"] = from_hundredths(sum(row["total_hours"] for row in rollup))
+    totals_row["total_salary"] = from_hundredths(sum(row["total_salary"] for row in rollup))
+    for row in rollup:
+        row["hours_by_period"] = {key: from_hundredths(value) for key, value in row["hours_by_period"].items()}
+        row["total_hours"] = from_hundredths(row["total_hours"])
+        row["total_salary"] = from_hundredths(row["total_salary"])
+    return rollup
+
+
+@app.get("/payroll/periods")
+@login_required
+@payroll_access_required
+def payroll_periods() -> str | Response:
+    """Monthly payroll periods of a year and totals summed from the closed ones: ?year=&quarter=1-4."""
+    org_id = current_org_id()
+    today_obj = date.today()
+    try:
+        year = int(request.args.get("year", "") or today_obj.year)
+        quarter = int(request.args.get("quarter", "") or 0)
+    except ValueError:
+        year = quarter = -1
+    if not 1 <= year <= 9999 or not 0 <= quarter <= 4:
+        flash(t("msg_invalid_payroll_period"), "error")
+        year, quarter = today_obj.year, 0
+
+    closed_by_start = {
+        period.start_date: period
+        for period in PayrollPeriod.query.filter(
+            PayrollPeriod.org_id == org_id,
+            PayrollPeriod.start_date >= date(year, 1, 1),
+            PayrollPeriod.start_date <= date(year, 12, 31),
+        )
+    }
+    months = []
+    for month in range(1, 13):
+        month_start, month_end = month_bounds(date(year, month, 1))
+        months.append(
+            {
+                "month": month_start.strftime("%Y-%m"),
+                "start_date": month_start.isoformat(),
+                "end_date": month_end.isoformat(),
+                "period": closed_by_start.get(month_start),
+                "can_close": month_start not in closed_by_start and month_end < today_obj,
+            }
+        )
+
+    first_month = 3 * quarter - 2 if quarter else 1
+    last_month = 3 * quarter if quarter else 12
+    period_starts = [
+        date(year, month, 1)
+        for month in range(first_month, last_month + 1)
+        if date(year, month, 1) in closed_by_start
+    ]
+    totals_row: dict[str, Any] = {}
+    rollup_rows = payroll_rollup_rows(org_id, period_starts, totals_row)
+    period_columns = [start.isoformat() for start in period_starts]
+
+    if request.args.get("export", "").strip().lower() == "csv":
+        headers = ["staff_name", "role", *period_columns, "total_hours", "total_salary"]
+        csv_rows = (
+            {
+                "staff_name": row["staff_name"],
+                "role": row["role"],
+                **{key: format_money(row["hours_by_period"][key]) for key in period_columns},
+                "total_hours": format_money(row["total_hours"]),
+                "total_salary": format_money(row["total_salary"]),
+            }
+            for row in rollup_rows
+        )
+        suffix = f"q{quarter}" if quarter else "ytd"
+        return csv_response(f"payroll_{year}_{suffix}.csv", headers, csv_rows)
+
+    return render_template(
+        "payroll_periods.html",
+        year=year,
+        quarter=quarter,
+        months=months,
+        period_columns=period_columns,
+        rollup_rows=rollup_rows,
+        totals_row=totals_row,
     )
 
 
+@app.post("/payroll/periods/close")
+@login_required
+@payroll_access_required
+def close_payroll_month() -> Any:
+    org_id = current_org_id()
+    month_raw = request.form.get("month", "").strip()
+    month_obj = parse_iso_date(f"{month_raw}-01") if month_raw else None
+    if month_obj is None:
+        flash(t("msg_invalid_payroll_period"), "error")
+        return redirect(url_for("payroll_periods"))
+
+    start_obj, end_obj = month_bounds(month_obj)
+    redirect_url = url_for("payroll_periods", year=start_obj.year)
+    if end_obj >= date.today():
+        flash(t("msg_payroll_period_not_ended"), "error")
+        return redirect(redirect_url)
+    if PayrollPeriod.query.filter_by(org_id=org_id, start_date=start_obj).first() is not None:
+        flash(t("msg_payroll_period_already_closed"), "error")
+        return redirect(redirect_url)
+
+    try:
+        period = close_payroll_period(org_id, start_obj, end_obj, session.get("user_id"))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        flash(t("msg_payroll_period_already_closed"), "error")
+        return redirect(redirect_url)
+
+    flash(t("msg_payroll_period_closed").format(month=period.start_date.strftime("%m/%Y")), "success")
+    return redirect(redirect_url)
+
+
 @app.route("/data")
 @login_required
 def data_page() -> str:
@@ -1967,6 +3863,24 @@ def data_page() -> str:
     )
 
 
+def iter_roster_export_lines(assignment_rows: Iterable[Any], date_columns: list[str]) -> Iterator[dict[str, Any]]:
+    """One CSV line per staff member with the shift names of each date joined by " | ".
+
+    ``assignment_rows`` arrive grouped by staff member, so a line is complete
+    as soon as the staff id changes.
+    """
+    for _, staff_rows in groupby(assignment_rows, key=lambda row: row.staff_id):
+        line: dict[str, Any] = {date_key: "" for date_key in date_columns}
+        shifts_by_date: dict[str, list[str]] = {}
+        for row in staff_rows:
+            line["staff_name"] = row.staff_name
+            line["role"] = row.staff_role
+            shifts_by_date.setdefault(row.roster_date, []).append(row.shift_name)
+        for date_key, shifts in shifts_by_date.items():
+            line[date_key] = " | ".join(shifts)
+        yield line
+
+
 @app.route("/data/export/<dataset>")
 @login_required
 def export_dataset(dataset: str) -> Response:
@@ -1996,91 +3910,73 @@ def export_dataset(dataset: str) -> Response:
             return redirect(url_for("data_page"))
 
         status_filter = ["confirmed"] if version_type == "confirmed" else ["draft"]
-        rows = [
-            {
-                "roster_date": row.roster_date,
-                "staff_id": row.staff_id,
-                "staff_name": row.staff_name,
-                "staff_role": row.staff_role,
-                "shift_name": row.shift_name,
-                "start_time": row.start_time,
-            }
-            for row in (
-                db.session.query(
-                    RosterAssignment.roster_date,
-                    Staff.id.label("staff_id"),
-                    Staff.name.label("staff_name"),
-                    Staff.role.label("staff_role"),
-                    ShiftTemplate.name.label("shift_name"),
-                    ShiftTemplate.start_time,
-                )
-                .join(Staff, Staff.id == RosterAssignment.staff_id)
-                .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
-                .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
-                .filter(
-                    RosterAssignment.org_id == org_id,
-                    RosterAssignment.roster_date.between(start_obj.isoformat(), end_obj.isoformat()),
-                    Staff.org_id == org_id,
-                    ShiftTemplate.org_id == org_id,
-                    RosterVersion.org_id == org_id,
-                    RosterVersion.status.in_(status_filter),
-                )
-                .order_by(RosterAssignment.roster_date, Staff.name, ShiftTemplate.start_time)
-                .all()
-            )
+        filters = [
+            RosterAssignment.org_id == org_id,
+            RosterAssignment.roster_date.between(start_obj.isoformat(), end_obj.isoformat()),
+            Staff.org_id == org_id,
+            ShiftTemplate.org_id == org_id,
+            RosterVersion.org_id == org_id,
+            RosterVersion.status.in_(status_filter),
         ]
+        date_columns = [
+            row.roster_date
+            for row in db.session.query(RosterAssignment.roster_date)
+            .join(Staff, Staff.id == RosterAssignment.staff_id)
+            .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+            .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
+            .filter(*filters)
+            .distinct()
+            .order_by(RosterAssignment.roster_date)
+        ]
+        filename = f"roster_{start_obj.strftime('%d%m%Y')}_{end_obj.strftime('%d%m%Y')}.csv"
 
-        if not rows:
-            filename = f"roster_{start_obj.strftime('%d%m%Y')}_{end_obj.strftime('%d%m%Y')}.csv"
+        if not date_columns:
             return Response(
                 "staff_name,role\n",
                 mimetype="text/csv",
                 headers={"Content-Disposition": f"attachment; filename={filename}"},
             )
 
-        date_columns = sorted({row["roster_date"] for row in rows})
-        staff_map: dict[int, dict[str, Any]] = {}
-        for row in rows:
-            staff_id = row["staff_id"]
-            if staff_id not in staff_map:
-                staff_map[staff_id] = {
-                    "staff_name": row["staff_name"],
-                    "role": row["staff_role"],
-                }
-            date_key = row["roster_date"]
-            if date_key not in staff_map[staff_id]:
-                staff_map[staff_id][date_key] = []
-            staff_map[staff_id][date_key].append(row["shift_name"])
-
-        ordered_staff = sorted(
-            staff_map.values(),
-            key=lambda item: item["staff_name"].lower(),
-        )
-        headers = ["staff_name", "role", *date_columns]
-
-        buffer = io.StringIO()
-        writer = csv.writer(buffer)
-        writer.writerow(headers)
-        for staff in ordered_staff:
-            row_values: list[str] = [staff.get("staff_name", ""), staff.get("role", "")]
-            for date_key in date_columns:
-                shifts = staff.get(date_key, [])
-                if isinstance(shifts, list):
-                    row_values.append(" | ".join(shifts))
-                else:
-                    row_values.append(str(shifts))
-            writer.writerow(row_values)
-
-        filename = f"roster_{start_obj.strftime('%d%m%Y')}_{end_obj.strftime('%d%m%Y')}.csv"
+        staff_ids = [
+            row.id
+            for row in sorted(
+                db.session.query(Staff.id, Staff.name)
+                .join(RosterAssignment, RosterAssignment.staff_id == Staff.id)
+                .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+                .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
+                .filter(*filters)
+                .distinct(),
+                key=staff_sort_key,
+            )
+        ]
+        assignment_rows = (
+            db.session.query(
+                RosterAssignment.roster_date,
+                Staff.id.label("staff_id"),
+                Staff.name.label("staff_name"),
+                Staff.role.label("staff_role"),
+                ShiftTemplate.name.label("shift_name"),
+            )
+            .join(Staff, Staff.id == RosterAssignment.staff_id)
+            .join(ShiftTemplate, ShiftTemplate.id == RosterAssignment.shift_id)
+            .join(RosterVersion, RosterVersion.id == RosterAssignment.version_id)
+            .filter(*filters)
+            .order_by(
+                staff_position_sql(Staff.id, staff_ids),
+                RosterAssignment.roster_date,
+                ShiftTemplate.start_time,
+            )
+            .execution_options(yield_per=EXPORT_CURSOR_BATCH)
+        )
 
-        return Response(
-            buffer.getvalue(),
-            mimetype="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        return csv_response(
+            filename,
+            ["staff_name", "role", *date_columns],
+            iter_roster_export_lines(assignment_rows, date_columns),
         )
 
     if dataset == "staff":
-        rows = [
+        rows = (
             {
                 "id": row.id,
                 "name": row.name,
@@ -2088,12 +3984,15 @@ def export_dataset(dataset: str) -> Response:
                 "email": row.email,
                 "active": row.active,
             }
-            for row in Staff.query.filter_by(org_id=org_id).order_by(Staff.id).all()
-        ]
+            for row in db.session.query(Staff.id, Staff.name, Staff.role, Staff.email, Staff.active)
+            .filter(Staff.org_id == org_id)
+            .order_by(Staff.id)
+            .execution_options(yield_per=EXPORT_CURSOR_BATCH)
+        )
         return csv_response("staff.csv", ["id", "name", "role", "email", "active"], rows)
 
     if dataset == "shifts":
-        rows = [
+        rows = (
             {
                 "id": row.id,
                 "name": row.name,
@@ -2101,8 +4000,17 @@ def export_dataset(dataset: str) -> Response:
                 "end_time": row.end_time,
                 "required_staff": row.required_staff,
             }
-            for row in ShiftTemplate.query.filter_by(org_id=org_id).order_by(ShiftTemplate.id).all()
-        ]
+            for row in db.session.query(
+                ShiftTemplate.id,
+                ShiftTemplate.name,
+                ShiftTemplate.start_time,
+                ShiftTemplate.end_time,
+                ShiftTemplate.required_staff,
+            )
+            .filter(ShiftTemplate.org_id == org_id)
+            .order_by(ShiftTemplate.id)
+            .execution_options(yield_per=EXPORT_CURSOR_BATCH)
+        )
         return csv_response(
             "shifts.csv",
             ["id", "name", "start_time", "end_time", "required_staff"],
@@ -2125,7 +4033,7 @@ def export_dataset(dataset: str) -> Response:
             flash(t("msg_end_date_on_or_after_start"), "error")
             return redirect(url_for("data_page"))
 
-        rows = [
+        rows = (
             {
                 "id": row.id,
                 "staff_name": row.staff_name,
@@ -2151,9 +4059,9 @@ def export_dataset(dataset: str) -> Response:
                     StaffAvailability.end_date >= start_obj.isoformat(),
                 )
                 .order_by(StaffAvailability.start_date, StaffAvailability.id)
-                .all()
+                .execution_options(yield_per=EXPORT_CURSOR_BATCH)
             )
-        ]
+        )
         return csv_response(
             "availability.csv",
             ["id", "staff_name", "start_date", "end_date", "status", "notes"],
@@ -2193,8 +4101,12 @@ def import_dataset() -> Any:
     try:
         if dataset == "staff":
             if replace_existing:
+                ledger_version_ids = confirmed_version_ids_using(org_id)
+                invalidate_org_roster_snapshots(org_id)
                 for item in Staff.query.filter_by(org_id=org_id).all():
                     db.session.delete(item)
+                db.session.flush()
+                rebuild_payroll_ledger(org_id, ledger_version_ids)
             added, skipped = 0, 0
             for row in rows:
                 name = (row.get("name") or "").strip()
@@ -2212,8 +4124,12 @@ def import_dataset() -> Any:
 
         elif dataset == "shifts":
             if replace_existing:
+                ledger_version_ids = confirmed_version_ids_using(org_id)
+                invalidate_org_roster_snapshots(org_id)
                 for item in ShiftTemplate.query.filter_by(org_id=org_id).all():
                     db.session.delete(item)
+                db.session.flush()
+                rebuild_payroll_ledger(org_id, ledger_version_ids)
             added, skipped = 0, 0
             for row in rows:
                 name = (row.get("name") or "").strip()
@@ -2244,6 +4160,10 @@ def import_dataset() -> Any:
             added, skipped = 0, 0
             import_week_start: date | None = None
             parsed_rows: list[dict[str, Any]] = []
+            known_staff_ids = {staff_id for (staff_id,) in db.session.query(Staff.id).filter(Staff.org_id == org_id)}
+            known_shift_ids = {
+                shift_id for (shift_id,) in db.session.query(ShiftTemplate.id).filter(ShiftTemplate.org_id == org_id)
+            }
             for row in rows:
                 roster_date = (row.get("roster_date") or "").strip()
                 staff_id_raw = (row.get("staff_id") or "").strip()
@@ -2256,33 +4176,29 @@ def import_dataset() -> Any:
                 try:
                     staff_id = int(staff_id_raw)
                     shift_id = int(shift_id_raw)
-                    staff_exists = (
-                        Staff.query.filter_by(id=staff_id, org_id=org_id).first() is not None
-                    )
-                    shift_exists = (
-                        ShiftTemplate.query.filter_by(id=shift_id, org_id=org_id).first() is not None
-                    )
-                    if not staff_exists or not shift_exists:
-                        skipped += 1
-                        continue
-
-                    row_week_start = monday_for(roster_date_obj)
-                    if import_week_start is None:
-                        import_week_start = row_week_start
-                    elif row_week_start != import_week_start:
-                        skipped += 1
-                        continue
+                except ValueError:
+                    skipped += 1
+                    continue
+                if staff_id not in known_staff_ids or shift_id not in known_shift_ids:
+                    skipped += 1
+                    continue
 
-                    parsed_rows.append(
-                        {
-                            "roster_date": roster_date,
-                            "staff_id": staff_id,
-                            "shift_id": shift_id,
-                            "notes": notes or None,
-                        }
-                    )
-                except (ValueError, IntegrityError):
+                row_week_start = monday_for(roster_date_obj)
+                if import_week_start is None:
+                    import_week_start = row_week_start
+                elif row_week_start != import_week_start:
                     skipped += 1
+                    continue
+
+                parsed_rows.append(
+                    {
+                        "org_id": org_id,
+                        "roster_date": roster_date,
+                        "staff_id": staff_id,
+                        "shift_id": shift_id,
+                        "notes": notes or None,
+                    }
+                )
 
             if import_week_start is not None:
                 if replace_existing:
@@ -2294,6 +4210,7 @@ def import_dataset() -> Any:
                         ).all()
                     )
                     for draft in existing_drafts:
+                        roster_snapshot_cache.invalidate(org_id, draft.id)
                         db.session.delete(draft)
                     db.session.flush()
 
@@ -2306,22 +4223,10 @@ def import_dataset() -> Any:
                 db.session.flush()
 
                 for parsed in parsed_rows:
-                    try:
-                        with db.session.begin_nested():
-                            db.session.add(
-                                RosterAssignment(
-                                    org_id=org_id,
-                                    version_id=draft_version.id,
-                                    roster_date=parsed["roster_date"],
-                                    staff_id=parsed["staff_id"],
-                                    shift_id=parsed["shift_id"],
-                                    notes=parsed["notes"],
-                                )
-                            )
-                            db.session.flush()
-                        added += 1
-                    except IntegrityError:
-                        skipped += 1
+                    parsed["version_id"] = draft_version.id
+                inserted = bulk_insert_assignments(parsed_rows)
+                added += inserted
+                skipped += len(parsed_rows) - inserted
 
                 roster_redirect_date = import_week_start.isoformat()
 
@@ -2363,6 +4268,8 @@ def import_dataset() -> Any:
                             )
                         )
                         db.session.flush()
+                    if status in BLOCKING_STATUSES:
+                        mark_leave_dirty_cells(org_id, staff_id, start_date, end_date)
                     added += 1
                 except (ValueError, IntegrityError):
                     skipped += 1
@@ -2382,6 +4289,58 @@ def import_dataset() -> Any:
     return redirect(url_for("data_page"))
 
 
+@app.cli.command("check-payroll-parity")
+@click.option("--org-id", type=int, required=True, help="Organization to check.")
+@click.option("--start", "start_raw", default="", help="First date (YYYY-MM-DD), default start of this month.")
+@click.option("--end", "end_raw", default="", help="Last date (YYYY-MM-DD), default end of this month.")
+def check_payroll_parity(org_id: int, start_raw: str, end_raw: str) -> None:
+    """Compare ledger, SQL-side and Python payroll hours for every staff member and date."""
+    default_start, default_end = month_bounds(date.today())
+    start_obj = parse_iso_date(start_raw) if start_raw else default_start
+    end_obj = parse_iso_date(end_raw) if end_raw else default_end
+    if start_obj is None or end_obj is None or end_obj < start_obj:
+        raise click.ClickException("Invalid date range.")
+
+    staff_ids = [
+        row.id
+        for row in sorted(
+            db.session.query(Staff.id, Staff.name).filter(Staff.org_id == org_id),
+            key=staff_sort_key,
+        )
+    ]
+    hours: dict[str, dict[tuple[int, str], int]] = {}
+    for aggregation in ("python", "sql", "ledger"):
+        totals: dict[tuple[int, str], int] = {}
+        for staff_id, roster_date, centihours in payroll_hour_rows(
+            org_id,
+            staff_ids,
+            start_obj.isoformat(),
+            end_obj.isoformat(),
+            None,
+            aggregation,
+        ):
+            key = (staff_id, str(roster_date))
+            totals[key] = totals.get(key, 0) + int(centihours or 0)
+        hours[aggregation] = totals
+
+    expected = hours["python"]
+    mismatches = 0
+    for aggregation in ("sql", "ledger"):
+        actual = hours[aggregation]
+        for staff_id, roster_date in sorted(expected.keys() | actual.keys()):
+            python_value = expected.get((staff_id, roster_date), 0)
+            value = actual.get((staff_id, roster_date), 0)
+            if value != python_value:
+                mismatches += 1
+                click.echo(
+                    f"staff {staff_id} on {roster_date}: {aggregation} {from_hundredths(value)} h, "
+                    f"python {from_hundredths(python_value)} h"
+                )
+    if mismatches:
+        raise click.ClickException(f"{mismatches} staff-day totals differ.")
+    click.echo(f"Payroll aggregation matches for {len(expected)} staff-days.")
+
+
 @app.cli.command("create-admin")
 def create_admin() -> None:
     if User.query.count() > 0:
@@ -2481,7 +4440,10 @@ with app.app_context():
     try:
         ensure_user_schema_compatibility()
         ensure_staff_schema_compatibility()
+        ensure_shift_template_schema_compatibility()
         ensure_roster_schema_compatibility()
+        fail_orphaned_schedule_jobs()
+        backfill_payroll_ledger()
     except SQLAlchemyError:
         db.session.rollback()
         raise
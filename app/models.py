@@ -92,6 +92,8 @@ class ShiftTemplate(db.Model):
     start_time = db.Column(db.Text, nullable=False)
     end_time = db.Column(db.Text, nullable=False)
     required_staff = db.Column(db.Integer, nullable=False, server_default=db.text("1"))
+    role = db.Column(db.Text, nullable=True)
+    department = db.Column(db.String(120), nullable=True)
 
     roster_assignments = db.relationship(
         "RosterAssignment",
@@ -137,6 +139,7 @@ class RosterVersion(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
     confirmed_at = db.Column(db.DateTime, nullable=True)
     updated_at = db.Column(db.DateTime, nullable=True)
+    history_summarized_at = db.Column(db.DateTime, nullable=True)
 
     organization = db.relationship("Organization", back_populates="roster_versions")
     roster_assignments = db.relationship(
@@ -181,6 +184,139 @@ class RosterAssignment(db.Model):
     version = db.relationship("RosterVersion", back_populates="roster_assignments")
 
 
+class RosterDirtyCell(db.Model):
+    """A (date, shift) cell of a draft whose coverage changed since it was scheduled."""
+
+    __tablename__ = "roster_dirty_cells"
+    __table_args__ = (
+        db.UniqueConstraint("version_id", "roster_date", "shift_id", name="uq_roster_dirty_cells_version_date_shift"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(
+        db.Integer,
+        db.ForeignKey("organizations.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    version_id = db.Column(
+        db.Integer,
+        db.ForeignKey("roster_versions.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    roster_date = db.Column(db.Text, nullable=False)
+    shift_id = db.Column(
+        db.Integer,
+        db.ForeignKey("shift_templates.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+
+class StaffWeekHistory(db.Model):
+    """Per-staff totals of a confirmed roster week, kept for scheduler fairness."""
+
+    __tablename__ = "staff_week_history"
+    __table_args__ = (
+        db.UniqueConstraint("version_id", "staff_id", name="uq_staff_week_history_version_staff"),
+        db.Index("ix_staff_week_history_org_week", "org_id", "week_start"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(
+        db.Integer,
+        db.ForeignKey("organizations.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    version_id = db.Column(
+        db.Integer,
+        db.ForeignKey("roster_versions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    week_start = db.Column(db.Date, nullable=False)
+    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id", ondelete="CASCADE"), nullable=False)
+    assignment_count = db.Column(db.Integer, nullable=False, default=0)
+    worked_minutes = db.Column(db.Integer, nullable=False, default=0)
+
+
+class PayrollLedgerEntry(db.Model):
+    """Centi-hours a staff member works on one day of a confirmed roster version, summed by payroll."""
+
+    __tablename__ = "payroll_ledger"
+    __table_args__ = (
+        db.UniqueConstraint("version_id", "staff_id", "roster_date", name="uq_payroll_ledger_version_staff_date"),
+        db.Index("ix_payroll_ledger_org_date_staff", "org_id", "roster_date", "staff_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(
+        db.Integer,
+        db.ForeignKey("organizations.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    version_id = db.Column(
+        db.Integer,
+        db.ForeignKey("roster_versions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id", ondelete="CASCADE"), nullable=False)
+    roster_date = db.Column(db.Text, nullable=False)
+    centihours = db.Column(db.Integer, nullable=False, default=0)
+
+
+class PayrollPeriod(db.Model):
+    """A closed payroll month; its lines are frozen at close and never recomputed."""
+
+    __tablename__ = "payroll_periods"
+    __table_args__ = (db.UniqueConstraint("org_id", "start_date", name="uq_payroll_periods_org_start"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(
+        db.Integer,
+        db.ForeignKey("organizations.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    closed_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+    closed_by_user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    lines = db.relationship(
+        "PayrollPeriodLine",
+        back_populates="period",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class PayrollPeriodLine(db.Model):
+    """Hours and salary of one staff member in a closed period, with the name and wage in force at close."""
+
+    __tablename__ = "payroll_period_lines"
+    __table_args__ = (db.UniqueConstraint("period_id", "staff_id", name="uq_payroll_period_lines_period_staff"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(
+        db.Integer,
+        db.ForeignKey("organizations.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    period_id = db.Column(
+        db.Integer,
+        db.ForeignKey("payroll_periods.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id", ondelete="SET NULL"), nullable=True)
+    staff_name = db.Column(db.Text, nullable=False)
+    role = db.Column(db.Text, nullable=False)
+    centihours = db.Column(db.Integer, nullable=False, default=0)
+    wage_cents = db.Column(db.Integer, nullable=True)
+    salary_cents = db.Column(db.Integer, nullable=False, default=0)
+
+    period = db.relationship("PayrollPeriod", back_populates="lines")
+
+
 class StaffAvailability(db.Model):
     __tablename__ = "staff_availability"
 
@@ -224,3 +360,35 @@ class StaffShiftPreference(db.Model):
     staff = db.relationship("Staff", back_populates="shift_preferences")
     shift_template = db.relationship("ShiftTemplate", back_populates="staff_preferences")
     organization = db.relationship("Organization", back_populates="staff_shift_preferences")
+
+
+class ScheduleJob(db.Model):
+    __tablename__ = "schedule_jobs"
+    __table_args__ = (
+        db.CheckConstraint(
+            db.column("status").in_(["queued", "running", "finished", "failed"]),
+            name="ck_schedule_jobs_status",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(
+        db.Integer,
+        db.ForeignKey("organizations.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    week_start = db.Column(db.Date, nullable=False)
+    weeks = db.Column(db.Integer, nullable=False, default=1)
+    mode = db.Column(db.String(20), nullable=False, server_default=db.text("'greedy'"), default="greedy")
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    days_done = db.Column(db.Integer, nullable=False, default=0)
+    days_total = db.Column(db.Integer, nullable=False, default=7)
+    added = db.Column(db.Integer, nullable=False, default=0)
+    unfilled = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    # "host:pid" of the process running the job, and when it last reported progress.
+    worker = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
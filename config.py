@@ -14,6 +14,21 @@ class BaseConfig:
     REMEMBER_COOKIE_SECURE = True
     APP_VERSION = "v2603"
     APP_AUTHOR = "DuyLB"
+    SCHEDULE_JOB_WORKERS = int(os.environ.get("SCHEDULE_JOB_WORKERS", "2"))
+    SCHEDULE_SOLVER_TIME_BUDGET = float(os.environ.get("SCHEDULE_SOLVER_TIME_BUDGET", "5"))
+    # Scheduling rules; 0 turns a rule off.
+    SCHEDULE_MAX_WEEKLY_HOURS = float(os.environ.get("SCHEDULE_MAX_WEEKLY_HOURS", "0"))
+    SCHEDULE_MIN_REST_HOURS = float(os.environ.get("SCHEDULE_MIN_REST_HOURS", "0"))
+    SCHEDULE_MAX_CONSECUTIVE_DAYS = int(os.environ.get("SCHEDULE_MAX_CONSECUTIVE_DAYS", "0"))
+    ROSTER_SNAPSHOT_CACHE_SIZE = int(os.environ.get("ROSTER_SNAPSHOT_CACHE_SIZE", "256"))
+    ROSTER_SNAPSHOT_CACHE_DIR = os.environ.get("ROSTER_SNAPSHOT_CACHE_DIR", "")
+    # Staff rows per roster grid page; 0 shows everyone on one page.
+    ROSTER_PAGE_SIZE = int(os.environ.get("ROSTER_PAGE_SIZE", "50"))
+    # Stream the roster and payroll pages instead of rendering them whole.
+    STREAM_PAGES = os.environ.get("STREAM_PAGES", "1") == "1"
+    # "ledger" reads hours written when rosters are confirmed, "sql" sums them in the
+    # database, "python" prices each assignment in the app.
+    PAYROLL_AGGREGATION = os.environ.get("PAYROLL_AGGREGATION", "ledger")
 
 
 class DevelopmentConfig(BaseConfig):
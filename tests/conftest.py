@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+DB_FILE = Path(tempfile.mkdtemp(prefix="rosman-tests-")) / "test.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+os.environ.setdefault("APP_ENV", "development")
+sys.path.insert(0, str(ROOT))
+
+import app as rosman  # noqa: E402
+
+
+@pytest.fixture()
+def app_module():
+    """The app module on an empty database, inside an app context."""
+    rosman.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, STREAM_PAGES=False)
+    with rosman.app.app_context():
+        rosman.db.drop_all()
+        rosman.db.create_all()
+        rosman.roster_snapshot_cache.entries.clear()
+        yield rosman
+        rosman.db.session.remove()
+
+
+@pytest.fixture()
+def today(app_module, monkeypatch):
+    """Pin the app's date.today(); call the fixture with the date to use."""
+
+    def pin(day):
+        class FixedDate(date):
+            @classmethod
+            def today(cls):
+                return cls(day.year, day.month, day.day)
+
+        monkeypatch.setattr(app_module, "date", FixedDate)
+
+    return pin
+
+
+@pytest.fixture()
+def org(app_module):
+    """An org with an owner, two shifts (one overnight) and four staff, one without a wage."""
+    db = app_module.db
+    organization = app_module.Organization(name="Test Org")
+    db.session.add(organization)
+    db.session.flush()
+    owner = app_module.User(
+        email="owner@example.com",
+        password_hash="x",
+        role="owner",
+        is_owner=True,
+        is_active=True,
+        org_id=organization.id,
+    )
+    shifts = [
+        app_module.ShiftTemplate(org_id=organization.id, name="Day", start_time="08:00", end_time="16:20", required_staff=2),
+        app_module.ShiftTemplate(org_id=organization.id, name="Night", start_time="22:10", end_time="06:05", required_staff=1),
+    ]
+    staff = [
+        app_module.Staff(org_id=organization.id, name="An", role="Cook", department="Kitchen", hourly_wage=12.5),
+        app_module.Staff(org_id=organization.id, name="Bình", role="Server", department="Floor", hourly_wage=11),
+        app_module.Staff(org_id=organization.id, name="Đức", role="Server", department="Floor", hourly_wage=None),
+        app_module.Staff(org_id=organization.id, name="Zoe", role="Cook", department="Kitchen", hourly_wage=14.25),
+    ]
+    db.session.add_all([owner, *shifts, *staff])
+    db.session.commit()
+    return {"org": organization, "owner": owner, "shifts": shifts, "staff": staff}
+
+
+@pytest.fixture()
+def client(app_module, org):
+    test_client = app_module.app.test_client()
+    with test_client.session_transaction() as session:
+        session["user_id"] = org["owner"].id
+    return test_client
+
+
+@pytest.fixture()
+def make_version(app_module):
+    """Factory for a roster version with (date, staff, shift) assignments."""
+
+    def make(org_id, week_start, status, cells):
+        version = app_module.RosterVersion(org_id=org_id, week_start=week_start, status=status)
+        app_module.db.session.add(version)
+        app_module.db.session.flush()
+        app_module.db.session.add_all(
+            [
+                app_module.RosterAssignment(
+                    org_id=org_id,
+                    version_id=version.id,
+                    roster_date=day.isoformat() if isinstance(day, date) else day,
+                    staff_id=staff.id,
+                    shift_id=shift.id,
+                )
+                for day, staff, shift in cells
+            ]
+        )
+        app_module.db.session.commit()
+        return version
+
+    return make
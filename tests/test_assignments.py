@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+MONDAY = date(2026, 10, 12)
+
+
+def assignment_row(version, staff, shift, day):
+    return {
+        "org_id": version.org_id,
+        "version_id": version.id,
+        "roster_date": day.isoformat(),
+        "staff_id": staff.id,
+        "shift_id": shift.id,
+        "notes": None,
+    }
+
+
+def test_bulk_insert_counts_only_rows_written(app_module, org, make_version):
+    an, binh = org["staff"][:2]
+    day_shift = org["shifts"][0]
+    draft = make_version(org["org"].id, MONDAY, "draft", [(MONDAY, an, day_shift)])
+    rows = [
+        assignment_row(draft, an, day_shift, MONDAY),
+        assignment_row(draft, binh, day_shift, MONDAY),
+        assignment_row(draft, binh, day_shift, MONDAY),
+        assignment_row(draft, binh, day_shift, MONDAY + timedelta(days=1)),
+    ]
+
+    assert app_module.bulk_insert_assignments(rows) == 2
+    assert app_module.RosterAssignment.query.filter_by(version_id=draft.id).count() == 3
+
+
+def test_auto_schedule_counts_slots_taken_since_the_solve_as_unfilled(app_module, org, make_version, monkeypatch):
+    org_id = org["org"].id
+    draft = make_version(org_id, MONDAY, "draft", [])
+    schedule_weeks = app_module.schedule_weeks
+    solved = []
+
+    def solve_then_edit(contexts, *args, **kwargs):
+        results = schedule_weeks(contexts, *args, **kwargs)
+        solved.extend(results)
+        day_str, staff_id, shift_id = results[0].assignments[0]
+        app_module.db.session.add(
+            app_module.RosterAssignment(
+                org_id=org_id, version_id=draft.id, roster_date=day_str, staff_id=staff_id, shift_id=shift_id
+            )
+        )
+        app_module.db.session.commit()
+        return results
+
+    monkeypatch.setattr(app_module, "schedule_weeks", solve_then_edit)
+    added, unfilled, weeks = app_module.auto_schedule_weeks(org_id, MONDAY)
+
+    assert weeks == 1
+    assert added == solved[0].added - 1
+    assert unfilled == solved[0].unfilled + 1
@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from utils.constraints import MaxConsecutiveDays, MinimumRest, RuleSet
+from utils.scheduling import build_schedule_context, schedule_weeks
+
+WEEK_START = date(2026, 10, 12)
+STAFF = [SimpleNamespace(id=1, name="An"), SimpleNamespace(id=2, name="Bình")]
+EARLY = SimpleNamespace(id=10, name="Early", start_time="06:00", end_time="14:00", required_staff=1)
+LATE = SimpleNamespace(id=11, name="Late", start_time="22:00", end_time="02:00", required_staff=1)
+
+
+def day(offset):
+    return (WEEK_START + timedelta(days=offset)).isoformat()
+
+
+def week_context(week_start, previous_rows=(), shifts=(EARLY, LATE)):
+    return build_schedule_context(1, week_start, STAFF, list(shifts), [], [], [], previous_rows=previous_rows)
+
+
+def allowed(context, constraint, day_str, shift_id):
+    rules = RuleSet.compile(context, [constraint])
+    shift = next(shift for shift in context.shifts if shift.id == shift_id)
+    mask, _ = rules.masks(day_str, shift)
+    return {staff.id for position, staff in enumerate(context.staff) if mask >> position & 1}
+
+
+def test_minimum_rest_counts_a_late_shift_on_the_previous_sunday():
+    previous = [SimpleNamespace(roster_date=day(-1), staff_id=1, shift_id=LATE.id)]
+    context = week_context(WEEK_START, previous)
+
+    # Sunday's late shift ends at 02:00 Monday; 11 hours of rest runs to 13:00.
+    assert allowed(context, MinimumRest(11 * 60), day(0), EARLY.id) == {2}
+    assert allowed(context, MinimumRest(3 * 60), day(0), EARLY.id) == {1, 2}
+    assert allowed(context, MinimumRest(11 * 60), day(1), EARLY.id) == {1, 2}
+
+
+def test_max_consecutive_days_continues_the_run_the_previous_week_ends_with():
+    previous = [SimpleNamespace(roster_date=day(offset), staff_id=1, shift_id=EARLY.id) for offset in range(-3, 0)]
+    previous.append(SimpleNamespace(roster_date=day(-5), staff_id=2, shift_id=EARLY.id))
+    context = week_context(WEEK_START, previous)
+
+    assert allowed(context, MaxConsecutiveDays(3), day(0), EARLY.id) == {2}
+    assert allowed(context, MaxConsecutiveDays(4), day(0), EARLY.id) == {1, 2}
+    assert allowed(context, MaxConsecutiveDays(3), day(1), EARLY.id) == {1, 2}
+
+
+def test_batch_weeks_see_the_week_scheduled_before_them():
+    first = build_schedule_context(1, WEEK_START, STAFF[:1], [EARLY], [], [], [])
+    second = build_schedule_context(2, WEEK_START + timedelta(days=7), STAFF[:1], [EARLY], [], [], [])
+
+    results = schedule_weeks([first, second], constraints=[MaxConsecutiveDays(5)])
+
+    first_days = [day(offset) for offset in (0, 1, 2, 3, 4, 6)]
+    assert [day_str for day_str, _, _ in results[0].assignments] == first_days
+    assert second.previous_week == [(day_str, 1, EARLY.id) for day_str in first_days]
+    # Sunday starts a run that Monday to Thursday fill up, so Friday is skipped.
+    assert [day_str for day_str, _, _ in results[1].assignments] == [day(offset) for offset in (7, 8, 9, 10, 12, 13)]
+
+
+def test_contexts_load_the_previous_week_from_its_confirmed_version(app_module, org, make_version):
+    org_id = org["org"].id
+    an, binh = org["staff"][:2]
+    day_shift, night_shift = org["shifts"]
+    previous_start = WEEK_START - timedelta(days=7)
+    make_version(org_id, previous_start, "confirmed", [(day(-1), an, night_shift)])
+    make_version(org_id, previous_start, "draft", [(day(-1), binh, day_shift)])
+    draft = make_version(org_id, WEEK_START, "draft", [])
+
+    context = app_module.load_schedule_contexts(
+        org_id, [draft], app_module.Staff.query.all(), app_module.ShiftTemplate.query.all()
+    )[0]
+
+    assert context.previous_week == [(day(-1), an.id, night_shift.id)]
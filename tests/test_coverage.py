@@ -0,0 +1,23 @@
+from utils.coverage import CoverageMatrix
+
+DAYS = ["2026-10-12", "2026-10-13"]
+
+
+def matrix():
+    coverage = CoverageMatrix([1, 2], DAYS, [(10, 8 * 60, 16 * 60), (11, 14 * 60, 22 * 60)])
+    coverage.add(1, DAYS[0], 10)
+    return coverage
+
+
+def test_overlaps_checks_the_staff_day_occupancy():
+    coverage = matrix()
+    assert coverage.overlaps(1, DAYS[0], 11)
+    assert not coverage.overlaps(1, DAYS[1], 11)
+    assert not coverage.overlaps(2, DAYS[0], 11)
+
+
+def test_overlaps_is_false_outside_the_matrix():
+    coverage = matrix()
+    assert not coverage.overlaps(1, "2026-10-19", 11)
+    assert not coverage.overlaps(3, DAYS[0], 11)
+    assert not coverage.overlaps(1, DAYS[0], 12)
@@ -0,0 +1,54 @@
+import csv
+import io
+from datetime import date, timedelta
+
+MONDAY = date(2026, 10, 12)
+
+
+def test_csv_chunks_pull_rows_only_as_they_are_written(app_module):
+    pulled = []
+
+    def rows():
+        for index in range(app_module.CSV_STREAM_ROWS * 2 + 5):
+            pulled.append(index)
+            yield {"n": index}
+
+    chunks = app_module.iter_csv_chunks(["n"], rows())
+    first = next(chunks)
+
+    assert len(pulled) == app_module.CSV_STREAM_ROWS
+    assert first.decode("utf-8").splitlines()[:2] == ["n", "0"]
+    rest = b"".join(chunks).decode("utf-8").splitlines()
+    assert len(rest) == app_module.CSV_STREAM_ROWS + 5
+    assert rest[-1] == str(app_module.CSV_STREAM_ROWS * 2 + 4)
+
+
+def test_roster_export_streams_one_line_per_staff_member(app_module, org, make_version, client):
+    org_id = org["org"].id
+    an, binh = org["staff"][:2]
+    day_shift, night_shift = org["shifts"]
+    tuesday = MONDAY + timedelta(days=1)
+    make_version(
+        org_id,
+        MONDAY,
+        "confirmed",
+        [(MONDAY, an, night_shift), (MONDAY, an, day_shift), (tuesday, binh, day_shift)],
+    )
+    make_version(org_id, MONDAY, "draft", [(MONDAY, binh, night_shift)])
+    query = {"start_date": MONDAY.isoformat(), "end_date": (MONDAY + timedelta(days=6)).isoformat()}
+
+    def export(**extra):
+        # Streamed responses hold their request context until read, so read each one in full.
+        response = client.get("/data/export/assignments", query_string={**query, **extra})
+        assert response.is_streamed
+        return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+    assert export() == [
+        ["staff_name", "role", MONDAY.isoformat(), tuesday.isoformat()],
+        ["An", "Cook", "Day | Night", ""],
+        ["Bình", "Server", "", "Day"],
+    ]
+    assert export(version_type="draft") == [
+        ["staff_name", "role", MONDAY.isoformat()],
+        ["Bình", "Server", "Night"],
+    ]
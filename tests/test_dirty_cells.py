@@ -0,0 +1,23 @@
+from datetime import date, timedelta
+
+WEDNESDAY = date(2026, 10, 14)
+
+
+def test_shift_changes_flag_only_draft_cells_from_today_on(app_module, org, make_version, today):
+    org_id = org["org"].id
+    shift = org["shifts"][0]
+    this_monday = app_module.monday_for(WEDNESDAY)
+    past = make_version(org_id, this_monday - timedelta(days=7), "draft", [])
+    current = make_version(org_id, this_monday, "draft", [])
+    upcoming = make_version(org_id, this_monday + timedelta(days=7), "draft", [])
+    today(WEDNESDAY)
+
+    app_module.mark_shift_dirty_cells(org_id, shift.id)
+    app_module.db.session.flush()
+
+    flagged = {}
+    for row in app_module.RosterDirtyCell.query.filter_by(org_id=org_id, shift_id=shift.id):
+        flagged.setdefault(row.version_id, []).append(row.roster_date)
+    assert past.id not in flagged
+    assert sorted(flagged[current.id]) == app_module.each_date(WEDNESDAY, this_monday + timedelta(days=6))
+    assert len(flagged[upcoming.id]) == 7
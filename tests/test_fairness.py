@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+
+def test_confirmed_week_is_not_carried_twice_in_a_batch(app_module, org, make_version, monkeypatch):
+    org_id = org["org"].id
+    first_week = app_module.monday_for(date(2026, 10, 12))
+    second_week = first_week + timedelta(days=7)
+    an, binh = org["staff"][:2]
+    day_shift = org["shifts"][0]
+    make_version(
+        org_id,
+        first_week,
+        "confirmed",
+        [(first_week + timedelta(days=offset), member, day_shift) for offset in range(3) for member in (an, binh)],
+    )
+    make_version(org_id, first_week, "draft", [])
+    seeded = {}
+    schedule_weeks = app_module.schedule_weeks
+
+    def spy(contexts, *args, **kwargs):
+        for context in contexts:
+            seeded[context.week_start] = (dict(context.recent_counts), set(context.confirmed_weeks))
+        results = schedule_weeks(contexts, *args, **kwargs)
+        seeded["final"] = (dict(contexts[1].recent_counts), dict(contexts[1].week_counts))
+        return results
+
+    monkeypatch.setattr(app_module, "schedule_weeks", spy)
+    app_module.auto_schedule_weeks(org_id, first_week, weeks=2)
+
+    counts, weeks = seeded[second_week]
+    assert weeks == {first_week}
+    assert counts == {an.id: 3, binh.id: 3}
+    final_counts, own_counts = seeded["final"]
+    assert final_counts == {
+        staff_id: counts.get(staff_id, 0) + own_counts.get(staff_id, 0)
+        for staff_id in set(counts) | set(own_counts)
+        if counts.get(staff_id, 0) + own_counts.get(staff_id, 0)
+    }
+
+
+def test_empty_confirmed_week_is_summarized_once(app_module, org, make_version, monkeypatch):
+    org_id = org["org"].id
+    week = app_module.monday_for(date(2026, 10, 12))
+    empty_week = make_version(org_id, week - timedelta(days=7), "confirmed", [])
+    refreshed = []
+    refresh = app_module.refresh_staff_week_history
+
+    def spy(org_id, version):
+        refreshed.append(version.id)
+        refresh(org_id, version)
+
+    monkeypatch.setattr(app_module, "refresh_staff_week_history", spy)
+    app_module.auto_schedule_weeks(org_id, week, weeks=1)
+    app_module.auto_schedule_weeks(org_id, week, weeks=1)
+
+    assert refreshed == [empty_week.id]
+    assert app_module.StaffWeekHistory.query.filter_by(version_id=empty_week.id).count() == 0
@@ -0,0 +1,157 @@
+from datetime import date, timedelta
+
+WEEK_START = date(2026, 10, 5)
+
+
+def seed_confirmed_weeks(org, make_version):
+    """Two confirmed weeks, each with a draft beside it, with overnight shifts and a staff member without a wage."""
+    org_id = org["org"].id
+    an, binh, duc, zoe = org["staff"]
+    day_shift, night_shift = org["shifts"]
+    days = [WEEK_START + timedelta(days=offset) for offset in range(14)]
+    make_version(
+        org_id,
+        WEEK_START,
+        "confirmed",
+        [(day, an, night_shift) for day in days[:7]]
+        + [(day, an, day_shift) for day in days[:3]]
+        + [(day, duc, day_shift) for day in days[2:6]],
+    )
+    make_version(org_id, WEEK_START, "draft", [(day, binh, night_shift) for day in days[:7]])
+    second_week = days[7]
+    make_version(
+        org_id,
+        second_week,
+        "confirmed",
+        [(day, binh, day_shift) for day in days[7:12]]
+        + [(day, zoe, night_shift) for day in days[7:14]]
+        + [(days[13], duc, night_shift)],
+    )
+    make_version(org_id, second_week, "draft", [(day, an, day_shift) for day in days[7:14]])
+
+def test_payroll_aggregations_yield_identical_rows(app_module, org, make_version):
+    seed_confirmed_weeks(org, make_version)
+    org_id = org["org"].id
+    start_date, end_date = WEEK_START.isoformat(), (WEEK_START + timedelta(days=13)).isoformat()
+    assert app_module.backfill_payroll_ledger() == 2
+    staff_ids = [member.id for member in org["staff"]]
+
+    def rows(aggregation, department=None):
+        return [
+            (staff_id, str(roster_date), int(centihours))
+            for staff_id, roster_date, centihours in app_module.payroll_hour_rows(
+                org_id, staff_ids, start_date, end_date, department, aggregation
+            )
+        ]
+
+    python_rows = rows("python")
+    assert len(python_rows) == 7 + 4 + 5 + 7 + 1
+    assert (org["staff"][0].id, WEEK_START.isoformat(), 833 + 792) in python_rows
+    assert rows("sql") == python_rows
+    assert rows("ledger") == python_rows
+    assert rows("sql", "Floor") == rows("python", "Floor") == rows("ledger", "Floor")
+
+
+def ledger_rows(app_module, version_id):
+    return {
+        (row.id, row.staff_id, row.roster_date, row.centihours)
+        for row in app_module.PayrollLedgerEntry.query.filter_by(version_id=version_id)
+    }
+
+
+def test_payroll_page_reads_without_writing_the_ledger(app_module, org, make_version, client):
+    make_version(org["org"].id, WEEK_START, "confirmed", [(WEEK_START, org["staff"][0], org["shifts"][0])])
+
+    response = client.get("/payroll", query_string={"start_date": "2026-10-01", "end_date": "2026-10-31"})
+
+    assert response.status_code == 200
+    assert app_module.PayrollLedgerEntry.query.count() == 0
+
+
+def test_shift_time_edit_rewrites_only_the_ledger_of_versions_using_it(app_module, org, make_version, client):
+    org_id = org["org"].id
+    an, binh = org["staff"][:2]
+    day_shift, night_shift = org["shifts"]
+    day_version = make_version(org_id, WEEK_START, "confirmed", [(WEEK_START, an, day_shift)])
+    night_week = WEEK_START + timedelta(days=7)
+    night_version = make_version(org_id, night_week, "confirmed", [(night_week, binh, night_shift)])
+    app_module.backfill_payroll_ledger()
+    night_rows = ledger_rows(app_module, night_version.id)
+
+    response = client.post(
+        f"/shifts/{day_shift.id}/edit",
+        data={"name": "Day", "start_time": "08:00", "end_time": "16:00", "required_staff": "2"},
+    )
+
+    assert response.status_code == 302
+    app_module.db.session.expire_all()
+    assert [row[1:] for row in ledger_rows(app_module, day_version.id)] == [(an.id, WEEK_START.isoformat(), 800)]
+    assert ledger_rows(app_module, night_version.id) == night_rows
+
+
+def test_payroll_and_exports_order_staff_by_python_folded_names(app_module, org, make_version, client):
+    org_id = org["org"].id
+    db = app_module.db
+    dat = app_module.Staff(org_id=org_id, name="Đạt", role="Cook", hourly_wage=10)
+    dong = app_module.Staff(org_id=org_id, name="đông", role="Cook", hourly_wage=10)
+    db.session.add_all([dat, dong])
+    db.session.commit()
+    staff = [*org["staff"], dat, dong]
+    make_version(org_id, WEEK_START, "confirmed", [(WEEK_START, member, org["shifts"][0]) for member in staff])
+    app_module.backfill_payroll_ledger()
+    # SQLite's lower() keeps "Đ" upper case and would put "Đạt" before "đông".
+    expected = ["An", "Bình", "Zoe", "đông", "Đạt", "Đức"]
+    query = {"start_date": WEEK_START.isoformat(), "end_date": WEEK_START.isoformat()}
+
+    payroll_csv = client.get("/payroll", query_string={**query, "export": "csv"}).get_data(as_text=True)
+    roster_csv = client.get("/data/export/assignments", query_string=query).get_data(as_text=True)
+
+    assert [line.split(",")[0] for line in payroll_csv.splitlines()[1:]] == expected
+    assert [line.split(",")[0] for line in roster_csv.splitlines()[1:]] == expected
+    staff_ids = [member.id for member in sorted(staff, key=app_module.staff_sort_key)]
+    for aggregation in ("sql", "python", "ledger"):
+        rows = app_module.payroll_hour_rows(org_id, staff_ids, query["start_date"], query["end_date"], None, aggregation)
+        assert [row[0] for row in rows] == staff_ids
+
+
+def test_closed_month_keeps_the_wages_it_was_closed_with(app_module, org, make_version, client):
+    org_id = org["org"].id
+    an, zoe = org["staff"][0], org["staff"][3]
+    day_shift = org["shifts"][0]
+    monday = date(2025, 9, 1)
+    make_version(org_id, monday, "confirmed", [(monday, an, day_shift), (monday, zoe, day_shift)])
+    app_module.backfill_payroll_ledger()
+    periods_csv = {"year": "2025", "export": "csv"}
+
+    client.post("/payroll/periods/close", data={"month": "2025-09"})
+    closed = client.get("/payroll/periods", query_string=periods_csv).get_data(as_text=True)
+    client.post(
+        f"/staff/{zoe.id}/edit",
+        data={"name": zoe.name, "role": zoe.role, "department": zoe.department, "hourly_wage": "20"},
+    )
+    app_module.db.session.expire_all()
+
+    assert app_module.db.session.get(app_module.Staff, zoe.id).hourly_wage == 20
+    assert client.get("/payroll/periods", query_string=periods_csv).get_data(as_text=True) == closed
+    assert closed.splitlines()[1:] == ["An,Cook,8.33,8.33,104.13", "Zoe,Cook,8.33,8.33,118.70"]
+    live = client.get("/payroll", query_string={"start_date": "2025-09-01", "end_date": "2025-09-30", "export": "csv"})
+    assert "166.60" in live.get_data(as_text=True)
+
+
+def test_closed_period_lines_store_the_sheet_integers(app_module, org, make_version):
+    org_id = org["org"].id
+    an, duc = org["staff"][0], org["staff"][2]
+    day_shift, night_shift = org["shifts"]
+    monday = date(2025, 9, 1)
+    make_version(
+        org_id, monday, "confirmed", [(monday, an, day_shift), (monday, an, night_shift), (monday, duc, day_shift)]
+    )
+    app_module.backfill_payroll_ledger()
+
+    period = app_module.close_payroll_period(org_id, monday, date(2025, 9, 30), None)
+
+    lines = app_module.PayrollPeriodLine.query.filter_by(period_id=period.id).order_by(app_module.PayrollPeriodLine.id)
+    assert [(line.staff_name, line.centihours, line.wage_cents, line.salary_cents) for line in lines] == [
+        ("An", 833 + 792, 1250, 20313),
+        ("Đức", 833, None, 0),
+    ]
@@ -0,0 +1,63 @@
+from datetime import date
+
+MONDAY = date(2026, 10, 12)
+
+
+def assign(client, staff, shift, version_id=0):
+    return client.post(
+        "/roster/cells",
+        json={
+            "action": "assign",
+            "version_id": version_id,
+            "roster_date": MONDAY.isoformat(),
+            "staff_id": staff.id,
+            "shift_id": shift.id,
+        },
+    )
+
+
+def test_assign_without_version_checks_overlaps_in_the_existing_draft(app_module, org, make_version, client):
+    an = org["staff"][0]
+    day_shift = org["shifts"][0]
+    mid_shift = app_module.ShiftTemplate(
+        org_id=org["org"].id, name="Mid", start_time="12:00", end_time="18:00", required_staff=1
+    )
+    app_module.db.session.add(mid_shift)
+    app_module.db.session.commit()
+    draft = make_version(org["org"].id, MONDAY, "draft", [(MONDAY, an, day_shift)])
+
+    response = assign(client, an, mid_shift)
+
+    assert response.status_code == 409
+    with app_module.app.test_request_context():
+        assert response.get_json()["error"] == app_module.t("msg_shift_overlap")
+    assert app_module.RosterAssignment.query.filter_by(version_id=draft.id).count() == 1
+    assert app_module.RosterVersion.query.count() == 1
+
+
+def test_assign_returns_only_the_changed_cells_and_their_shift_fill(app_module, org, make_version, client):
+    an, binh = org["staff"][:2]
+    day_shift, night_shift = org["shifts"]
+    draft = make_version(org["org"].id, MONDAY, "draft", [(MONDAY, an, day_shift)])
+
+    response = assign(client, binh, day_shift)
+
+    payload = response.get_json()
+    assert response.status_code == 200
+    assert payload["version_id"] == draft.id
+    assert [(cell["staff_id"], cell["date"]) for cell in payload["cells"]] == [(binh.id, MONDAY.isoformat())]
+    assert "Day" in payload["cells"][0]["html"]
+    assert payload["fill"] == [
+        {"date": MONDAY.isoformat(), "shift_id": day_shift.id, "count": 2, "required_staff": 2, "level": "full"},
+        {"date": MONDAY.isoformat(), "shift_id": night_shift.id, "count": 0, "required_staff": 1, "level": "low"},
+    ]
+
+
+def test_roster_page_renders_the_shift_fill_cells_the_cell_api_patches(app_module, org, make_version, client):
+    an = org["staff"][0]
+    day_shift = org["shifts"][0]
+    make_version(org["org"].id, MONDAY, "draft", [(MONDAY, an, day_shift)])
+
+    html = client.get("/roster", query_string={"roster_date": MONDAY.isoformat()}).get_data(as_text=True)
+
+    assert f'<td class="heat-partial" data-shift-fill="{day_shift.id}_{MONDAY.isoformat()}">1/2</td>' in html
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+MONDAY = date(2026, 10, 12)
+NEXT_MONDAY = MONDAY + timedelta(days=7)
+
+
+def availability(app_module, org_id, staff, day, status):
+    return app_module.StaffAvailability(
+        org_id=org_id, staff_id=staff.id, start_date=day.isoformat(), end_date=day.isoformat(), status=status
+    )
+
+
+def test_clone_skips_staff_on_leave_or_inactive_on_the_target_dates(app_module, org, make_version, client):
+    db = app_module.db
+    org_id = org["org"].id
+    an, binh, _, zoe = org["staff"]
+    day_shift = org["shifts"][0]
+    tuesday = MONDAY + timedelta(days=1)
+    source = make_version(
+        org_id,
+        MONDAY,
+        "confirmed",
+        [(day, member, day_shift) for day in (MONDAY, tuesday) for member in (an, binh)] + [(MONDAY, zoe, day_shift)],
+    )
+    zoe.active = 0
+    db.session.add_all(
+        [
+            availability(app_module, org_id, binh, NEXT_MONDAY, "leave"),
+            availability(app_module, org_id, an, NEXT_MONDAY, "available"),
+            # Leave on the source week does not matter, only on the dates copied to.
+            availability(app_module, org_id, an, tuesday, "leave"),
+        ]
+    )
+    db.session.commit()
+
+    response = client.post(f"/roster/clone/{source.id}", data={"weeks": "1"})
+
+    assert response.status_code == 302
+    draft = app_module.RosterVersion.query.filter_by(org_id=org_id, week_start=NEXT_MONDAY, status="draft").one()
+    copied = {
+        (row.staff_id, row.roster_date)
+        for row in app_module.RosterAssignment.query.filter_by(version_id=draft.id)
+    }
+    next_tuesday = (NEXT_MONDAY + timedelta(days=1)).isoformat()
+    assert copied == {(an.id, NEXT_MONDAY.isoformat()), (an.id, next_tuesday), (binh.id, next_tuesday)}
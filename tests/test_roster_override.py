@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+MONDAY = date(2026, 10, 12)
+WEEK = [MONDAY + timedelta(days=offset) for offset in range(7)]
+
+
+def assignments(app_module, version_id):
+    return {
+        (row.staff_id, row.roster_date): (row.id, row.shift_id)
+        for row in app_module.RosterAssignment.query.filter_by(version_id=version_id)
+    }
+
+
+def test_override_of_page_two_leaves_page_one_rows_untouched(app_module, org, make_version, client, today):
+    an, binh, duc, zoe = org["staff"]
+    day_shift, night_shift = org["shifts"]
+    version = make_version(
+        org["org"].id,
+        MONDAY,
+        "confirmed",
+        [(WEEK[0], an, day_shift), (WEEK[1], binh, night_shift), (WEEK[0], zoe, day_shift)],
+    )
+    before = assignments(app_module, version.id)
+    today(WEEK[2])
+    # Page two of a two-per-page grid posts only Đức's and Zoe's cells.
+    form = {f"assignment_{member.id}_{day.isoformat()}": "0" for member in (duc, zoe) for day in WEEK}
+    form[f"assignment_{duc.id}_{WEEK[0].isoformat()}"] = str(day_shift.id)
+    form[f"assignment_{zoe.id}_{WEEK[2].isoformat()}"] = str(night_shift.id)
+
+    response = client.post(f"/roster/confirmed/{version.id}/override", data=form)
+
+    assert response.status_code == 302
+    app_module.db.session.expire_all()
+    after = assignments(app_module, version.id)
+    for key in [(an.id, WEEK[0].isoformat()), (binh.id, WEEK[1].isoformat())]:
+        assert after.pop(key) == before[key]
+    assert {key: shift_id for key, (_, shift_id) in after.items()} == {
+        (duc.id, WEEK[0].isoformat()): day_shift.id,
+        (zoe.id, WEEK[2].isoformat()): night_shift.id,
+    }
@@ -0,0 +1,33 @@
+import re
+from datetime import date, timedelta
+
+MONDAY = date(2026, 10, 12)
+
+
+def test_month_overview_shows_the_default_version_coverage_per_day(app_module, org, make_version, client):
+    org_id = org["org"].id
+    an, binh, duc, zoe = org["staff"]
+    day_shift, night_shift = org["shifts"]
+    days = [MONDAY + timedelta(days=offset) for offset in range(7)]
+    make_version(
+        org_id,
+        MONDAY,
+        "confirmed",
+        [(days[0], an, day_shift), (days[0], binh, day_shift), (days[0], duc, night_shift)]
+        + [(days[1], an, day_shift)]
+        + [(days[2], an, day_shift), (days[2], binh, day_shift)]
+        # A third person on a two-person shift does not make up for the empty night.
+        + [(days[3], member, day_shift) for member in (an, binh, zoe)],
+    )
+    make_version(org_id, MONDAY, "draft", [(day, member, day_shift) for day in days for member in (an, binh)])
+    make_version(org_id, MONDAY + timedelta(days=7), "draft", [])
+
+    html = client.get("/roster/overview", query_string={"month": "2026-10"}).get_data(as_text=True)
+
+    levels = re.findall(r'class="heat-(\w+)"', html)
+    assert len(levels) == 5 * 7
+    weeks = [levels[offset : offset + 7] for offset in range(0, len(levels), 7)]
+    assert weeks[0] == weeks[1] == weeks[4] == ["none"] * 7
+    assert weeks[2] == ["full", "low", "partial", "partial", "low", "low", "low"]
+    assert weeks[3] == ["low"] * 7
+    assert "Day: 3/2" in html
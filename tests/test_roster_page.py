@@ -0,0 +1,12 @@
+import re
+
+
+def test_auto_schedule_form_renders_its_own_input_attributes(app_module, org, client):
+    html = client.get("/roster", query_string={"roster_date": "2026-10-12"}).get_data(as_text=True)
+
+    form = re.search(r'<form id="auto-schedule-form".*?</form>', html, re.S).group(0)
+    week_start, weeks = re.findall(r"<input\b[^>]*\bclass=\"ui-input[^>]*>", form, re.S)
+    assert 'name="week_start"' in week_start and 'value="2026-10-12"' in week_start
+    assert not re.search(r'\bm(in|ax)="', week_start)
+    assert 'name="weeks"' in weeks and 'type="number"' in weeks and 'value="1"' in weeks
+    assert 'min="1"' in weeks and f'max="{app_module.MAX_AUTO_SCHEDULE_WEEKS}"' in weeks
@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+MONDAY = date(2026, 10, 12)
+
+
+def count_queries(app_module, request):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(app_module.db.engine, "before_cursor_execute", record)
+    try:
+        response = request()
+    finally:
+        event.remove(app_module.db.engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_snapshot_returns_the_week_of_the_selected_draft(app_module, org, make_version, client):
+    an, binh = org["staff"][:2]
+    day_shift, night_shift = org["shifts"]
+    org_id = org["org"].id
+    confirmed = make_version(org_id, MONDAY, "confirmed", [(MONDAY, an, day_shift)])
+    draft = make_version(org_id, MONDAY, "draft", [(MONDAY, an, day_shift), (MONDAY, binh, night_shift)])
+    app_module.mark_dirty_cells(org_id, [(draft.id, MONDAY.isoformat(), day_shift.id)])
+    app_module.db.session.commit()
+
+    default = client.get("/roster/snapshot", query_string={"roster_date": MONDAY.isoformat()}).get_json()
+    selected = client.get("/roster/snapshot", query_string={"version_id": draft.id}).get_json()
+
+    assert default["current_version"]["id"] == confirmed.id
+    assert default["dirty_cell_count"] == 0
+    assert {version["id"] for version in default["versions"]} == {confirmed.id, draft.id}
+    assert selected["current_version"]["id"] == draft.id
+    assert selected["dirty_cell_count"] == 1
+    assert selected["fill"][MONDAY.isoformat()] == {str(day_shift.id): 1, str(night_shift.id): 1}
+    assert [(cell["staff_id"], cell["date"]) for cell in selected["cells"]] == [
+        (an.id, MONDAY.isoformat()),
+        (binh.id, MONDAY.isoformat()),
+    ]
+
+
+def test_roster_page_query_count_does_not_grow_with_the_roster(app_module, org, make_version, client):
+    org_id = org["org"].id
+    day_shift = org["shifts"][0]
+    make_version(org_id, MONDAY, "confirmed", [(MONDAY, member, day_shift) for member in org["staff"]])
+    draft = make_version(org_id, MONDAY, "draft", [(MONDAY, org["staff"][0], day_shift)])
+    page = {"roster_date": MONDAY.isoformat(), "version_id": draft.id}
+    small = count_queries(app_module, lambda: client.get("/roster", query_string=page))
+
+    extra_staff = [app_module.Staff(org_id=org_id, name=f"Extra {index:02d}", role="Cook") for index in range(30)]
+    app_module.db.session.add_all(extra_staff)
+    app_module.db.session.commit()
+    app_module.db.session.add_all(
+        [
+            app_module.RosterAssignment(
+                org_id=org_id,
+                version_id=draft.id,
+                roster_date=(MONDAY + timedelta(days=index % 7)).isoformat(),
+                staff_id=member.id,
+                shift_id=day_shift.id,
+            )
+            for index, member in enumerate(extra_staff)
+        ]
+    )
+    app_module.touch_roster_version(draft)
+    app_module.db.session.commit()
+
+    assert count_queries(app_module, lambda: client.get("/roster", query_string=page)) == small
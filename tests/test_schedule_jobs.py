@@ -0,0 +1,76 @@
+import subprocess
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+
+def test_job_progress_is_visible_to_other_connections_while_running(app_module, org, monkeypatch):
+    db = app_module.db
+    week_start = app_module.monday_for(date(2026, 10, 12))
+    job = app_module.ScheduleJob(org_id=org["org"].id, week_start=week_start, weeks=2, days_total=14)
+    db.session.add(job)
+    db.session.commit()
+    jobs = app_module.ScheduleJob.__table__
+    seen = []
+    save_progress = app_module.save_schedule_job_progress
+
+    def spy(job_id, **values):
+        save_progress(job_id, **values)
+        with db.engine.connect() as connection:
+            seen.append(connection.execute(select(jobs.c.status, jobs.c.days_done).where(jobs.c.id == job_id)).one())
+
+    monkeypatch.setattr(app_module, "save_schedule_job_progress", spy)
+    app_module.run_schedule_job(job.id)
+
+    assert seen == [("running", done) for done in range(1, 15)]
+    db.session.expire_all()
+    finished = db.session.get(app_module.ScheduleJob, job.id)
+    assert (finished.status, finished.days_done) == ("finished", 14)
+    assert finished.added > 0
+
+
+def test_poll_reads_progress_from_the_job_row(app_module, org, client):
+    db = app_module.db
+    job = app_module.ScheduleJob(
+        org_id=org["org"].id,
+        week_start=date(2026, 10, 12),
+        status="running",
+        days_total=7,
+        worker=app_module.schedule_job_worker(),
+    )
+    db.session.add(job)
+    db.session.commit()
+    app_module.save_schedule_job_progress(job.id, days_done=3, added=5, unfilled=1)
+    db.session.expire_all()
+
+    payload = client.get(f"/roster/auto-schedule/jobs/{job.id}").get_json()
+    assert (payload["days_done"], payload["added"], payload["unfilled"]) == (3, 5, 1)
+
+
+def test_startup_fails_jobs_orphaned_by_a_restart(app_module, org):
+    db = app_module.db
+    finished_process = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    dead_worker = f"{app_module.socket.gethostname()}:{finished_process.stdout.strip()}"
+    now_utc = datetime.utcnow()
+    rows = {
+        "dead": app_module.ScheduleJob(status="running", worker=dead_worker, heartbeat_at=now_utc),
+        "stale": app_module.ScheduleJob(status="queued", worker="other-host:1", heartbeat_at=now_utc - timedelta(hours=1)),
+        "alive": app_module.ScheduleJob(status="running", worker=app_module.schedule_job_worker(), heartbeat_at=now_utc),
+        "remote": app_module.ScheduleJob(status="running", worker="other-host:1", heartbeat_at=now_utc),
+    }
+    for job in rows.values():
+        job.org_id = org["org"].id
+        job.week_start = date(2026, 10, 12)
+        job.created_at = now_utc - timedelta(hours=2)
+    db.session.add_all(rows.values())
+    db.session.commit()
+
+    assert app_module.fail_orphaned_schedule_jobs() == 2
+    assert {name: job.status for name, job in rows.items()} == {
+        "dead": "failed",
+        "stale": "failed",
+        "alive": "running",
+        "remote": "running",
+    }
+    assert rows["dead"].error == "msg_auto_schedule_job_interrupted"
@@ -0,0 +1,94 @@
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from utils.scheduling import (
+    AUTO_SCHEDULED_NOTE,
+    ScheduleResult,
+    build_schedule_context,
+    clone_for_day,
+    day_choice_costs,
+    fill_cost,
+    fill_day_greedy,
+    fill_day_min_cost,
+    schedule_weeks,
+)
+
+WEEK_START = date(2026, 10, 12)
+
+
+def random_context(seed):
+    rnd = random.Random(seed)
+    shift_specs = [("06:00", "12:00"), ("10:00", "16:00"), ("14:00", "22:00"), ("22:00", "06:00"), ("12:00", "14:00")]
+    shifts = [
+        SimpleNamespace(id=index + 1, name=f"S{index}", start_time=start, end_time=end, required_staff=rnd.randint(1, 4))
+        for index, (start, end) in enumerate(rnd.sample(shift_specs, rnd.randint(2, 5)))
+    ]
+    staff = [SimpleNamespace(id=index + 1, name=f"Staff {index:02d}") for index in range(rnd.randint(3, 12))]
+    days = [(WEEK_START + timedelta(days=offset)).isoformat() for offset in range(7)]
+    leave = [
+        SimpleNamespace(staff_id=member.id, start_date=day, end_date=day, status="leave")
+        for member in staff
+        for day in days
+        if rnd.random() < 0.15
+    ]
+    preferences = [
+        SimpleNamespace(staff_id=member.id, shift_id=rnd.choice(shifts).id, start_date=days[0], end_date=days[-1])
+        for member in staff
+        if rnd.random() < 0.3
+    ]
+    history = {member.id: rnd.randint(0, 6) for member in staff}
+    return build_schedule_context(1, WEEK_START, staff, shifts, [], leave, preferences, history_counts=history)
+
+
+def test_min_cost_day_is_never_worse_than_greedy():
+    for seed in range(150):
+        context = random_context(seed)
+        for day_str, day in context.days.items():
+            costs = day_choice_costs(context, day_str, day, context.shifts)
+            greedy_context = clone_for_day(context, day_str)
+            greedy = ScheduleResult()
+            fill_day_greedy(greedy_context, day_str, greedy_context.days[day_str], greedy)
+            solved = ScheduleResult()
+            assert fill_day_min_cost(context, day_str, day, solved)
+            assert solved.unfilled <= greedy.unfilled, seed
+            if solved.unfilled == greedy.unfilled:
+                assert fill_cost(costs, solved) <= fill_cost(costs, greedy), seed
+
+
+def test_min_cost_day_fills_a_slot_greedy_leaves_open():
+    """Greedy gives An the early shift; nobody is left for the late one, as Bình's closing shift overlaps it."""
+    shifts = [
+        SimpleNamespace(id=1, name="Early", start_time="06:00", end_time="14:00", required_staff=1),
+        SimpleNamespace(id=2, name="Late", start_time="12:00", end_time="20:00", required_staff=1),
+        SimpleNamespace(id=3, name="Close", start_time="15:00", end_time="22:00", required_staff=1),
+    ]
+    staff = [SimpleNamespace(id=1, name="An"), SimpleNamespace(id=2, name="Bình")]
+    day_str = WEEK_START.isoformat()
+    closing = SimpleNamespace(
+        version_id=1,
+        roster_date=day_str,
+        staff_id=2,
+        shift_id=3,
+        notes=AUTO_SCHEDULED_NOTE,
+        start_time="15:00",
+        end_time="22:00",
+    )
+    context = build_schedule_context(1, WEEK_START, staff, shifts, [closing], [], [])
+    day = context.days[day_str]
+
+    greedy_context = clone_for_day(context, day_str)
+    greedy = ScheduleResult()
+    fill_day_greedy(greedy_context, day_str, greedy_context.days[day_str], greedy)
+    solved = ScheduleResult()
+    assert fill_day_min_cost(context, day_str, day, solved)
+
+    assert greedy.assignments == [(day_str, 1, 1)] and greedy.unfilled == 1
+    assert sorted(solved.assignments) == [(day_str, 1, 2), (day_str, 2, 1)]
+    assert solved.unfilled == 0
+
+
+def test_optimal_mode_falls_back_to_greedy_without_time_budget_left():
+    greedy = schedule_weeks([random_context(3)], mode="greedy")[0]
+    optimal = schedule_weeks([random_context(3)], mode="optimal", time_budget=0)[0]
+    assert optimal.assignments == greedy.assignments
@@ -0,0 +1,58 @@
+from datetime import date
+
+from utils.snapshot_cache import SnapshotCache
+
+MONDAY = date(2026, 10, 12)
+
+
+def test_touch_roster_version_makes_the_next_read_miss(app_module, org, make_version):
+    db = app_module.db
+    an, binh = org["staff"][:2]
+    day_shift = org["shifts"][0]
+    version = make_version(org["org"].id, MONDAY, "draft", [(MONDAY, an, day_shift)])
+    cache = app_module.roster_snapshot_cache
+
+    first = app_module.load_version_assignments(version)
+    old_key = app_module.roster_snapshot_key(version)
+    assert cache.get(old_key) == first
+
+    db.session.add(
+        app_module.RosterAssignment(
+            org_id=version.org_id,
+            version_id=version.id,
+            roster_date=MONDAY.isoformat(),
+            staff_id=binh.id,
+            shift_id=day_shift.id,
+        )
+    )
+    app_module.touch_roster_version(version)
+    db.session.commit()
+
+    assert cache.get(old_key) is None
+    assert app_module.roster_snapshot_key(version) != old_key
+    second = app_module.load_version_assignments(version)
+    assert sorted(row[2] for row in second) == sorted([an.id, binh.id])
+
+
+def test_shared_directory_serves_other_caches_until_invalidated(tmp_path):
+    writer = SnapshotCache(4, str(tmp_path))
+    reader = SnapshotCache(4, str(tmp_path))
+    key = (1, 7, "assignments-2026-10-12T08:00:00")
+
+    writer.put(key, [(1, "2026-10-12", 2, 3, False)])
+    assert reader.get(key) == [(1, "2026-10-12", 2, 3, False)]
+
+    writer.invalidate(1, 7)
+    assert SnapshotCache(4, str(tmp_path)).get(key) is None
+    assert writer.get(key) is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SnapshotCache(2)
+    cache.put((1, 1, "a"), "one")
+    cache.put((1, 2, "a"), "two")
+    cache.get((1, 1, "a"))
+    cache.put((1, 3, "a"), "three")
+
+    assert cache.get((1, 2, "a")) is None
+    assert cache.get((1, 1, "a")) == "one"
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import copy
+from datetime import date
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from utils.scheduling import ScheduleContext, ShiftInfo
+
+DAY_MINUTES = 24 * 60
+WEEK_DAYS = 7
+
+
+class Constraint:
+    """A scheduling rule compiled once per run into bitmasks over staff positions.
+
+    Bit ``i`` of a mask stands for ``context.staff[i]``. ``allowed`` returns the
+    staff the rule accepts for a slot; a hard rule excludes everyone else, a soft
+    rule adds ``weight`` to their rank instead. ``record`` keeps the rule's state
+    in step with each pick, so masks are updated per assignment rather than
+    recomputed per slot.
+    """
+
+    def __init__(self, hard: bool = True, weight: int = 1) -> None:
+        self.hard = hard
+        self.weight = weight
+        self.full_mask = 0
+
+    def compile(self, context: ScheduleContext) -> Constraint:
+        compiled = copy.copy(self)
+        compiled.full_mask = (1 << len(context.staff)) - 1
+        compiled.prepare(context)
+        return compiled
+
+    def prepare(self, context: ScheduleContext) -> None:
+        """Build the rule's state from the assignments already in ``context``."""
+
+    def allowed(self, day_str: str, shift: ShiftInfo) -> int:
+        return self.full_mask
+
+    def record(self, position: int, day_str: str, shift: ShiftInfo) -> None:
+        """Update the rule's state after ``context.staff[position]`` takes ``shift``."""
+
+    def copy(self) -> Constraint:
+        return copy.copy(self)
+
+
+def existing_assignments(context: ScheduleContext) -> Iterable[tuple[int, str, ShiftInfo]]:
+    """(staff position, date, shift) for the assignments a context was built with."""
+    positions = {staff.id: position for position, staff in enumerate(context.staff)}
+    shifts_by_id = {shift.id: shift for shift in context.shifts}
+    for staff_id, day_str, shift_id in context.coverage.assignments():
+        position = positions.get(staff_id)
+        shift = shifts_by_id.get(shift_id)
+        if position is not None and shift is not None:
+            yield position, day_str, shift
+
+
+def previous_assignments(context: ScheduleContext) -> Iterable[tuple[int, int, ShiftInfo]]:
+    """(staff position, day offset, shift) for the week before a context; offsets run from -7 to -1."""
+    positions = {staff.id: position for position, staff in enumerate(context.staff)}
+    shifts_by_id = {shift.id: shift for shift in context.shifts}
+    for day_str, staff_id, shift_id in context.previous_week:
+        offset = (date.fromisoformat(day_str) - context.week_start).days
+        position = positions.get(staff_id)
+        shift = shifts_by_id.get(shift_id)
+        if -WEEK_DAYS <= offset < 0 and position is not None and shift is not None:
+            yield position, offset, shift
+
+
+class ShiftAttributeMatch(Constraint):
+    """Only staff whose ``attribute`` (role or department) equals the shift's, when the shift sets one."""
+
+    def __init__(self, attribute: str, hard: bool = True, weight: int = 1) -> None:
+        super().__init__(hard=hard, weight=weight)
+        self.attribute = attribute
+        self.masks: dict[int, int] = {}
+
+    def prepare(self, context: ScheduleContext) -> None:
+        by_value: dict[str, int] = {}
+        for position, staff in enumerate(context.staff):
+            value = (getattr(staff, self.attribute) or "").strip().casefold()
+            by_value[value] = by_value.get(value, 0) | (1 << position)
+        self.masks = {}
+        for shift in context.shifts:
+            wanted = (getattr(shift, self.attribute) or "").strip().casefold()
+            self.masks[shift.id] = by_value.get(wanted, 0) if wanted else self.full_mask
+
+    def allowed(self, day_str: str, shift: ShiftInfo) -> int:
+        return self.masks.get(shift.id, self.full_mask)
+
+
+class MaxWeeklyMinutes(Constraint):
+    """Cap the minutes a staff member works in the scheduled week."""
+
+    def __init__(self, limit_minutes: int, hard: bool = True, weight: int = 1) -> None:
+        super().__init__(hard=hard, weight=weight)
+        self.limit_minutes = limit_minutes
+        self.minutes: list[int] = []
+        self.masks_by_duration: dict[int, int] = {}
+
+    def prepare(self, context: ScheduleContext) -> None:
+        self.minutes = [0] * len(context.staff)
+        for position, _, shift in existing_assignments(context):
+            self.minutes[position] += shift.end_minutes - shift.start_minutes
+        self.masks_by_duration = {}
+
+    def allowed(self, day_str: str, shift: ShiftInfo) -> int:
+        duration = shift.end_minutes - shift.start_minutes
+        mask = self.masks_by_duration.get(duration)
+        if mask is None:
+            mask = 0
+            for position, worked in enumerate(self.minutes):
+                if worked + duration <= self.limit_minutes:
+                    mask |= 1 << position
+            self.masks_by_duration[duration] = mask
+        return mask
+
+    def record(self, position: int, day_str: str, shift: ShiftInfo) -> None:
+        self.minutes[position] += shift.end_minutes - shift.start_minutes
+        for duration in self.masks_by_duration:
+            if self.minutes[position] + duration > self.limit_minutes:
+                self.masks_by_duration[duration] &= ~(1 << position)
+
+    def copy(self) -> Constraint:
+        clone = copy.copy(self)
+        clone.minutes = list(self.minutes)
+        clone.masks_by_duration = dict(self.masks_by_duration)
+        return clone
+
+
+class MinimumRest(Constraint):
+    """Require ``rest_minutes`` between the end of one shift and the start of the next.
+
+    Shifts are placed on a week-long minute axis, so overnight shifts that end
+    the next morning count against that morning's shifts. The previous week's
+    shifts sit before day 0, so a late Sunday shift counts against Monday.
+    """
+
+    def __init__(self, rest_minutes: int, hard: bool = True, weight: int = 1) -> None:
+        super().__init__(hard=hard, weight=weight)
+        self.rest_minutes = rest_minutes
+        self.cells: dict[tuple[str, int], tuple[int, int]] = {}
+        self.blocked: dict[tuple[str, int], int] = {}
+
+    def prepare(self, context: ScheduleContext) -> None:
+        self.cells = {
+            (day_str, shift.id): (offset * DAY_MINUTES + shift.start_minutes, offset * DAY_MINUTES + shift.end_minutes)
+            for offset, day_str in enumerate(context.days)
+            for shift in context.shifts
+        }
+        self.blocked = {cell: 0 for cell in self.cells}
+        for position, offset, shift in previous_assignments(context):
+            self.block(position, offset * DAY_MINUTES + shift.start_minutes, offset * DAY_MINUTES + shift.end_minutes)
+        for position, day_str, shift in existing_assignments(context):
+            self.record(position, day_str, shift)
+
+    def allowed(self, day_str: str, shift: ShiftInfo) -> int:
+        return self.full_mask & ~self.blocked.get((day_str, shift.id), 0)
+
+    def record(self, position: int, day_str: str, shift: ShiftInfo) -> None:
+        interval = self.cells.get((day_str, shift.id))
+        if interval is not None:
+            self.block(position, *interval)
+
+    def block(self, position: int, shift_start: int, shift_end: int) -> None:
+        """Block ``position`` from every cell within ``rest_minutes`` of a shift on the week axis."""
+        start = shift_start - self.rest_minutes
+        end = shift_end + self.rest_minutes
+        bit = 1 << position
+        for cell, (cell_start, cell_end) in self.cells.items():
+            if cell_start < end and cell_end > start:
+                self.blocked[cell] |= bit
+
+    def copy(self) -> Constraint:
+        clone = copy.copy(self)
+        clone.blocked = dict(self.blocked)
+        return clone
+
+
+class MaxConsecutiveDays(Constraint):
+    """Cap the run of consecutive working days, counting the run the previous week ends with.
+
+    Day bits are offset by a week, so bits 0-6 hold the previous week.
+    """
+
+    def __init__(self, limit_days: int, hard: bool = True, weight: int = 1) -> None:
+        super().__init__(hard=hard, weight=weight)
+        self.limit_days = limit_days
+        self.day_offsets: dict[str, int] = {}
+        self.worked: list[int] = []
+        self.masks_by_day: dict[int, int] = {}
+
+    def prepare(self, context: ScheduleContext) -> None:
+        self.day_offsets = {day_str: WEEK_DAYS + offset for offset, day_str in enumerate(context.days)}
+        self.worked = [0] * len(context.staff)
+        for position, offset, _ in previous_assignments(context):
+            self.worked[position] |= 1 << (WEEK_DAYS + offset)
+        for position, day_str, _ in existing_assignments(context):
+            self.worked[position] |= 1 << self.day_offsets[day_str]
+        self.masks_by_day = {}
+
+    def fits(self, worked: int, offset: int) -> bool:
+        days = worked | (1 << offset)
+        run = 1
+        cursor = offset - 1
+        while cursor >= 0 and days >> cursor & 1:
+            run += 1
+            cursor -= 1
+        cursor = offset + 1
+        while days >> cursor & 1:
+            run += 1
+            cursor += 1
+        return run <= self.limit_days
+
+    def allowed(self, day_str: str, shift: ShiftInfo) -> int:
+        offset = self.day_offsets[day_str]
+        mask = self.masks_by_day.get(offset)
+        if mask is None:
+            mask = 0
+            for position, worked in enumerate(self.worked):
+                if self.fits(worked, offset):
+                    mask |= 1 << position
+            self.masks_by_day[offset] = mask
+        return mask
+
+    def record(self, position: int, day_str: str, shift: ShiftInfo) -> None:
+        self.worked[position] |= 1 << self.day_offsets[day_str]
+        bit = 1 << position
+        for offset in self.masks_by_day:
+            if self.fits(self.worked[position], offset):
+                self.masks_by_day[offset] |= bit
+            else:
+                self.masks_by_day[offset] &= ~bit
+
+    def copy(self) -> Constraint:
+        clone = copy.copy(self)
+        clone.worked = list(self.worked)
+        clone.masks_by_day = dict(self.masks_by_day)
+        return clone
+
+
+class RuleSet:
+    """Compiled constraints of one scheduling run."""
+
+    def __init__(self, rules: list[Constraint], positions: dict[int, int]) -> None:
+        self.rules = rules
+        self.positions = positions
+
+    @classmethod
+    def compile(cls, context: ScheduleContext, constraints: Iterable[Constraint]) -> RuleSet:
+        return cls(
+            [constraint.compile(context) for constraint in constraints],
+            {staff.id: position for position, staff in enumerate(context.staff)},
+        )
+
+    def masks(self, day_str: str, shift: ShiftInfo) -> tuple[int, list[tuple[int, int]]]:
+        """Return the AND of the hard masks and the (mask, weight) pairs of the soft rules."""
+        hard = -1
+        soft: list[tuple[int, int]] = []
+        for rule in self.rules:
+            mask = rule.allowed(day_str, shift)
+            if rule.hard:
+                hard &= mask
+            elif mask != rule.full_mask:
+                soft.append((mask, rule.weight))
+        return hard, soft
+
+    @staticmethod
+    def penalty(position: int, soft: list[tuple[int, int]]) -> int:
+        return sum(weight for mask, weight in soft if not mask >> position & 1)
+
+    def record(self, staff_id: int, day_str: str, shift: ShiftInfo) -> None:
+        position = self.positions.get(staff_id)
+        if position is None:
+            return
+        for rule in self.rules:
+            rule.record(position, day_str, shift)
+
+    def copy(self) -> RuleSet:
+        return RuleSet([rule.copy() for rule in self.rules], self.positions)
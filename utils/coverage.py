@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+
+def minute_mask(start_minutes: int, end_minutes: int) -> int:
+    """Bitmap with one bit per minute of the half-open interval [start, end)."""
+    return ((1 << (end_minutes - start_minutes)) - 1) << start_minutes
+
+
+@dataclass
+class CoverageEntry:
+    shift_id: int
+    assignment_id: int
+    auto: bool
+
+
+class CoverageMatrix:
+    """Assignments of one week as flat arrays indexed staff x day x shift.
+
+    ``counts`` holds how often a staff member works a shift on a day and
+    ``fill`` the headcount of each day x shift cell, including staff outside
+    ``staff_ids`` (for example deactivated staff still on the roster).
+    ``occupancy`` keeps one minute-resolution bitmap per staff-day, so overlap
+    tests and worked minutes are single integer operations. ``shifts`` are
+    (shift id, start minutes, end minutes) in display order.
+    """
+
+    def __init__(
+        self,
+        staff_ids: Iterable[int],
+        dates: Iterable[str],
+        shifts: Iterable[tuple[int, int, int]],
+    ) -> None:
+        shifts = list(shifts)
+        self.staff_ids = list(staff_ids)
+        self.dates = list(dates)
+        self.shift_ids = [shift_id for shift_id, _, _ in shifts]
+        self.staff_index = {staff_id: position for position, staff_id in enumerate(self.staff_ids)}
+        self.day_index = {day_str: offset for offset, day_str in enumerate(self.dates)}
+        self.shift_index = {shift_id: position for position, shift_id in enumerate(self.shift_ids)}
+        self.shift_masks = [minute_mask(start, end) for _, start, end in shifts]
+
+        staff_count, day_count, shift_count = len(self.staff_ids), len(self.dates), len(self.shift_ids)
+        self.counts = array("H", bytes(2 * staff_count * day_count * shift_count))
+        self.assignment_ids = array("q", bytes(8 * staff_count * day_count * shift_count))
+        self.auto = array("B", bytes(staff_count * day_count * shift_count))
+        self.fill = array("H", bytes(2 * day_count * shift_count))
+        self.occupancy = [0] * (staff_count * day_count)
+
+    def cell(self, staff_position: int, day_offset: int, shift_position: int) -> int:
+        return (staff_position * len(self.dates) + day_offset) * len(self.shift_ids) + shift_position
+
+    def add(
+        self,
+        staff_id: int,
+        day_str: str,
+        shift_id: int,
+        assignment_id: int = 0,
+        auto: bool = False,
+    ) -> None:
+        day_offset = self.day_index.get(day_str)
+        shift_position = self.shift_index.get(shift_id)
+        if day_offset is None or shift_position is None:
+            return
+        self.fill[day_offset * len(self.shift_ids) + shift_position] += 1
+        staff_position = self.staff_index.get(staff_id)
+        if staff_position is None:
+            return
+        index = self.cell(staff_position, day_offset, shift_position)
+        self.counts[index] += 1
+        if not self.assignment_ids[index]:
+            self.assignment_ids[index] = assignment_id
+            self.auto[index] = int(auto)
+        self.occupancy[staff_position * len(self.dates) + day_offset] |= self.shift_masks[shift_position]
+
+    def clear_staff_day(self, staff_id: int, day_str: str) -> list[int]:
+        """Remove every assignment of a staff member on a day; returns the freed shift ids."""
+        staff_position = self.staff_index.get(staff_id)
+        day_offset = self.day_index.get(day_str)
+        if staff_position is None or day_offset is None:
+            return []
+        freed: list[int] = []
+        for shift_position, shift_id in enumerate(self.shift_ids):
+            index = self.cell(staff_position, day_offset, shift_position)
+            count = self.counts[index]
+            if not count:
+                continue
+            freed.extend([shift_id] * count)
+            self.fill[day_offset * len(self.shift_ids) + shift_position] -= count
+            self.counts[index] = 0
+            self.assignment_ids[index] = 0
+            self.auto[index] = 0
+        self.occupancy[staff_position * len(self.dates) + day_offset] = 0
+        return freed
+
+    def shift_fill(self, day_str: str, shift_id: int) -> int:
+        day_offset = self.day_index.get(day_str)
+        shift_position = self.shift_index.get(shift_id)
+        if day_offset is None or shift_position is None:
+            return 0
+        return self.fill[day_offset * len(self.shift_ids) + shift_position]
+
+    def overlaps(self, staff_id: int, day_str: str, shift_id: int) -> bool:
+        staff_position = self.staff_index.get(staff_id)
+        day_offset = self.day_index.get(day_str)
+        shift_position = self.shift_index.get(shift_id)
+        if staff_position is None or day_offset is None or shift_position is None:
+            return False
+        occupied = self.occupancy[staff_position * len(self.dates) + day_offset]
+        return bool(occupied & self.shift_masks[shift_position])
+
+    def staff_day_shifts(self, staff_id: int, day_str: str) -> list[int]:
+        staff_position = self.staff_index.get(staff_id)
+        day_offset = self.day_index.get(day_str)
+        if staff_position is None or day_offset is None:
+            return []
+        start = self.cell(staff_position, day_offset, 0)
+        return [
+            shift_id
+            for shift_id, count in zip(self.shift_ids, self.counts[start : start + len(self.shift_ids)])
+            for _ in range(count)
+        ]
+
+    def cell_entries(self, staff_id: int, day_str: str) -> list[CoverageEntry]:
+        """Assignments of one roster grid cell, in shift order."""
+        staff_position = self.staff_index.get(staff_id)
+        day_offset = self.day_index.get(day_str)
+        if staff_position is None or day_offset is None:
+            return []
+        entries: list[CoverageEntry] = []
+        for shift_position, shift_id in enumerate(self.shift_ids):
+            index = self.cell(staff_position, day_offset, shift_position)
+            if self.counts[index]:
+                entries.append(
+                    CoverageEntry(
+                        shift_id=shift_id,
+                        assignment_id=self.assignment_ids[index],
+                        auto=bool(self.auto[index]),
+                    )
+                )
+        return entries
+
+    def first_shift(self, staff_id: int, day_str: str) -> int:
+        """Shift id of the earliest assignment in a cell, or 0 when the cell is empty."""
+        shift_ids = self.staff_day_shifts(staff_id, day_str)
+        return shift_ids[0] if shift_ids else 0
+
+    def is_multi(self, staff_id: int, day_str: str) -> bool:
+        return len(set(self.staff_day_shifts(staff_id, day_str))) > 1
+
+    def staff_minutes(self, staff_id: int) -> int:
+        staff_position = self.staff_index.get(staff_id)
+        if staff_position is None:
+            return 0
+        start = staff_position * len(self.dates)
+        return sum(bitmap.bit_count() for bitmap in self.occupancy[start : start + len(self.dates)])
+
+    def assignments(self) -> Iterator[tuple[int, str, int]]:
+        """(staff id, date, shift id) for every recorded assignment of a known staff member."""
+        for staff_position, staff_id in enumerate(self.staff_ids):
+            for day_offset, day_str in enumerate(self.dates):
+                start = self.cell(staff_position, day_offset, 0)
+                for shift_position, count in enumerate(self.counts[start : start + len(self.shift_ids)]):
+                    for _ in range(count):
+                        yield staff_id, day_str, self.shift_ids[shift_position]
+
+    def copy(self) -> CoverageMatrix:
+        clone = object.__new__(CoverageMatrix)
+        clone.__dict__.update(self.__dict__)
+        clone.counts = array("H", self.counts)
+        clone.assignment_ids = array("q", self.assignment_ids)
+        clone.auto = array("B", self.auto)
+        clone.fill = array("H", self.fill)
+        clone.occupancy = list(self.occupancy)
+        return clone
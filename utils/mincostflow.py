@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import heapq
+import time
+
+
+class MinCostFlow:
+    """Successive shortest paths with Dijkstra and Johnson potentials.
+
+    Edge costs must be non-negative when added. ``solve`` pushes as much flow as
+    possible from source to sink at minimum total cost.
+    """
+
+    def __init__(self, node_count: int) -> None:
+        # Each edge is [to, capacity, cost, index of reverse edge in graph[to]].
+        self.graph: list[list[list[int]]] = [[] for _ in range(node_count)]
+
+    def add_node(self) -> int:
+        self.graph.append([])
+        return len(self.graph) - 1
+
+    def add_edge(self, source: int, target: int, capacity: int, cost: int) -> tuple[int, int]:
+        self.graph[source].append([target, capacity, cost, len(self.graph[target])])
+        self.graph[target].append([source, 0, -cost, len(self.graph[source]) - 1])
+        return source, len(self.graph[source]) - 1
+
+    def flow_on(self, edge_ref: tuple[int, int]) -> int:
+        node, index = edge_ref
+        target, _, _, reverse_index = self.graph[node][index]
+        return self.graph[target][reverse_index][1]
+
+    def solve(self, source: int, sink: int, deadline: float | None = None) -> tuple[int, int] | None:
+        """Return (flow, cost), or None when ``deadline`` (time.monotonic) passes first."""
+        node_count = len(self.graph)
+        potential = [0] * node_count
+        total_flow = 0
+        total_cost = 0
+
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            dist: list[float] = [float("inf")] * node_count
+            prev_edge: list[tuple[int, int] | None] = [None] * node_count
+            dist[source] = 0
+            queue: list[tuple[float, int]] = [(0, source)]
+            while queue:
+                node_dist, node = heapq.heappop(queue)
+                if node_dist > dist[node]:
+                    continue
+                for index, (target, capacity, cost, _) in enumerate(self.graph[node]):
+                    if capacity <= 0:
+                        continue
+                    candidate = node_dist + cost + potential[node] - potential[target]
+                    if candidate < dist[target]:
+                        dist[target] = candidate
+                        prev_edge[target] = (node, index)
+                        heapq.heappush(queue, (candidate, target))
+            if dist[sink] == float("inf"):
+                return total_flow, total_cost
+
+            for node in range(node_count):
+                if dist[node] < float("inf"):
+                    potential[node] += int(dist[node])
+
+            push = None
+            node = sink
+            while node != source:
+                prev_node, index = prev_edge[node]  # type: ignore[misc]
+                capacity = self.graph[prev_node][index][1]
+                push = capacity if push is None else min(push, capacity)
+                node = prev_node
+            assert push is not None
+
+            node = sink
+            while node != source:
+                prev_node, index = prev_edge[node]  # type: ignore[misc]
+                edge = self.graph[prev_node][index]
+                edge[1] -= push
+                self.graph[node][edge[3]][1] += push
+                total_cost += push * edge[2]
+                node = prev_node
+            total_flow += push
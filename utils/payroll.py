@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from array import array
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Iterable
+
+from utils.scheduling import shift_minutes
+
+
+def shift_centihours(start_hhmm: str, end_hhmm: str) -> int:
+    """Length of a shift in hundredths of an hour, rounded half up; 0 for malformed times."""
+    try:
+        start_minutes, end_minutes = shift_minutes(start_hhmm, end_hhmm)
+    except (ValueError, AttributeError):
+        return 0
+    return ((end_minutes - start_minutes) * 100 + 30) // 60
+
+
+def to_cents(value: Any) -> int:
+    """Whole cents of a money amount, rounded half up."""
+    return int(Decimal(str(value or 0)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+
+
+def salary_cents(centihours: int, wage_cents: int) -> int:
+    """Hours times wage, rounded half up to whole cents."""
+    return (centihours * wage_cents + 50) // 100
+
+
+def from_hundredths(value: int) -> Decimal:
+    return Decimal(value).scaleb(-2)
+
+
+class PayrollSheet:
+    """Payroll of a date range in integer centi-hours and cents, one staff row at a time.
+
+    Shift lengths are rounded to 0.01 h once per shift, so every sum here is
+    exact and the salary is the only other rounding step. ``add`` fills the
+    open row, ``close_row`` returns it and folds it into the totals.
+    """
+
+    def __init__(self, dates: Iterable[str]) -> None:
+        self.dates = list(dates)
+        self.day_index = {day_str: position for position, day_str in enumerate(self.dates)}
+        self.total_by_date = array("q", bytes(8 * len(self.dates)))
+        self.total_hours = 0
+        self.total_salary = 0
+        self.row = array("q", bytes(8 * len(self.dates)))
+        self.row_hours = 0
+
+    def add(self, day_str: str, centihours: int) -> None:
+        position = self.day_index.get(day_str)
+        if position is not None:
+            self.row[position] += centihours
+        self.row_hours += centihours
+
+    def close_row(self, wage_cents: int) -> tuple[list[int], int, int]:
+        """Finish the open row; returns (centi-hours per date, total centi-hours, salary cents)."""
+        hours = self.row.tolist()
+        total_hours = self.row_hours
+        salary = salary_cents(total_hours, wage_cents)
+        for position, value in enumerate(hours):
+            self.total_by_date[position] += value
+        self.total_hours += total_hours
+        self.total_salary += salary
+        self.row = array("q", bytes(8 * len(self.dates)))
+        self.row_hours = 0
+        return hours, total_hours, salary
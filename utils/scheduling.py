@@ -0,0 +1,630 @@
+from __future__ import annotations
+
+import heapq
+import time
+from dataclasses import dataclass, field, replace
+from datetime import date, timedelta
+from typing import Any, Callable, Iterable
+
+from utils.constraints import Constraint, RuleSet
+from utils.coverage import CoverageMatrix
+from utils.mincostflow import MinCostFlow
+
+AUTO_SCHEDULED_NOTE = "Auto-scheduled"
+BLOCKING_STATUSES = ("leave", "unavailable")
+SCHEDULE_MODES = ("greedy", "optimal")
+
+
+def to_minutes(hhmm: str) -> int:
+    hour, minute = hhmm.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def shift_minutes(start_hhmm: str, end_hhmm: str) -> tuple[int, int]:
+    """Return a shift as a half-open minute interval, wrapping overnight shifts past 24:00."""
+    start_minutes = to_minutes(start_hhmm)
+    end_minutes = to_minutes(end_hhmm)
+    if end_minutes <= start_minutes:
+        end_minutes += 24 * 60
+    return start_minutes, end_minutes
+
+
+@dataclass
+class StaffInfo:
+    id: int
+    name: str
+    role: str | None = None
+    department: str | None = None
+
+
+@dataclass
+class ShiftInfo:
+    id: int
+    name: str
+    start_time: str
+    end_time: str
+    required_staff: int
+    role: str | None = None
+    department: str | None = None
+    start_minutes: int = 0
+    end_minutes: int = 0
+
+    def __post_init__(self) -> None:
+        self.start_minutes, self.end_minutes = shift_minutes(self.start_time, self.end_time)
+
+
+@dataclass
+class DayIndex:
+    """Everything the scheduler needs to know about one roster date."""
+
+    existing_pairs: set[tuple[int, int]] = field(default_factory=set)
+    manual_staff: set[int] = field(default_factory=set)
+    blocked: set[int] = field(default_factory=set)
+    preferred: dict[int, set[int]] = field(default_factory=dict)
+
+
+@dataclass
+class ScheduleContext:
+    """In-memory snapshot of one week, built from a handful of bulk queries.
+
+    Fill counts and per-staff occupancy of the version being scheduled live in
+    ``coverage``; the per-day indexes only keep leave, manual staff, preferences
+    and the (staff, shift) pairs taken in any version.
+    """
+
+    version_id: int
+    week_start: date
+    staff: list[StaffInfo]
+    shifts: list[ShiftInfo]
+    days: dict[str, DayIndex]
+    week_counts: dict[int, int]
+    recent_counts: dict[int, int]
+    coverage: CoverageMatrix
+    rules: RuleSet | None = None
+    confirmed_weeks: set[date] = field(default_factory=set)
+    # (date, staff id, shift id) of the week before, for rules that span the boundary.
+    previous_week: list[tuple[str, int, int]] = field(default_factory=list)
+
+    @property
+    def week_dates(self) -> list[str]:
+        return list(self.days)
+
+
+@dataclass
+class ScheduleResult:
+    assignments: list[tuple[str, int, int]] = field(default_factory=list)
+    unfilled: int = 0
+
+    @property
+    def added(self) -> int:
+        return len(self.assignments)
+
+
+DayCallback = Callable[[str, ScheduleResult], None]
+
+
+def build_schedule_context(
+    version_id: int,
+    week_start: date,
+    staff_rows: Iterable[Any],
+    shift_rows: Iterable[Any],
+    assignment_rows: Iterable[Any],
+    availability_rows: Iterable[Any],
+    preference_rows: Iterable[Any],
+    history_counts: dict[int, int] | None = None,
+    confirmed_weeks: Iterable[date] = (),
+    previous_rows: Iterable[Any] = (),
+) -> ScheduleContext:
+    """Index bulk-loaded week rows by date.
+
+    ``assignment_rows`` must cover every version of the org for the week and expose
+    ``version_id``, ``roster_date``, ``staff_id``, ``shift_id``, ``notes``,
+    ``start_time`` and ``end_time``. Only rows of ``version_id`` count towards fill,
+    ranges and manual staff; the (staff, shift) pairs are checked across versions.
+    ``history_counts`` seeds ``recent_counts`` with confirmed weeks before this one;
+    ``confirmed_weeks`` names those weeks, so a batch run does not count them twice.
+    ``previous_rows`` (``roster_date``, ``staff_id``, ``shift_id``) are the week
+    before, which rest and consecutive-day rules look back on.
+    """
+    staff = [
+        StaffInfo(
+            id=row.id,
+            name=row.name,
+            role=getattr(row, "role", None),
+            department=getattr(row, "department", None),
+        )
+        for row in staff_rows
+    ]
+    shifts = [
+        ShiftInfo(
+            id=row.id,
+            name=row.name,
+            start_time=row.start_time,
+            end_time=row.end_time,
+            required_staff=row.required_staff,
+            role=getattr(row, "role", None),
+            department=getattr(row, "department", None),
+        )
+        for row in shift_rows
+    ]
+    days = {(week_start + timedelta(days=offset)).isoformat(): DayIndex() for offset in range(7)}
+    coverage = CoverageMatrix(
+        [row.id for row in staff],
+        days,
+        [(shift.id, shift.start_minutes, shift.end_minutes) for shift in shifts],
+    )
+    week_counts = {row.id: 0 for row in staff}
+    recent_counts: dict[int, int] = dict(history_counts or {})
+
+    for row in assignment_rows:
+        day = days.get(str(row.roster_date))
+        if day is None:
+            continue
+        day.existing_pairs.add((row.staff_id, row.shift_id))
+        if row.version_id != version_id:
+            continue
+        if row.notes != AUTO_SCHEDULED_NOTE:
+            day.manual_staff.add(row.staff_id)
+        coverage.add(row.staff_id, str(row.roster_date), row.shift_id, auto=row.notes == AUTO_SCHEDULED_NOTE)
+        week_counts[row.staff_id] = week_counts.get(row.staff_id, 0) + 1
+        recent_counts[row.staff_id] = recent_counts.get(row.staff_id, 0) + 1
+
+    for row in availability_rows:
+        if row.status not in BLOCKING_STATUSES:
+            continue
+        for day_str, day in days.items():
+            if row.start_date <= day_str <= row.end_date:
+                day.blocked.add(row.staff_id)
+
+    for row in preference_rows:
+        for day_str, day in days.items():
+            if row.start_date <= day_str <= row.end_date:
+                day.preferred.setdefault(row.shift_id, set()).add(row.staff_id)
+
+    return ScheduleContext(
+        version_id=version_id,
+        week_start=week_start,
+        staff=staff,
+        shifts=shifts,
+        days=days,
+        week_counts=week_counts,
+        recent_counts=recent_counts,
+        coverage=coverage,
+        confirmed_weeks=set(confirmed_weeks),
+        previous_week=[(str(row.roster_date), row.staff_id, row.shift_id) for row in previous_rows],
+    )
+
+
+def is_eligible(context: ScheduleContext, day_str: str, day: DayIndex, shift: ShiftInfo, staff_id: int) -> bool:
+    if staff_id in day.blocked or staff_id in day.manual_staff:
+        return False
+    if (staff_id, shift.id) in day.existing_pairs:
+        return False
+    return not context.coverage.overlaps(staff_id, day_str, shift.id)
+
+
+def record_assignment(
+    context: ScheduleContext,
+    day_str: str,
+    day: DayIndex,
+    shift: ShiftInfo,
+    staff_id: int,
+) -> None:
+    context.coverage.add(staff_id, day_str, shift.id, auto=True)
+    day.existing_pairs.add((staff_id, shift.id))
+    context.week_counts[staff_id] = context.week_counts.get(staff_id, 0) + 1
+    context.recent_counts[staff_id] = context.recent_counts.get(staff_id, 0) + 1
+    if context.rules is not None:
+        context.rules.record(staff_id, day_str, shift)
+
+
+def rule_masks(context: ScheduleContext, day_str: str, shift: ShiftInfo) -> tuple[int, list[tuple[int, int]]]:
+    if context.rules is None:
+        return -1, []
+    return context.rules.masks(day_str, shift)
+
+
+def candidate_queue(
+    context: ScheduleContext,
+    day_str: str,
+    day: DayIndex,
+    shift: ShiftInfo,
+) -> list[tuple[Any, ...]]:
+    """Heap of eligible staff keyed on (rule penalty, preference, week count, recent count, name).
+
+    Counts only change for staff picked for this shift, and those drop out of the
+    queue, so the heap stays valid while the shift's open slots are drained.
+    """
+    preferred = day.preferred.get(shift.id, ())
+    allowed, soft = rule_masks(context, day_str, shift)
+    queue = [
+        (
+            RuleSet.penalty(position, soft) if soft else 0,
+            0 if staff.id in preferred else 1,
+            context.week_counts.get(staff.id, 0),
+            context.recent_counts.get(staff.id, 0),
+            staff.name,
+            position,
+            staff.id,
+        )
+        for position, staff in enumerate(context.staff)
+        if allowed >> position & 1 and is_eligible(context, day_str, day, shift, staff.id)
+    ]
+    heapq.heapify(queue)
+    return queue
+
+
+def fill_day_greedy(
+    context: ScheduleContext,
+    day_str: str,
+    day: DayIndex,
+    result: ScheduleResult,
+    shift_ids: set[int] | None = None,
+) -> None:
+    for shift in context.shifts:
+        if shift_ids is not None and shift.id not in shift_ids:
+            continue
+        # Existing assignments in this draft (manual + auto) always take priority.
+        open_slots = shift.required_staff - context.coverage.shift_fill(day_str, shift.id)
+        if open_slots <= 0:
+            continue
+        queue = candidate_queue(context, day_str, day, shift)
+        for _ in range(open_slots):
+            if not queue:
+                result.unfilled += 1
+                continue
+            staff_id = heapq.heappop(queue)[-1]
+            result.assignments.append((day_str, staff_id, shift.id))
+            record_assignment(context, day_str, day, shift, staff_id)
+
+
+def copy_day(day: DayIndex) -> DayIndex:
+    """Copy the state the scheduler mutates; leave and preferences are shared."""
+    return DayIndex(
+        existing_pairs=set(day.existing_pairs),
+        manual_staff=day.manual_staff,
+        blocked=day.blocked,
+        preferred=day.preferred,
+    )
+
+
+def clone_for_day(context: ScheduleContext, day_str: str) -> ScheduleContext:
+    """Copy the mutable state of one day so alternative fills can be tried side by side."""
+    return replace(
+        context,
+        days={day_str: copy_day(context.days[day_str])},
+        week_counts=dict(context.week_counts),
+        recent_counts=dict(context.recent_counts),
+        coverage=context.coverage.copy(),
+        rules=context.rules.copy() if context.rules is not None else None,
+    )
+
+
+def clone_context(context: ScheduleContext) -> ScheduleContext:
+    """Copy a whole week so a what-if scenario can run next to the baseline."""
+    return replace(
+        context,
+        shifts=list(context.shifts),
+        days={
+            day_str: replace(copy_day(day), manual_staff=set(day.manual_staff), blocked=set(day.blocked))
+            for day_str, day in context.days.items()
+        },
+        week_counts=dict(context.week_counts),
+        recent_counts=dict(context.recent_counts),
+        coverage=context.coverage.copy(),
+        rules=context.rules.copy() if context.rules is not None else None,
+    )
+
+
+def fill_day_min_cost(
+    context: ScheduleContext,
+    day_str: str,
+    day: DayIndex,
+    result: ScheduleResult,
+    deadline: float | None = None,
+) -> bool:
+    """Fill a day's open slots as a min-cost max-flow between staff and shifts.
+
+    Overlap between a staff member's shifts is not expressible as flow
+    capacity, so the flow gives each staff member at most one new shift per
+    day; greedy, by contrast, may give someone a second, non-overlapping
+    shift. The flow's fill is topped up greedily for that reason, and plain
+    greedy is also run on a copy of the day. Of the two, the fill with fewer
+    unfilled slots wins, then the lower total cost under the same tie-breakers
+    the flow minimises, so a solved day is never worse than greedy on either.
+    Returns False, leaving the day untouched, when ``deadline`` passes before
+    the flow is solved.
+    """
+    open_shifts = [
+        (shift, shift.required_staff - context.coverage.shift_fill(day_str, shift.id))
+        for shift in context.shifts
+        if shift.required_staff > context.coverage.shift_fill(day_str, shift.id)
+    ]
+    if not open_shifts:
+        return True
+
+    choice_cost = day_choice_costs(context, day_str, day, [shift for shift, _ in open_shifts])
+    network = MinCostFlow(2)
+    source, sink = 0, 1
+    shift_nodes: dict[int, int] = {}
+    for shift, open_slots in open_shifts:
+        shift_nodes[shift.id] = network.add_node()
+        network.add_edge(shift_nodes[shift.id], sink, open_slots, 0)
+
+    choice_edges: list[tuple[tuple[int, int], int, ShiftInfo]] = []
+    for staff in context.staff:
+        eligible = [shift for shift, _ in open_shifts if (staff.id, shift.id) in choice_cost]
+        if not eligible:
+            continue
+        staff_node = network.add_node()
+        network.add_edge(source, staff_node, 1, 0)
+        for shift in eligible:
+            edge = network.add_edge(staff_node, shift_nodes[shift.id], 1, choice_cost[(staff.id, shift.id)])
+            choice_edges.append((edge, staff.id, shift))
+
+    if network.solve(source, sink, deadline=deadline) is None:
+        return False
+
+    shift_order = {shift.id: position for position, shift in enumerate(context.shifts)}
+    flow_context = clone_for_day(context, day_str)
+    flow_day = flow_context.days[day_str]
+    flow_result = ScheduleResult()
+    chosen = sorted(
+        ((staff_id, shift) for edge, staff_id, shift in choice_edges if network.flow_on(edge)),
+        key=lambda item: shift_order[item[1].id],
+    )
+    for staff_id, shift in chosen:
+        flow_result.assignments.append((day_str, staff_id, shift.id))
+        record_assignment(flow_context, day_str, flow_day, shift, staff_id)
+    fill_day_greedy(flow_context, day_str, flow_day, flow_result)
+
+    greedy_context = clone_for_day(context, day_str)
+    greedy_result = ScheduleResult()
+    fill_day_greedy(greedy_context, day_str, greedy_context.days[day_str], greedy_result)
+
+    best = min(
+        (flow_result, greedy_result),
+        key=lambda item: (item.unfilled, fill_cost(choice_cost, item)),
+    )
+    shifts_by_id = {shift.id: shift for shift in context.shifts}
+    for _, staff_id, shift_id in best.assignments:
+        result.assignments.append((day_str, staff_id, shift_id))
+        record_assignment(context, day_str, day, shifts_by_id[shift_id], staff_id)
+    result.unfilled += best.unfilled
+    return True
+
+
+def day_choice_costs(
+    context: ScheduleContext,
+    day_str: str,
+    day: DayIndex,
+    shifts: list[ShiftInfo],
+) -> dict[tuple[int, int], int]:
+    """Cost of each eligible (staff id, shift id) pick on a day, from the counts before the day.
+
+    The greedy tie-breakers (rule penalty, preference, week count, recent
+    count) are folded into one integer with each step larger than everything
+    below it, so lower cost means greedy would rank the pick first.
+    """
+    recent_step = max(context.recent_counts.values(), default=0) + 1
+    week_step = recent_step * (max(context.week_counts.values(), default=0) + 1)
+    preference_step = week_step * (max(context.week_counts.values(), default=0) + 1)
+    penalty_step = 2 * preference_step
+    slot_rules = {shift.id: rule_masks(context, day_str, shift) for shift in shifts}
+    costs: dict[tuple[int, int], int] = {}
+    for position, staff in enumerate(context.staff):
+        for shift in shifts:
+            allowed, soft = slot_rules[shift.id]
+            if not allowed >> position & 1 or not is_eligible(context, day_str, day, shift, staff.id):
+                continue
+            costs[(staff.id, shift.id)] = (
+                RuleSet.penalty(position, soft) * penalty_step
+                + (0 if staff.id in day.preferred.get(shift.id, ()) else preference_step)
+                + context.week_counts.get(staff.id, 0) * week_step
+                + context.recent_counts.get(staff.id, 0)
+            )
+    return costs
+
+
+def fill_cost(choice_cost: dict[tuple[int, int], int], result: ScheduleResult) -> int:
+    return sum(choice_cost.get((staff_id, shift_id), 0) for _, staff_id, shift_id in result.assignments)
+
+
+@dataclass
+class ScheduleOverlay:
+    """Proposed changes applied to an in-memory context for what-if runs.
+
+    ``required_staff`` maps shift ids to a new headcount and ``leave`` holds
+    (staff id, start date, end date) ranges to treat as approved leave.
+    """
+
+    required_staff: dict[int, int] = field(default_factory=dict)
+    leave: list[tuple[int, str, str]] = field(default_factory=list)
+
+
+def apply_overlay(context: ScheduleContext, overlay: ScheduleOverlay) -> int:
+    """Apply ``overlay`` to ``context`` in place; returns how many assignments leave displaced.
+
+    Existing assignments of staff put on leave are taken out of the indexes so
+    their slots open up again, exactly as if the rows had been deleted.
+    """
+    context.shifts = [
+        replace(shift, required_staff=max(0, overlay.required_staff[shift.id]))
+        if shift.id in overlay.required_staff
+        else shift
+        for shift in context.shifts
+    ]
+    displaced = 0
+    for staff_id, start_date, end_date in overlay.leave:
+        for day_str, day in context.days.items():
+            if not start_date <= day_str <= end_date:
+                continue
+            day.blocked.add(staff_id)
+            day.manual_staff.discard(staff_id)
+            for shift_id in context.coverage.clear_staff_day(staff_id, day_str):
+                day.existing_pairs.discard((staff_id, shift_id))
+                context.week_counts[staff_id] = context.week_counts.get(staff_id, 0) - 1
+                context.recent_counts[staff_id] = context.recent_counts.get(staff_id, 0) - 1
+                displaced += 1
+    return displaced
+
+
+@dataclass
+class CoverageSummary:
+    """Per-cell headcount and per-staff worked minutes of a scheduled week."""
+
+    cells: dict[tuple[str, int], tuple[int, int]]
+    staff_minutes: dict[int, int]
+
+    @property
+    def required(self) -> int:
+        return sum(required for required, _ in self.cells.values())
+
+    @property
+    def filled(self) -> int:
+        return sum(min(required, assigned) for required, assigned in self.cells.values())
+
+    @property
+    def unfilled(self) -> int:
+        return self.required - self.filled
+
+
+def summarize_coverage(context: ScheduleContext) -> CoverageSummary:
+    """Read coverage straight from the coverage matrix, without touching assignment rows."""
+    cells = {
+        (day_str, shift.id): (shift.required_staff, context.coverage.shift_fill(day_str, shift.id))
+        for day_str in context.days
+        for shift in context.shifts
+    }
+    staff_minutes = {staff.id: context.coverage.staff_minutes(staff.id) for staff in context.staff}
+    return CoverageSummary(cells=cells, staff_minutes=staff_minutes)
+
+
+def coverage_diff(baseline: CoverageSummary, scenario: CoverageSummary) -> dict[str, Any]:
+    """JSON-ready comparison of two coverage summaries; only changed cells and staff are listed."""
+    cells: list[dict[str, Any]] = []
+    for (day_str, shift_id), after in sorted(scenario.cells.items()):
+        before = baseline.cells.get((day_str, shift_id), (0, 0))
+        if before == after:
+            continue
+        cells.append(
+            {
+                "date": day_str,
+                "shift_id": shift_id,
+                "baseline": {"required": before[0], "assigned": before[1]},
+                "scenario": {"required": after[0], "assigned": after[1]},
+            }
+        )
+    staff_ids = sorted(set(baseline.staff_minutes) | set(scenario.staff_minutes))
+    staff = [
+        {
+            "staff_id": staff_id,
+            "baseline_minutes": baseline.staff_minutes.get(staff_id, 0),
+            "scenario_minutes": scenario.staff_minutes.get(staff_id, 0),
+        }
+        for staff_id in staff_ids
+        if baseline.staff_minutes.get(staff_id, 0) != scenario.staff_minutes.get(staff_id, 0)
+    ]
+    return {
+        "baseline": {"required": baseline.required, "filled": baseline.filled, "unfilled": baseline.unfilled},
+        "scenario": {"required": scenario.required, "filled": scenario.filled, "unfilled": scenario.unfilled},
+        "filled_delta": scenario.filled - baseline.filled,
+        "unfilled_delta": scenario.unfilled - baseline.unfilled,
+        "cells": cells,
+        "staff": staff,
+    }
+
+
+def schedule_greedy(context: ScheduleContext, on_day: DayCallback | None = None) -> ScheduleResult:
+    """Fill open slots day by day, shift by shift, without touching the database.
+
+    ``on_day`` is called with the date and the running result after each day.
+    """
+    result = ScheduleResult()
+    for day_str, day in context.days.items():
+        fill_day_greedy(context, day_str, day, result)
+        if on_day is not None:
+            on_day(day_str, result)
+    return result
+
+
+def schedule_cells(
+    context: ScheduleContext,
+    cells: Iterable[tuple[str, int]],
+    constraints: Iterable[Constraint] = (),
+) -> ScheduleResult:
+    """Fill only the given (date, shift id) cells, leaving the rest of the week untouched."""
+    constraints = list(constraints)
+    context.rules = RuleSet.compile(context, constraints) if constraints else None
+    shift_ids_by_day: dict[str, set[int]] = {}
+    for day_str, shift_id in cells:
+        shift_ids_by_day.setdefault(day_str, set()).add(shift_id)
+
+    result = ScheduleResult()
+    for day_str, day in context.days.items():
+        shift_ids = shift_ids_by_day.get(day_str)
+        if shift_ids:
+            fill_day_greedy(context, day_str, day, result, shift_ids=shift_ids)
+    return result
+
+
+def schedule_optimal(
+    context: ScheduleContext,
+    on_day: DayCallback | None = None,
+    deadline: float | None = None,
+) -> ScheduleResult:
+    """Solve each day as a min-cost flow; days left once ``deadline`` passes fall back to greedy."""
+    result = ScheduleResult()
+    for day_str, day in context.days.items():
+        solved = deadline is None or time.monotonic() < deadline
+        if solved:
+            solved = fill_day_min_cost(context, day_str, day, result, deadline=deadline)
+        if not solved:
+            fill_day_greedy(context, day_str, day, result)
+        if on_day is not None:
+            on_day(day_str, result)
+    return result
+
+
+def schedule_weeks(
+    contexts: list[ScheduleContext],
+    history_weeks: int = 4,
+    on_day: DayCallback | None = None,
+    mode: str = "greedy",
+    time_budget: float | None = None,
+    constraints: Iterable[Constraint] = (),
+) -> list[ScheduleResult]:
+    """Schedule consecutive weeks in order, carrying fairness counts forward in memory.
+
+    Each week's final ``week_counts`` are folded into the ``recent_counts`` of the
+    following ``history_weeks`` weeks, so later weeks balance against earlier ones
+    without reloading anything. A week already in a later context's
+    ``confirmed_weeks`` is counted there from its confirmed version and is not
+    carried again. A week following another in the batch sees that week's
+    scheduled assignments as its ``previous_week``. ``time_budget`` (seconds,
+    None for no limit) bounds the whole run in ``"optimal"`` mode.
+    ``constraints`` are compiled against each week before it is filled.
+    """
+    constraints = list(constraints)
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    results: list[ScheduleResult] = []
+    carried: list[tuple[date, dict[int, int]]] = []
+    previous: ScheduleContext | None = None
+    for context in contexts:
+        if previous is not None and context.week_start - previous.week_start == timedelta(days=7):
+            context.previous_week = [
+                (day_str, staff_id, shift_id) for staff_id, day_str, shift_id in previous.coverage.assignments()
+            ]
+        for week_start, counts in carried[-history_weeks:]:
+            if week_start in context.confirmed_weeks:
+                continue
+            for staff_id, count in counts.items():
+                context.recent_counts[staff_id] = context.recent_counts.get(staff_id, 0) + count
+        context.rules = RuleSet.compile(context, constraints) if constraints else None
+        if mode == "optimal":
+            results.append(schedule_optimal(context, on_day=on_day, deadline=deadline))
+        else:
+            results.append(schedule_greedy(context, on_day=on_day))
+        carried.append((context.week_start, dict(context.week_counts)))
+        previous = context
+    return results
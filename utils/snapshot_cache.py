@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+
+class SnapshotCache:
+    """Thread-safe LRU of built roster snapshots with an optional on-disk store.
+
+    Keys are ``(org_id, version_id, stamp)`` where ``stamp`` changes whenever the
+    version is written, so a stale entry is never read back even by another
+    process sharing ``directory``. Writers still call ``invalidate`` so memory
+    and disk are freed right away.
+    """
+
+    def __init__(self, max_entries: int = 256, directory: str | None = None) -> None:
+        self.max_entries = max(0, max_entries)
+        self.directory = Path(directory) if directory else None
+        self.entries: OrderedDict[tuple[int, int, str], Any] = OrderedDict()
+        self.lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def file_for(self, key: tuple[int, int, str]) -> Path:
+        assert self.directory is not None
+        org_id, version_id, stamp = key
+        safe_stamp = "".join(char if char.isalnum() else "_" for char in stamp)
+        return self.directory / f"{org_id}-{version_id}-{safe_stamp}.pickle"
+
+    def get(self, key: tuple[int, int, str]) -> Any | None:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        if self.directory is None:
+            return None
+        try:
+            with self.file_for(key).open("rb") as handle:
+                value = pickle.load(handle)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        self.remember(key, value)
+        return value
+
+    def put(self, key: tuple[int, int, str], value: Any) -> None:
+        self.remember(key, value)
+        if self.directory is None:
+            return
+        path = self.file_for(key)
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with temp_path.open("wb") as handle:
+                pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+
+    def remember(self, key: tuple[int, int, str], value: Any) -> None:
+        if not self.max_entries:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, org_id: int, version_id: int | None = None) -> None:
+        """Drop every snapshot of a version, or of the whole org when ``version_id`` is None."""
+        with self.lock:
+            for key in [
+                key
+                for key in self.entries
+                if key[0] == org_id and (version_id is None or key[1] == version_id)
+            ]:
+                del self.entries[key]
+        if self.directory is None:
+            return
+        pattern = f"{org_id}-*.pickle" if version_id is None else f"{org_id}-{version_id}-*.pickle"
+        for path in self.directory.glob(pattern):
+            path.unlink(missing_ok=True)